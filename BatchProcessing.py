@@ -0,0 +1,315 @@
+'''Batch Processing Module
+
+This module is the command line entry point of the terminology extraction pipeline, which needs no display.
+It runs the pipeline over many .PDF files in a pool of worker processes, or in the calling process for a single
+file. Every worker loads the POS tagger and opens the pipeline cache once, for all the documents it processes.
+Results are streamed back as documents finish, as JSON Lines or CSV, and an error in one document does not stop
+the others.
+Entries can also be merged into a glossary store, in which case files already added are skipped. It requires
+argparse, csv, functools, json, multiprocessing, os, sys and traceback libraries.
+
+Functions
+---------
+find_pdfs(paths)
+    Takes in file and folder paths, returns paths of .PDF files
+get_cache(cache_dir)
+    Takes in folder of pipeline cache, returns the cache shared by all documents of the process
+init_worker(cache_dir)
+    Loads POS tagger and opens pipeline cache in a worker process as it starts
+process_document(file, top_k, cache_dir, report_dir, profile, trace_memory, scoring, min_score, max_def_length)
+    Takes in .PDF file, returns its terminology entries or the error raised
+batch_entries(files, processes, top_k, cache_dir, report_dir, profile, trace_memory, scoring, min_score,
+              max_def_length)
+    Takes in .PDF files, yields terminology entries of each file as it finishes
+entry_to_dict(file, entry)
+    Takes in file path and terminology entry, returns it as a dictionary
+entry_to_row(record)
+    Takes in entry or error dictionary, returns it as a CSV row
+main(argv)
+    Runs batch extraction from the command line, writes JSON Lines or CSV to standard output
+'''
+
+import argparse, csv, functools, json, multiprocessing, os, sys, traceback
+from GlossaryStore import *
+
+
+# Pipeline cache of the process, opened once so that its folder is scanned once per process, not per document
+_cache = None
+
+
+def find_pdfs(paths):
+    '''Takes in paths of files and folders. Folders are searched recursively for .PDF files.
+
+    Parameters
+    ----------
+    paths : list
+        Paths of .PDF files and folders
+
+    Returns
+    -------
+    files : list
+        Sorted paths of .PDF files
+    '''
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for folder, _, names in os.walk(path):
+                files.extend(os.path.join(folder, name) for name in names if name.lower().endswith('.pdf'))
+        else:
+            files.append(path)
+
+    return sorted(files)
+
+
+def get_cache(cache_dir):
+    '''Takes in folder of pipeline cache, returns the cache shared by all documents processed in the process,
+    opening it on first call. Opening a cache scans its folder, which takes time growing with the cache.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Folder of pipeline cache
+
+    Returns
+    -------
+    cache : PipelineCache
+        Pipeline cache of folder
+    '''
+    global _cache
+    if _cache is None or _cache.directory != cache_dir:
+        _cache = PipelineCache(cache_dir)
+
+    return _cache
+
+
+def init_worker(cache_dir=None):
+    '''Loads POS tagger in a worker process as it starts and opens the pipeline cache in cache_dir, if given.
+
+    Parameters
+    ----------
+    cache_dir : str, optional
+        Folder of pipeline cache
+
+    Returns
+    -------
+    None
+    '''
+    preload_tagger()
+    if cache_dir is not None:
+        get_cache(cache_dir)
+
+
+def process_document(file, top_k=None, cache_dir=None, report_dir=None, profile=False, trace_memory=False,
+                     scoring=None, min_score=None, max_def_length=None):
+    '''Takes in .PDF file and runs the whole pipeline on it, reusing stage outputs cached in cache_dir if given.
+    If report_dir is given, the pipeline is run without cache and measurements of its stages are written to
+    <name>.stages.json in report_dir, with a cProfile profile in <name>.prof if profile is True.
+    Any exception is caught and returned, so that a broken document does not stop a batch.
+
+    Parameters
+    ----------
+    file : str
+        Path of .PDF file
+    top_k : int, optional
+        Number of most frequent, or best scoring, terminology candidates to be kept
+    cache_dir : str, optional
+        Folder of pipeline cache
+    report_dir : str, optional
+        Folder of stage measurement reports and profiles
+    profile : bool
+        Whether to profile the pipeline with cProfile
+    trace_memory : bool
+        Whether to measure peak memory of stages, which slows them down
+    scoring : str, optional
+        Termhood score to rank terminology candidates by, one of SCORING_METHODS
+    min_score : float, optional
+        Lowest termhood score of terminology candidates to be kept, if scoring is given
+    max_def_length : int, optional
+        Length of the longest context sentence to be searched for definitions
+
+    Returns
+    -------
+    file : str
+        Path of .PDF file
+    entries : list or None
+        List of TermEntry objects, None if processing failed
+    error : str or None
+        Traceback of exception raised while processing, None if processing succeeded
+    '''
+    try:
+        if report_dir is not None:
+            name = os.path.join(report_dir, os.path.splitext(os.path.basename(file))[0])
+            entries, _ = profile_entry(file, name + '.stages.json', name + '.prof' if profile else None,
+                                       trace_memory, top_k=top_k, scoring=scoring, min_score=min_score,
+                                       max_def_length=max_def_length)
+            return file, entries, None
+        if cache_dir is None:
+            return file, create_entry(file, top_k, scoring=scoring, min_score=min_score,
+                                      max_def_length=max_def_length), None
+        return file, cached_entry(file, get_cache(cache_dir), top_k, scoring, min_score, max_def_length), None
+    except Exception:
+        return file, None, traceback.format_exc()
+
+
+def batch_entries(files, processes=None, top_k=None, cache_dir=None, report_dir=None, profile=False,
+                  trace_memory=False, scoring=None, min_score=None, max_def_length=None):
+    '''Takes in .PDF files and processes them in a pool of worker processes, each of which loads the POS tagger
+    when it starts. A single file, or a single process, is processed in the calling process without a pool.
+    Yields results in the order documents finish.
+
+    Parameters
+    ----------
+    files : list
+        Paths of .PDF files
+    processes : int, optional
+        Number of worker processes, defaults to number of CPUs
+    top_k : int, optional
+        Number of most frequent, or best scoring, terminology candidates to be kept
+    cache_dir : str, optional
+        Folder of pipeline cache
+    report_dir : str, optional
+        Folder of stage measurement reports and profiles
+    profile : bool
+        Whether to profile the pipeline with cProfile
+    trace_memory : bool
+        Whether to measure peak memory of stages
+    scoring : str, optional
+        Termhood score to rank terminology candidates by, one of SCORING_METHODS
+    min_score : float, optional
+        Lowest termhood score of terminology candidates to be kept, if scoring is given
+    max_def_length : int, optional
+        Length of the longest context sentence to be searched for definitions
+
+    Yields
+    ------
+    result : tuple
+        File path, list of TermEntry objects or None, and traceback or None
+    '''
+    worker = functools.partial(process_document, top_k=top_k, cache_dir=cache_dir, report_dir=report_dir,
+                               profile=profile, trace_memory=trace_memory, scoring=scoring, min_score=min_score,
+                               max_def_length=max_def_length)
+    if len(files) <= 1 or processes == 1:
+        yield from map(worker, files)
+        return
+
+    with multiprocessing.Pool(processes, initializer=init_worker, initargs=(cache_dir,)) as pool:
+        # Hands out one document at a time, so that long documents do not hold up short ones
+        for result in pool.imap_unordered(worker, files, chunksize=1):
+            yield result
+
+
+def entry_to_dict(file, entry):
+    '''Takes in file path and terminology entry, returns them as a dictionary that can be serialized to JSON.
+
+    Parameters
+    ----------
+    file : str
+        Path of .PDF file the entry was extracted from
+    entry : TermEntry
+        Terminology entry
+
+    Returns
+    -------
+    record : dict
+        File path, terminology candidate, definitions, context sentences and their page numbers
+    '''
+    return {'file': file,
+            'term': entry.get_term_candidate(),
+            'definitions': entry.get_definition(),
+            'context': entry.get_context(),
+            'pages': entry.get_pages()}
+
+
+# Columns of CSV output, lists of definitions, context sentences and pages are written one item per line
+CSV_FIELDS = ['file', 'term', 'definitions', 'context', 'pages', 'error']
+
+
+def entry_to_row(record):
+    '''Takes in dictionary of terminology entry or failed document, returns it as a CSV row.
+
+    Parameters
+    ----------
+    record : dict
+        Dictionary returned by entry_to_dict, or file path and error of failed document
+
+    Returns
+    -------
+    row : dict
+        CSV columns as keys and cell values as values
+    '''
+    return {field: '\n'.join(map(str, value)) if isinstance(value, list) else value
+            for field, value in record.items()}
+
+
+def main(argv=None):
+    '''Runs batch extraction from the command line. Writes one JSON object, or CSV row, per terminology entry
+    or per failed document to standard output as soon as each document finishes.
+
+    Parameters
+    ----------
+    argv : list, optional
+        Command line arguments, defaults to sys.argv[1:]
+
+    Returns
+    -------
+    status : int
+        0 if every document was processed, 1 otherwise
+    '''
+    parser = argparse.ArgumentParser(description='Extract terminology entries from many .PDF files.')
+    parser.add_argument('paths', nargs='+', help='.PDF files or folders containing them')
+    parser.add_argument('-p', '--processes', type=int, default=None, help='number of worker processes')
+    parser.add_argument('-k', '--top-k', type=int, default=None,
+                        help='keep only the k most frequent candidates, or the k best scoring ones with --score')
+    parser.add_argument('-s', '--score', choices=SCORING_METHODS, default=None,
+                        help='rank candidates by termhood score before extracting contexts and definitions; tf_idf '
+                             'treats the sentences of a document as documents, NC-value is not available')
+    parser.add_argument('--min-score', type=float, default=None, help='keep only candidates scoring at least this')
+    parser.add_argument('--max-def-length', type=int, default=None,
+                        help='search only context sentences of at most this many characters for definitions')
+    parser.add_argument('-c', '--cache', default=None, help='folder for caching pipeline stage outputs')
+    parser.add_argument('-f', '--format', choices=['jsonl', 'csv'], default='jsonl', help='output format')
+    parser.add_argument('-r', '--report', default=None,
+                        help='folder for per-stage measurements of every document, as JSON, bypasses cache')
+    parser.add_argument('--profile', action='store_true', help='also write a cProfile profile per document')
+    parser.add_argument('--trace-memory', action='store_true', help='also measure peak memory of every stage')
+    parser.add_argument('-g', '--glossary', default=None,
+                        help='SQLite glossary to merge entries into, files already in it are skipped')
+    args = parser.parse_args(argv)
+    if args.report is not None:
+        os.makedirs(args.report, exist_ok=True)
+
+    files = find_pdfs(args.paths)
+    store = None
+    if args.glossary is not None:
+        store = GlossaryStore(args.glossary)
+        hashes = {file: file_hash(file) for file in files if os.path.isfile(file)}
+        files = [file for file in files if file not in hashes or not store.has_document(file, hashes[file])]
+
+    if args.format == 'csv':
+        writer = csv.DictWriter(sys.stdout, CSV_FIELDS, restval='')
+        writer.writeheader()
+        write = lambda record: writer.writerow(entry_to_row(record))
+    else:
+        write = lambda record: print(json.dumps(record, ensure_ascii=False))
+
+    status = 0
+    for file, entries, error in batch_entries(files, args.processes, args.top_k, args.cache,
+                                              args.report, args.profile, args.trace_memory, args.score,
+                                              args.min_score, args.max_def_length):
+        if error is not None:
+            status = 1
+            write({'file': file, 'error': error})
+        else:
+            if store is not None:
+                store.add_entries(file, entries, hashes[file])
+            for entry in entries:
+                write(entry_to_dict(file, entry))
+        sys.stdout.flush()
+    if store is not None:
+        store.close()
+
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,1476 @@
+'''Benchmark Module
+
+This module times pipeline functions on synthetic input and checks that optimized code paths return the same
+output as the reference ones. It requires asyncio, gc, json, math, os, random, subprocess, sys, time, tracemalloc
+and urllib libraries, the extraction service, glossary store and prefix index modules, and PyMuPDF and NLTK.
+
+Functions
+---------
+synthetic_terms(n_terms, seed)
+    Generates list of distinct single- and multi-word terms
+synthetic_sentences(n_sents, seed)
+    Generates list of scientific-style sentences
+time_call(func, *args)
+    Calls a function, returns its result and elapsed wall time
+bench_extract_context(n_sents, n_cands, seed)
+    Times extract_context with and without sentence index, returns timings
+bench_extract_def(n_sents, n_cands, seed)
+    Times extract_def per candidate and extract_all_defs, returns timings
+fuzz_definitions(n_cases, seed)
+    Compares linear-time and regular expression definition matching on random sentences, returns number of checks
+bench_definition_worst_case(n_chars, seed)
+    Times definition matching on worst-case sentences, checks linear-time matching against its budget
+bench_pos_tagging(n_sents, processes, seed)
+    Times per-sentence nltk.pos_tag calls and pos_tagging, returns throughput
+random_tagged_sentences(n_sents, seed)
+    Generates list of POS-tagged sentences with random tags, including tags the chunk grammar nearly matches
+bench_chunking(n_sents, seed)
+    Times and measures chunking with parse trees and with tag codes, checks they find the same noun phrases
+synthetic_pdf(path, n_pages, seed, boilerplate, abbreviations)
+    Writes .PDF file with synthetic sentences, hyphenated across lines and pages, optionally with headers and footers
+bench_parallel_preprocess(n_pages, processes, seed)
+    Times pre-processing in page ranges in worker processes, checks output against the serial run
+peak_memory(func, *args)
+    Calls a function, returns its result and peak traced memory
+bench_stream_memory(n_pages, seed)
+    Measures peak memory of whole-document and streaming pre-processing, returns peaks
+bench_ingest(n_pages, seed)
+    Times text extraction from path, bytes and memory-mapped file, measures memory of opening content in place
+synthetic_raw_text(n_sents, seed)
+    Generates text the way pdf_to_text returns it, with line breaks, hyphenation, URLs and abbreviations
+bench_normalizer(n_sents, seed)
+    Times reference and fused sentence splitting, returns timings
+bench_span_document(n_sents, n_cands, seed)
+    Times and measures sentences kept as list of strings and as span document, returns timings and sizes
+bench_boilerplate(n_pages, seed)
+    Times removal of running headers and footers, checks text and entries against a file without them
+bench_memo(n_sents, repeat_share, seed)
+    Times POS tagging, noun phrase chunking and a fast tagger on repeated sentences with and without memos, returns
+    timings and hit rates
+bench_lazy_entries(n_sents, batch_size, seed)
+    Times chunking and listing of terminology entries made eagerly and lazily, returns timings and entry counts
+reference_c_value(index)
+    Takes in a candidate index, returns C-values computed candidate by candidate
+bench_scoring(n_sents, top_k, seed)
+    Times C-value scoring and entries made for all candidates and for the top_k best ones, returns timings
+retained_memory(func, *args)
+    Calls a function, returns its result, memory it still holds and peak traced memory
+bench_entry_memory(n_sents, seed)
+    Measures memory of terminology entries kept as lists of strings and as compact entries, returns sizes
+bench_type_ahead(n_terms, seed)
+    Times type-ahead filtering of terms by scanning and by prefix index, returns timings
+bench_glossary(n_docs, n_terms, n_contexts, seed)
+    Times merging documents into a glossary store and querying it, returns timings and number of context rows
+http_request(port, method, path, body)
+    Sends HTTP request to a service on localhost, returns status, headers and body of its response
+bench_service(n_docs, n_pages, workers, seed)
+    Times jobs of the extraction service on localhost, checks results, deduplication and backpressure
+heavy_imports(module)
+    Takes in a module name, returns heavy libraries importing it loads
+bench_startup(runs)
+    Times command line runs for --help and for a blank .PDF file, checks them against startup budget
+'''
+
+import asyncio, gc, json, math, os, random, subprocess, sys, time, tracemalloc, urllib.error, urllib.request
+from ExtractionService import *
+from GlossaryStore import *
+from PrefixIndex import *
+
+
+# Texts the fused normalizer must split like get_sentences, around the only string its non-text filter matches
+NORMALIZER_CASES = ['Set {x}~] holds here. Next one.', 'a}~]b}~]}~] c. d}~', '^_`´°{|}~] e.g. x.', '}~ ] ~]} }~].']
+
+# Vocabulary used for generating synthetic sentences
+ADJECTIVES = ['neural', 'semantic', 'lexical', 'statistical', 'terminological', 'syntactic', 'empirical',
+              'formal', 'digital', 'linguistic', 'qualitative', 'computational']
+NOUNS = ['network', 'corpus', 'term', 'definition', 'model', 'analysis', 'framework', 'extraction', 'method',
+         'concept', 'sentence', 'context', 'language', 'domain', 'feature', 'parser', 'ontology', 'annotation']
+VERBS = ['is', 'describes', 'refers to', 'defines', 'improves', 'uses', 'means', 'can be described as']
+FILLERS = ['in this paper', 'for example', 'as shown in Table 2', 'in 2019', 'according to the authors',
+           'that is,', 'namely', 'in most cases']
+INSERTS = ['e.g.', 'i.e.,', 'et al.', 'cf.', 'vs.', 'https://doi.org/10.1000/xyz123', 'see: doi:10.1000/182',
+           'jane.doe@example.org', 'pp. 12-15', 'Fig. 3']
+# Tags drawn for random tagged sentences, matching and nearly matching the chunk grammar
+CHUNK_TAGS = ['DT$', 'DT', 'JJ', 'JJR', 'JJS', 'NN', 'NNS', 'NNP', 'NNPS', 'NN$', 'VBZ', 'IN', 'PRP$', 'CD', '.',
+              ',', ':', '(', ')', '$', '``', "''", 'N', 'XNN', 'J', 'D']
+# Libraries that must not be loaded before they are needed
+HEAVY_MODULES = ['fitz', 'nltk', 'numpy', 'tkinter']
+
+# Maximum median wall time in seconds of command line runs, including interpreter startup
+STARTUP_BUDGET = {'help': 0.3, 'blank_pdf': 0.6}
+# Pieces of random sentences for definition matching: signal phrases, candidates, line breaks and characters
+# matched case-insensitively by other characters
+DEF_PIECES = ['term', 'Term', 'TERM', 'neural network', ' is ', ' are ', ', that is, ', ', that is ', ', namely ',
+              ' can be described as ', ' refers to ', ' refer to ', ' means ', ' says that ', ' — ', '—',
+              ' defines ', 'define ', 'describes ', ' describe ', '\n', ' ', '\t', 'x', 'A', '9', '-', '.', ',',
+              'data-set', 'ſ', 'ı', 'K', 'İ', 'ß', ' is\n', 'describes\n', ',\nthat\nis,\n']
+# Candidates with characters special in regular expressions, and text their unescaped patterns would match
+SPECIAL_TERMS = {'C++': None, 'f(x)': 'fx', '[1]': '1', 'a.b': 'azb', '*': None}
+DEF_TERMS = ['term', 'neural network', 'data-set', 'x', 'a', 'is', 'k', 's', 'i', 'that', 'describes']
+# Maximum wall time in seconds of linear-time definition matching of one worst-case sentence of 50,000 characters
+DEFINITION_BUDGET = 0.1
+# Lines repeated on the pages of synthetic papers with boilerplate
+RUNNING_HEADERS = ['J. Doe, R. Roe and A. N. Other', 'Terminology of neural corpus models: a survey']
+JOURNAL_BANNER = 'Journal of Synthetic Linguistics 12 (2024), pp. 100-{}, doi:10.1000/jsl.2024.12'
+LICENCE_LINE = 'This article is licensed under a Creative Commons Attribution 4.0 International License.'
+SYLLABLES = ['ka', 'to', 'ri', 'men', 'sol', 'ex', 'tra', 'vi', 'no', 'gen', 'lu', 'phor', 'der', 'am', 'bi']
+
+
+def synthetic_terms(n_terms, seed=0):
+    '''Generates list of distinct single- and multi-word terms made of real and pseudo-words, so that term
+    frequencies in generated text stay as sparse as in real papers.
+
+    Parameters
+    ----------
+    n_terms : int
+        Number of terms to generate
+    seed : int
+        Seed for random number generator
+
+    Returns
+    -------
+    terms : list
+        List of generated terms
+    '''
+    rng = random.Random(seed)
+    terms = []
+    seen = set()
+    while len(terms) < n_terms:
+        noun = rng.choice(NOUNS) if rng.random() < 0.2 else ''.join(rng.sample(SYLLABLES, rng.randint(2, 4)))
+        term = noun if rng.random() < 0.4 else rng.choice(ADJECTIVES) + ' ' + noun
+        if term not in seen:
+            seen.add(term)
+            terms.append(term)
+
+    return terms
+
+
+def synthetic_sentences(n_sents, seed=0):
+    '''Generates list of scientific-style sentences built from synthetic terms, verbs and filler phrases,
+    the way get_sentences would return them.
+
+    Parameters
+    ----------
+    n_sents : int
+        Number of sentences to generate
+    seed : int
+        Seed for random number generator
+
+    Returns
+    -------
+    sentences : list
+        List of generated sentences
+    '''
+    rng = random.Random(seed)
+    terms = synthetic_terms(max(n_sents // 10, 1), seed)
+    sentences = []
+    for _ in range(n_sents):
+        words = []
+        for _ in range(rng.randint(1, 3)):
+            words.append(rng.choice(terms))
+            words.append(rng.choice(VERBS))
+            words.append(rng.choice(FILLERS))
+        words.append(rng.choice(NOUNS))
+        sentence = ' '.join(words)
+        sentences.append(sentence[0].upper() + sentence[1:])
+
+    return sentences
+
+
+def time_call(func, *args):
+    '''Calls a function with given arguments and measures elapsed wall time.
+
+    Parameters
+    ----------
+    func : function
+        Function to be timed
+    *args
+        Arguments passed to function
+
+    Returns
+    -------
+    result : object
+        Value returned by function
+    elapsed : float
+        Elapsed wall time in seconds
+    '''
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+
+    return result, elapsed
+
+
+def bench_extract_context(n_sents=20000, n_cands=500, seed=0):
+    '''Times extract_context for a list of candidates, once rescanning every sentence and once answering from
+    a sentence index. Raises AssertionError if the two modes return different context sentences.
+
+    Parameters
+    ----------
+    n_sents : int
+        Number of sentences to search
+    n_cands : int
+        Number of terminology candidates to look up
+    seed : int
+        Seed for random number generator
+
+    Returns
+    -------
+    timings : dict
+        Elapsed seconds for scan, index build and indexed lookups
+    '''
+    sentences = synthetic_sentences(n_sents, seed)
+    candidates = random.Random(seed).sample(synthetic_terms(max(n_sents // 10, 1), seed), n_cands)
+
+    scanned, scan_time = time_call(lambda: [extract_context(c, sentences) for c in candidates])
+    index, build_time = time_call(SentenceIndex, sentences)
+    indexed, lookup_time = time_call(lambda: [extract_context(c, sentences, index) for c in candidates])
+    assert scanned == indexed, 'Indexed extract_context returned different context sentences'
+
+    return {'scan': scan_time, 'index_build': build_time, 'indexed_lookup': lookup_time}
+
+
+def bench_extract_def(n_sents=20000, n_cands=500, seed=0):
+    '''Times definition extraction for a list of candidates, once calling extract_def for every candidate and
+    once scanning every context sentence a single time with extract_all_defs. Raises AssertionError if the two
+    return different definitions.
+
+    Parameters
+    ----------
+    n_sents : int
+        Number of sentences to search
+    n_cands : int
+        Number of terminology candidates to look up
+    seed : int
+        Seed for random number generator
+
+    Returns
+    -------
+    timings : dict
+        Elapsed seconds for per-candidate and single-pass extraction
+    '''
+    sentences = synthetic_sentences(n_sents, seed)
+    candidates = random.Random(seed).sample(synthetic_terms(max(n_sents // 10, 1), seed), n_cands)
+    index = SentenceIndex(sentences)
+    contexts = {c: extract_context(c, sentences, index) for c in candidates}
+
+    per_candidate, per_candidate_time = time_call(lambda: {c: extract_def(c, contexts[c]) for c in candidates})
+    single_pass, single_pass_time = time_call(extract_all_defs, contexts)
+    assert per_candidate == single_pass, 'extract_all_defs returned different definitions'
+
+    return {'per_candidate': per_candidate_time, 'single_pass': single_pass_time}
+
+
+def fuzz_definitions(n_cases=20000, seed=0):
+    '''Matches definitions of candidates in random sentences made of signal phrases, candidates, line breaks and
+    characters with case-insensitive counterparts, in linear time and with regular expressions. Raises
+    AssertionError if the two modes return different definitions, or if candidates with characters special in
+    regular expressions are not matched literally.
+
+    Parameters
+    ----------
+    n_cases : int
+        Number of random sentences
+    seed : int
+        Seed for random number generator
+
+    Returns
+    -------
+    n_checks : int
+        Number of candidates and sentences compared
+    '''
+    rng = random.Random(seed)
+    n_checks = 0
+    for _ in range(n_cases):
+        sentence = ''.join(rng.choice(DEF_PIECES) for _ in range(rng.randint(0, 14)))
+        for term in DEF_TERMS:
+            assert extract_def(term, [sentence]) == extract_def(term, [sentence], linear=False), \
+                'Linear-time matching of {!r} in {!r} returned different definitions'.format(term, sentence)
+            n_checks += 1
+
+    for term, lookalike in SPECIAL_TERMS.items():
+        assert extract_def(term, ['In short, {} is a name.'.format(term)]) == [term + ' is a name.'], \
+            'Candidate {!r} was not matched literally'.format(term)
+        if lookalike is not None:
+            assert extract_def(term, ['In short, {} is a name.'.format(lookalike)]) == [], \
+                'Candidate {!r} matched other text'.format(term)
+
+    return n_checks
+
+
+def bench_definition_worst_case(n_chars=5000, seed=0):
+    '''Times definition matching on worst-case sentences of reference lists and tables: long runs of letters,
+    of words without signal phrases, of signal phrases without definitions and of line breaks. Sentences of
+    n_chars characters are matched in linear time and with regular expressions, and sentences ten times as long in
+    linear time only. Raises AssertionError if the two modes return different definitions, or if linear-time
+    matching of a long sentence exceeds DEFINITION_BUDGET.
+
+    Parameters
+    ----------
+    n_chars : int
+        Length of worst-case sentences matched in both modes
+    seed : int
+        Seed for random number generator
+
+    Returns
+    -------
+    timings : dict
+        Worst-case sentence kinds as keys, and elapsed seconds of regular expression and of linear-time matching,
+        and of linear-time matching of sentences ten times as long, as values
+    '''
+    rng = random.Random(seed)
+    units = {'letters': 'a', 'words': 'The {} '.format(rng.choice(NOUNS)), 'signal phrases': 'term is ',
+             'definition after': 'x describes y ', 'line breaks': 'term is a\n'}
+    candidates = ['term', ' '.join(rng.sample(ADJECTIVES, 2))]
+    match = lambda sentence, linear: [extract_def(c, [sentence], linear=linear) for c in candidates]
+
+    timings = {}
+    for kind, unit in units.items():
+        sentence = unit * (n_chars // len(unit))
+        regex_defs, regex_time = time_call(match, sentence, False)
+        linear_defs, linear_time = time_call(match, sentence, True)
+        assert regex_defs == linear_defs, 'Linear-time matching returned different definitions for ' + kind
+        long_time = time_call(match, sentence * 10, True)[1] / len(candidates)
+        assert long_time <= DEFINITION_BUDGET, 'Matching {} took {:.3f} s, budget is {:.3f} s'.format(
+            kind, long_time, DEFINITION_BUDGET)
+        timings[kind] = {'regex': regex_time, 'linear': linear_time, 'linear_long': long_time}
+
+    return timings
+
+
+def bench_pos_tagging(n_sents=20000, processes=None, seed=0):
+    '''Measures POS tagging throughput, once calling nltk.pos_tag for every sentence and once with batched
+    pos_tagging. Raises AssertionError if the two return different tags.
+
+    Parameters
+    ----------
+    n_sents : int
+        Number of sentences to tag
+    processes : int, optional
+        Number of worker processes for pos_tagging
+    seed : int
+        Seed for random number generator
+
+    Returns
+    -------
+    throughput : dict
+        Sentences per second for per-sentence and batched tagging
+    '''
+    cleaned = sents_for_pos(synthetic_sentences(n_sents, seed))
+    tokens = [[t for t in sentence.split(' ') if t != ''] for sentence in cleaned]
+
+    import nltk
+    per_sentence, per_sentence_time = time_call(lambda: [nltk.pos_tag(token) for token in tokens])
+    batched, batched_time = time_call(pos_tagging, cleaned, 2000, processes, False)
+    assert per_sentence == batched, 'pos_tagging returned different tags'
+
+    return {'per_sentence': n_sents / per_sentence_time, 'batched': n_sents / batched_time}
+
+
+def random_tagged_sentences(n_sents=20000, seed=0):
+    '''Generates POS-tagged sentences of synthetic words with random tags. Besides the tags of the chunk
+    grammar, tags are drawn that only nearly match it, e.g. DT, JJR and NN-less tags, and tags that contain
+    regular expression characters.
+
+    Parameters
+    ----------
+    n_sents : int
+        Number of sentences to generate
+    seed : int
+        Seed for random number generator
+
+    Returns
+    -------
+    tagged_sents : list
+        List of lists of word and tag tuples
+    '''
+    rng = random.Random(seed)
+    words = synthetic_terms(200, seed)
+    tags = CHUNK_TAGS + ['NN', 'NNS', 'JJ']
+    tagged_sents = []
+    for _ in range(n_sents):
+        tagged_sents.append([(rng.choice(words), rng.choice(tags)) for _ in range(rng.randint(0, 30))])
+
+    return tagged_sents
+
+
+def bench_chunking(n_sents=20000, seed=0):
+    '''Times chunking with NLTK parse trees followed by iter_chunks, and phrase_chunking over tag codes, on
+    sentences tagged by pos_tagging and on sentences with random tags, and measures their peak memory. Raises
+    AssertionError if they find different noun phrases in any sentence.
+
+    Parameters
+    ----------
+    n_sents : int
+        Number of sentences of each kind
+    seed : int
+        Seed for random number generator
+
+    Returns
+    -------
+    results : dict
+        Elapsed seconds and peak memory in bytes of chunking with parse trees and with tag codes
+    '''
+    tagged = pos_tagging(sents_for_pos(synthetic_sentences(n_sents, seed))) + random_tagged_sentences(n_sents, seed)
+    get_chunker()
+
+    trees = lambda: [list(iter_chunks([tree])) for tree in chunking(tagged)]
+    with_trees, trees_time = time_call(trees)
+    with_codes, codes_time = time_call(phrase_chunking, tagged, False)
+    assert with_trees == with_codes, 'phrase_chunking found different noun phrases'
+    trees_peak = peak_memory(trees)[1]
+    codes_peak = peak_memory(phrase_chunking, tagged, False)[1]
+
+    return {'trees': trees_time, 'codes': codes_time, 'trees_peak': trees_peak, 'codes_peak': codes_peak}
+
+
+def synthetic_pdf(path, n_pages, seed=0, boilerplate=False, abbreviations=False):
+    '''Writes .PDF file with synthetic sentences. Lines are broken mid-word with a hyphen, as in typeset papers,
+    and every page ends in the middle of a sentence. If boilerplate is True, every page also has a running header,
+    alternating between even and odd pages, a journal banner, a licence line and a footer with its page number.
+    If abbreviations is True, abbreviations, URLs, DOIs and e-mail addresses are inserted between words, and a
+    word divided between two pages is hyphenated too.
+
+    Parameters
+    ----------
+    path : str
+        Path of .PDF file to be written
+    n_pages : int
+        Number of pages
+    seed : int
+        Seed for random number generator
+    boilerplate : bool
+        Whether to add running headers and footers
+    abbreviations : bool
+        Whether to add abbreviations and hyphenate words divided between pages
+
+    Returns
+    -------
+    None
+    '''
+    import fitz
+    sentences = synthetic_sentences(40 * n_pages, seed)
+    text = '. '.join(sentences) + '.'
+    if abbreviations:
+        rng = random.Random(seed)
+        # Inserts an abbreviation, URL, DOI or e-mail address after about every 20th word
+        text = ' '.join(word + ' ' + rng.choice(INSERTS) if rng.random() < 0.05 else word for word in text.split(' '))
+    page_len = len(text) // n_pages
+    doc = fitz.open()
+    for page_no in range(n_pages):
+        end = (page_no + 1) * page_len if page_no < n_pages - 1 else len(text)
+        page_text = text[page_no * page_len:end]
+        lines = []
+        # Breaks text into lines of about 90 characters, hyphenating words split at line end
+        while len(page_text) > 90:
+            cut = page_text.rfind(' ', 0, 90)
+            if cut < 60:
+                lines.append(page_text[:88] + '-')
+                page_text = page_text[88:]
+            else:
+                lines.append(page_text[:cut])
+                page_text = page_text[cut + 1:]
+        lines.append(page_text)
+        if abbreviations and end < len(text) and not text[end - 1].isspace() and not text[end].isspace():
+            lines[-1] += '-'
+        page = doc.new_page()
+        if boilerplate:
+            header = RUNNING_HEADERS[page_no % 2]
+            page.insert_text((36, 16), '{}\n{}'.format(header, JOURNAL_BANNER.format(page_no + 1)), fontsize=6)
+        page.insert_text((36, 36), '\n'.join(lines), fontsize=7)
+        if boilerplate:
+            page.insert_text((36, page.rect.height - 24), '{}\nPage {} of {}'.format(LICENCE_LINE, page_no + 1,
+                                                                                    n_pages), fontsize=6)
+    doc.save(path)
+    doc.close()
+
+
+def bench_parallel_preprocess(n_pages=12, processes=2, seed=0, path='benchmark_parallel.pdf'):
+    '''Times pre-processing of a synthetic .PDF file with words hyphenated across pages and abbreviations, whole
+    and in page ranges of 1, 5 and 50 pages in worker processes. Raises AssertionError if sentences, noun phrases
+    or terminology entries of worker processes differ from those of the serial run.
+
+    Parameters
+    ----------
+    n_pages : int
+        Number of pages
+    processes : int
+        Number of worker processes
+    seed : int
+        Seed for random number generator
+    path : str
+        Path of temporary .PDF file
+
+    Returns
+    -------
+    timings : dict
+        Elapsed seconds of serial pre-processing and of pre-processing in worker processes per pages per range
+    '''
+    # Compares entries without their pages, which worker processes do not know
+    without_pages = lambda entries: [(entry.get_term_candidate(), entry.get_definition(), entry.get_context())
+                                     for entry in entries]
+
+    synthetic_pdf(path, n_pages, seed, abbreviations=True)
+    try:
+        (sentences, chunked_sents), serial_time = time_call(lambda: preprocess_text(pdf_to_text(path)))
+        entries = without_pages(create_entry(path))
+        timings = {'serial': serial_time}
+        for pages_per_range in (1, 5, 50):
+            (range_sents, range_chunked), timings[pages_per_range] = time_call(parallel_preprocess, path, processes,
+                                                                               pages_per_range)
+            assert range_sents == sentences, 'parallel_preprocess returned different sentences'
+            assert range_chunked == chunked_sents, 'parallel_preprocess returned different noun phrases'
+        assert without_pages(create_entry(path, processes=processes)) == entries, \
+            'create_entry returned different entries with worker processes'
+    finally:
+        os.remove(path)
+
+    return timings
+
+
+def peak_memory(func, *args):
+    '''Calls a function with given arguments and measures peak memory allocated while it runs.
+
+    Parameters
+    ----------
+    func : function
+        Function to be measured
+    *args
+        Arguments passed to function
+
+    Returns
+    -------
+    result : object
+        Value returned by function
+    peak : int
+        Peak traced memory in bytes
+    '''
+    tracemalloc.start()
+    try:
+        result = func(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return result, peak
+
+
+def bench_stream_memory(n_pages=200, seed=0, path='benchmark_stream.pdf'):
+    '''Measures peak memory of pre-processing a synthetic .PDF file as a whole and as a stream of pages, and times
+    them, together with streaming that tags sentences one at a time. Parse trees are only counted, so that what
+    is measured is the memory pre-processing itself holds. Raises
+    AssertionError if the two modes return different sentences or noun phrases or streaming does not use less
+    memory.
+
+    Parameters
+    ----------
+    n_pages : int
+        Number of pages of synthetic .PDF file
+    seed : int
+        Seed for random number generator
+    path : str
+        Path of synthetic .PDF file, removed afterwards
+
+    Returns
+    -------
+    peaks : dict
+        Peak memory in bytes for whole-document and streaming pre-processing, and elapsed seconds of whole-document
+        pre-processing and of streaming with batches of sentences and with single sentences
+    '''
+    synthetic_pdf(path, n_pages, seed, abbreviations=True)
+    try:
+        get_tagger()
+        whole_peak = peak_memory(lambda: len(preprocess_text(pdf_to_text(path))[1]))[1]
+        stream_peak = peak_memory(lambda: sum(1 for _ in stream_preprocess(path)))[1]
+        clear_memos()
+        (sentences, chunked_sents), whole_time = time_call(lambda: preprocess_text(pdf_to_text(path)))
+        clear_memos()
+        streamed, stream_time = time_call(lambda: list(stream_preprocess(path)))
+        clear_memos()
+        single_time = time_call(lambda: sum(1 for _ in stream_preprocess(path, 1)))[1]
+        clear_memos()
+    finally:
+        os.remove(path)
+    assert [sentence for sentence, _ in streamed] == sentences, 'Streaming pre-processing returned different sentences'
+    assert [phrases for _, phrases in streamed] == chunked_sents, \
+        'Streaming pre-processing returned different noun phrases'
+    assert stream_peak < whole_peak, 'Streaming pre-processing did not reduce peak memory'
+
+    return {'whole': whole_peak, 'stream': stream_peak, 'whole_time': whole_time, 'stream_time': stream_time,
+            'single_time': single_time}
+
+
+def bench_ingest(n_pages=200, seed=0, path='benchmark_ingest.pdf'):
+    '''Times text extraction of a synthetic .PDF file appending page texts one by one and joining them once with
+    page offsets, from a path, from bytes and from a memory-mapped file, and measures peak memory of opening its
+    content in a bytearray in place and as a copy. Raises AssertionError if the ways of reading return different
+    text, if sentences split page by page differ from split_sentences or if opening in place does not save memory.
+
+    Parameters
+    ----------
+    n_pages : int
+        Number of pages of synthetic .PDF file
+    seed : int
+        Seed for random number generator
+    path : str
+        Path of synthetic .PDF file, removed afterwards
+
+    Returns
+    -------
+    results : dict
+        Elapsed seconds of every way of reading and of splitting sentences with and without page numbers, and
+        peak memory in bytes of opening content in place and as a copy
+    '''
+    import fitz, mmap
+
+    def append_pages(pdf):
+        # Reference extraction, as pdf_to_text used to do it, noting where pages start
+        text = ''
+        starts = []
+        for page in fitz.open(pdf):
+            starts.append(len(text))
+            text += page.get_text()
+        return text, starts
+
+    def open_copy(content):
+        with fitz.open(stream=bytes(content), filetype='pdf') as doc:
+            return doc.page_count
+
+    def open_in_place(content):
+        with open_pdf(content) as doc:
+            return doc.page_count
+
+    synthetic_pdf(path, n_pages, seed)
+    try:
+        with open(path, 'rb') as f:
+            content = f.read()
+        (reference, reference_starts), append_time = time_call(append_pages, path)
+        (text, page_starts), path_time = time_call(pdf_to_pages, path)
+        bytes_time = time_call(pdf_to_pages, content)[1]
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            mmap_text, mmap_time = time_call(pdf_to_text, mapped)
+        buffer = bytearray(content)
+        copy_peak = peak_memory(open_copy, buffer)[1]
+        in_place_peak = peak_memory(open_in_place, buffer)[1]
+    finally:
+        os.remove(path)
+    assert text == reference == mmap_text, 'Joined page texts differ from appended ones'
+    assert page_starts.tolist() == reference_starts, 'Page offsets differ from page text lengths'
+    sentences, split_time = time_call(split_sentences, text)
+    (page_sentences, sent_pages), page_split_time = time_call(split_page_sentences, text, page_starts)
+    assert page_sentences == sentences, 'Sentences split page by page differ from split_sentences'
+    assert in_place_peak < copy_peak, 'Opening content in place did not save memory'
+
+    return {'append': append_time, 'join_path': path_time, 'join_bytes': bytes_time, 'join_mmap': mmap_time,
+            'split_sentences': split_time, 'split_page_sentences': page_split_time, 'copy_peak': copy_peak,
+            'in_place_peak': in_place_peak}
+
+
+def synthetic_raw_text(n_sents=20000, seed=0, sentences=None):
+    '''Generates text the way pdf_to_text returns it: synthetic sentences with abbreviations, URLs, DOIs and
+    e-mail addresses inserted, broken into lines of about 90 characters with hyphenated words.
+
+    Parameters
+    ----------
+    n_sents : int
+        Number of sentences to generate
+    seed : int
+        Seed for random number generator
+    sentences : list, optional
+        Sentences to be used instead of generated ones
+
+    Returns
+    -------
+    text : str
+        Generated text
+    '''
+    rng = random.Random(seed)
+    if sentences is None:
+        sentences = synthetic_sentences(n_sents, seed)
+    # Inserts an abbreviation, URL, DOI or e-mail address after about every 20th word
+    words = []
+    for word in ' '.join(sentence + '.' for sentence in sentences).split(' '):
+        words.append(word)
+        if rng.random() < 0.05:
+            words.append(rng.choice(INSERTS))
+    lines = []
+    line = ''
+    for word in words:
+        if len(line) + len(word) > 90:
+            # Hyphenates every third word that does not fit on the line
+            if len(word) > 5 and rng.random() < 0.3:
+                lines.append(line + ' ' + word[:3] + '-')
+                line = word[3:]
+            else:
+                lines.append(line)
+                line = word
+        else:
+            line = line + ' ' + word if line else word
+    lines.append(line)
+
+    return '\n'.join(lines)
+
+
+def bench_normalizer(n_sents=20000, seed=0):
+    '''Times sentence splitting of raw text with remove_division and get_sentences, and with fused
+    split_sentences. Raises AssertionError if the two return different sentences, for raw text or for any of
+    NORMALIZER_CASES.
+
+    Parameters
+    ----------
+    n_sents : int
+        Number of sentences of raw text
+    seed : int
+        Seed for random number generator
+
+    Returns
+    -------
+    timings : dict
+        Elapsed seconds for reference and fused sentence splitting
+    '''
+    text = synthetic_raw_text(n_sents, seed)
+
+    reference, reference_time = time_call(lambda: get_sentences(remove_division(text)))
+    fused, fused_time = time_call(split_sentences, text)
+    assert reference == fused, 'split_sentences returned different sentences'
+    for case in NORMALIZER_CASES:
+        assert get_sentences(remove_division(case)) == split_sentences(case) == list(split_document(case)), \
+            'split_sentences returned different sentences for {!r}'.format(case)
+
+    return {'reference': reference_time, 'fused': fused_time}
+
+
+def bench_span_document(n_sents=20000, n_cands=500, seed=0):
+    '''Times and measures sentences of raw text kept as a list of strings, casefolded one by one, and as a span
+    document with one casefolded shadow buffer, from splitting through POS tagging input to context sentences.
+    Raises AssertionError if the two return different sentences, POS tagging input or context sentences.
+
+    Parameters
+    ----------
+    n_sents : int
+        Number of sentences of raw text
+    n_cands : int
+        Number of terminology candidates to look up
+    seed : int
+        Seed for random number generator
+
+    Returns
+    -------
+    results : dict
+        Elapsed seconds of splitting, preparing POS tagging input and extracting context sentences for sentence
+        lists and span documents, and memory in bytes they hold
+    '''
+    text = synthetic_raw_text(n_sents, seed)
+    candidates = random.Random(seed).sample(synthetic_terms(max(n_sents // 10, 1), seed), n_cands)
+
+    def split_list(text):
+        # Reference model, a list of sentences and a list of their casefolded copies
+        sentences = split_sentences(text)
+        return sentences, [sentence.casefold() for sentence in sentences]
+
+    def list_contexts(sentences, folded, index):
+        # Reference extraction, slicing and searching every sentence on its own
+        contexts = {}
+        for term_cand in candidates:
+            context, seen = [], set()
+            for i in index.lookup(term_cand):
+                s, folded_s = sentences[i], folded[i]
+                if term_cand in folded_s and s not in seen and term_cand in re.findall(r'\b' + term_cand + r'\b',
+                                                                                      folded_s):
+                    first_letter = re.search(r'[A-Z0-9]', s)
+                    if first_letter is not None:
+                        seen.add(s[first_letter.start():])
+                        context.append(s[first_letter.start():])
+            contexts[term_cand] = context
+        return contexts
+
+    (sentences, folded), list_memory, _ = retained_memory(split_list, text)
+    list_split_time = time_call(split_list, text)[1]
+    document, span_memory, _ = retained_memory(split_document, text)
+    span_split_time = time_call(split_document, text)[1]
+    assert list(document) == sentences, 'split_document returned different sentences'
+
+    list_pos, list_pos_time = time_call(sents_for_pos, sentences)
+    span_pos, span_pos_time = time_call(sents_for_pos, document)
+    assert list_pos == span_pos, 'sents_for_pos returned different input for span document'
+
+    list_index = SentenceIndex(sentences)
+    list_result, list_context_time = time_call(list_contexts, sentences, folded, list_index)
+    span_index = SentenceIndex(document)
+    span_result, span_context_time = time_call(extract_contexts, candidates, document, span_index)
+    assert list_result == span_result[0], 'Span document returned different context sentences'
+
+    return {'list_split': list_split_time, 'span_split': span_split_time, 'list_pos': list_pos_time,
+            'span_pos': span_pos_time, 'list_contexts': list_context_time, 'span_contexts': span_context_time,
+            'list_memory': list_memory, 'span_memory': span_memory}
+
+
+def bench_boilerplate(n_pages=50, seed=0, path='benchmark_boilerplate.pdf'):
+    '''Times removal of running headers and footers from a synthetic .PDF file that has them. Raises
+    AssertionError if the text left, its page offsets or the terminology entries differ from those of the same
+    file written without headers and footers, whether pages are pre-processed whole, streamed or in worker
+    processes.
+
+    Parameters
+    ----------
+    n_pages : int
+        Number of pages
+    seed : int
+        Seed for random number generator
+    path : str
+        Path of temporary .PDF file, the file without headers and footers is written next to it
+
+    Returns
+    -------
+    results : dict
+        Elapsed seconds of removal, and numbers of characters and sentences before and after it
+    '''
+    plain_path = os.path.splitext(path)[0] + '_plain.pdf'
+    synthetic_pdf(path, n_pages, seed, boilerplate=True)
+    synthetic_pdf(plain_path, n_pages, seed)
+    try:
+        text, page_starts = pdf_to_pages(path)
+        plain_text, plain_starts = pdf_to_pages(plain_path)
+        (kept_text, kept_starts), remove_time = time_call(remove_boilerplate, text, page_starts)
+        assert kept_text == plain_text, 'remove_boilerplate left text differing from the plain file'
+        assert list(kept_starts) == list(plain_starts), 'remove_boilerplate returned different page offsets'
+        clear_memos()
+        entries = [entry_to_dict(path, entry) for entry in create_entry(path)]
+        clear_memos()
+        plain_entries = [entry_to_dict(path, entry) for entry in create_entry(plain_path)]
+        # Streamed entries and those of worker processes have no pages
+        without_pages = [dict(record, pages=None) for record in plain_entries]
+        for options in ({'stream': True}, {'processes': 2}):
+            assert [entry_to_dict(path, entry) for entry in create_entry(path, **options)] == without_pages, \
+                'Headers and footers changed terminology entries with {}'.format(options)
+    finally:
+        os.remove(path)
+        os.remove(plain_path)
+    assert entries == plain_entries, 'Headers and footers changed terminology entries'
+
+    return {'remove': remove_time, 'characters': len(text), 'kept_characters': len(kept_text),
+            'sentences': len(split_document(text, page_starts)),
+            'kept_sentences': len(split_document(kept_text, kept_starts))}
+
+
+def bench_memo(n_sents=20000, repeat_share=0.2, seed=0):
+    '''Times POS tagging and noun phrase chunking of sentences, a share of which are captions and table cells
+    repeated throughout, with and without sentence memos. Also times a tagger as fast as building memo keys, giving
+    every token the same tag, alone and through a memo, for which memo lookups cost more than they save at low hit
+    rates. Raises AssertionError if memoized tags or noun phrases differ.
+
+    Parameters
+    ----------
+    n_sents : int
+        Number of sentences
+    repeat_share : float
+        Share of sentences replaced by repeated ones
+    seed : int
+        Seed for random number generator
+
+    Returns
+    -------
+    results : dict
+        Elapsed seconds of tagging, chunking and fast tagging with and without memos, and hit rates of memos
+    '''
+    rng = random.Random(seed)
+    sentences = synthetic_sentences(n_sents, seed)
+    repeated = ['Table {} {}'.format(i + 1, s) for i, s in enumerate(synthetic_sentences(20, seed + 1))]
+    repeated += ['{} {}'.format(rng.choice(ADJECTIVES), rng.choice(NOUNS)) for i in range(20)] + [LICENCE_LINE]
+    for i in range(n_sents):
+        if rng.random() < repeat_share:
+            sentences[i] = rng.choice(repeated)
+    cleaned = sents_for_pos(sentences)
+
+    clear_memos()
+    tagged, tag_time = time_call(pos_tagging, cleaned, 2000, None, False)
+    memo_tagged, memo_tag_time = time_call(pos_tagging, cleaned)
+    assert memo_tagged == tagged, 'Memoized pos_tagging returned different tags'
+    phrases, chunk_time = time_call(phrase_chunking, tagged, False)
+    memo_phrases, memo_chunk_time = time_call(phrase_chunking, tagged)
+    assert memo_phrases == phrases, 'Memoized phrase_chunking returned different noun phrases'
+    results = {'tag': tag_time, 'memo_tag': memo_tag_time, 'tag_hit_rate': get_tag_memo().get_hit_rate(),
+               'chunk': chunk_time, 'memo_chunk': memo_chunk_time, 'chunk_hit_rate': get_chunk_memo().get_hit_rate()}
+    clear_memos()
+
+    # Keys are built inside the timed call, as pos_tagging builds them
+    tokens = [sentence.split() for sentence in cleaned]
+    fast_tag = lambda sents: [[(token, 'NN') for token in sent_tokens] for sent_tokens in sents]
+    memo = SentenceMemo(MEMO_SIZE)
+    memo_fast_tag = lambda: memo.map_batch(fast_tag, [' '.join(sent_tokens) for sent_tokens in tokens], tokens)
+    fast_tagged, fast_time = time_call(fast_tag, tokens)
+    memo_fast_tagged, memo_fast_time = time_call(memo_fast_tag)
+    assert memo_fast_tagged == fast_tagged, 'Memoized fast tagger returned different tags'
+    results.update({'fast_tag': fast_time, 'memo_fast_tag': memo_fast_time, 'fast_hit_rate': memo.get_hit_rate()})
+
+    return results
+
+
+def bench_lazy_entries(n_sents=20000, batch_size=200, seed=0):
+    '''Times how long it takes, once parts of speech are tagged, to chunk sentences and to get the list of
+    terminology entries made eagerly, with context sentences and definitions, and lazily, for candidates which may
+    have a definition, as well as the first batch_size lazy entries checked to have one. Raises AssertionError if
+    lazy entries having a definition list different candidates or, once accessed, different context sentences or
+    definitions than eager ones.
+
+    Parameters
+    ----------
+    n_sents : int
+        Number of sentences
+    batch_size : int
+        Number of lazy entries checked for the first batch
+    seed : int
+        Seed for random number generator
+
+    Returns
+    -------
+    timings : dict
+        Elapsed seconds for chunking, eager and lazy entry lists and first checked batch, and numbers of
+        candidates, lazy entries and eager entries
+    '''
+    sentences = synthetic_sentences(n_sents, seed)
+    tagged = pos_tagging(sents_for_pos(sentences))
+    chunks, chunking_time = time_call(phrase_chunking, tagged)
+    candidates = select_candidates(chunks)
+    index = SentenceIndex(sentences)
+
+    def eager():
+        contexts = {candidate: extract_context(candidate, sentences, index) for candidate in candidates}
+        return make_entries(contexts, extract_all_defs(contexts))
+
+    def lazy():
+        definable = find_definable(candidates, sentences, index)
+        table = SentenceTable()
+        return [LazyTermEntry(candidate, sentences, index, table) for candidate in candidates if candidate in definable]
+
+    def first_batch():
+        return [entry for entry in lazy()[:batch_size] if entry.has_definition()]
+
+    eager_entries, eager_time = time_call(eager)
+    lazy_entries, lazy_time = time_call(lazy)
+    _, first_time = time_call(first_batch)
+    dump = lambda entries: [(e.get_term_candidate(), e.get_definition(), e.get_context()) for e in entries]
+    assert dump(eager_entries) == dump(e for e in lazy_entries if e.has_definition()), \
+        'Lazy entries differ from eager ones'
+
+    return {'chunking': chunking_time, 'eager': eager_time, 'lazy': lazy_time, 'first_batch': first_time,
+            'candidates': len(candidates), 'lazy_entries': len(lazy_entries), 'eager_entries': len(eager_entries)}
+
+
+def reference_c_value(index):
+    '''Takes in a candidate index, returns C-values of its candidates computed one candidate at a time by
+    comparing it with every longer candidate, as the C-value definition reads.
+
+    Parameters
+    ----------
+    index : TermCandidateIndex
+        Index of terminology candidates with their counts
+
+    Returns
+    -------
+    scores : list
+        C-values of candidates, in order of first occurrence
+    '''
+    candidates = index.get_candidates()
+    words = {candidate: candidate.split(' ') for candidate in candidates}
+
+    def occurrences(short, long):
+        return sum(1 for start in range(len(long) - len(short) + 1) if long[start:start + len(short)] == short)
+
+    frequencies = {}
+    for candidate in candidates:
+        frequencies[candidate] = index.get_count(candidate) + sum(
+            index.get_count(other) * occurrences(words[candidate], words[other])
+            for other in candidates if len(words[other]) > len(words[candidate]))
+    scores = []
+    for candidate in candidates:
+        containing = [other for other in candidates
+                      if len(words[other]) > len(words[candidate]) and occurrences(words[candidate], words[other])]
+        nested_share = sum(frequencies[other] for other in containing) / len(containing) if containing else 0
+        scores.append(math.log2(len(words[candidate]) + 1) * (frequencies[candidate] - nested_share))
+
+    return scores
+
+
+def bench_scoring(n_sents=20000, top_k=100, seed=0):
+    '''Times C-value scoring of all candidates at once, and entries made, once parse trees are ready, for all
+    candidates and for the top_k best scoring ones. Raises AssertionError if scores differ from those computed
+    candidate by candidate, on the first 2000 sentences, or if top_k entries differ from entries of all candidates.
+
+    Parameters
+    ----------
+    n_sents : int
+        Number of sentences
+    top_k : int
+        Number of best scoring candidates to be kept
+    seed : int
+        Seed for random number generator
+
+    Returns
+    -------
+    timings : dict
+        Elapsed seconds for scoring, entries of all candidates and entries of top_k candidates
+    '''
+    sentences = synthetic_sentences(n_sents, seed)
+    chunks = phrase_chunking(pos_tagging(sents_for_pos(sentences)))
+    index = SentenceIndex(sentences)
+
+    sample = TermCandidateIndex()
+    get_chunks(chunks[:2000], sample)
+    scores = score_candidates(sample, 'c_value').tolist()
+    assert all(math.isclose(score, reference, abs_tol=1e-9)
+               for score, reference in zip(scores, reference_c_value(sample))), 'C-values differ from reference'
+
+    def entries(candidates):
+        contexts = {candidate: extract_context(candidate, sentences, index) for candidate in candidates}
+        return make_entries(contexts, extract_all_defs(contexts))
+
+    candidates = TermCandidateIndex()
+    get_chunks(chunks, candidates)
+    ranked, scoring_time = time_call(rank_candidates, candidates, 'c_value', top_k)
+    all_entries, all_time = time_call(entries, candidates.get_candidates())
+    top_entries, top_time = time_call(entries, ranked)
+    dump = {entry.get_term_candidate(): (entry.get_definition(), entry.get_context()) for entry in all_entries}
+    assert all(dump[entry.get_term_candidate()] == (entry.get_definition(), entry.get_context())
+               for entry in top_entries), 'Entries of top_k candidates differ from entries of all candidates'
+
+    return {'scoring': scoring_time, 'all': all_time, 'top_k': top_time}
+
+
+def retained_memory(func, *args):
+    '''Calls a function with given arguments and measures memory allocated while it runs and still held once it
+    returns, i.e. the size of its result, as well as peak memory.
+
+    Parameters
+    ----------
+    func : function
+        Function to be measured
+    *args
+        Arguments passed to function
+
+    Returns
+    -------
+    result : object
+        Value returned by function
+    retained : int
+        Traced memory in bytes still allocated after the call
+    peak : int
+        Peak traced memory in bytes
+    '''
+    tracemalloc.start()
+    try:
+        result = func(*args)
+        gc.collect()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return result, retained, peak
+
+
+def bench_entry_memory(n_sents=20000, seed=0):
+    '''Measures memory held by terminology entries of synthetic sentences, once as lists of context sentence and
+    definition strings, as entries used to keep them, and once as compact entries sharing a sentence table.
+    Raises AssertionError if compact entries return different context sentences or definitions.
+
+    Parameters
+    ----------
+    n_sents : int
+        Number of sentences
+    seed : int
+        Seed for random number generator
+
+    Returns
+    -------
+    sizes : dict
+        Retained and peak bytes for entries kept as lists and as compact entries
+    '''
+    sentences = synthetic_sentences(n_sents, seed)
+    candidates = synthetic_terms(max(n_sents // 10, 1), seed)
+    index = SentenceIndex(sentences)
+
+    class ListEntry:
+        # Entry as TermEntry used to be: attribute dictionary and lists of strings
+        def __init__(self, term_candidate, definition, context):
+            self.term_candidate = term_candidate
+            self.definition = definition
+            self.context = context
+
+    def as_lists():
+        contexts = {candidate: extract_context(candidate, sentences, index) for candidate in candidates}
+        all_definitions = extract_all_defs(contexts)
+        return [ListEntry(candidate, all_definitions[candidate], contexts[candidate]) for candidate in candidates
+                if all_definitions[candidate]]
+
+    def as_entries():
+        contexts = {candidate: extract_context(candidate, sentences, index) for candidate in candidates}
+        return make_entries(contexts, extract_all_defs(contexts))
+
+    # Warms up regular expression cache, so that it is not counted
+    as_lists()
+    lists, lists_retained, lists_peak = retained_memory(as_lists)
+    entries, entries_retained, entries_peak = retained_memory(as_entries)
+    dump = lambda entries: [(e.get_term_candidate(), e.get_definition(), e.get_context()) for e in entries]
+    list_dump = [(e.term_candidate, e.definition, e.context) for e in lists]
+    assert dump(entries) == list_dump, 'Compact entries returned different context sentences or definitions'
+
+    return {'lists': lists_retained, 'compact': entries_retained, 'lists_peak': lists_peak,
+            'compact_peak': entries_peak}
+
+
+def bench_type_ahead(n_terms=20000, seed=0):
+    '''Times type-ahead filtering of terms for every prefix typed letter by letter, once scanning every term and
+    once looking prefixes up in a prefix index. Raises AssertionError if the two return different terms.
+
+    Parameters
+    ----------
+    n_terms : int
+        Number of terms to filter
+    seed : int
+        Seed for random number generator
+
+    Returns
+    -------
+    timings : dict
+        Elapsed seconds for index build, scanning and indexed lookups
+    '''
+    terms = synthetic_terms(n_terms, seed)
+    queries = [term.split(' ')[-1][:length] for term in random.Random(seed).sample(terms, 50) for length in (1, 2, 3, 4)]
+
+    def scan():
+        return [[i for i, term in enumerate(terms) if any(word.startswith(query) for word in term.split(' '))]
+                for query in queries]
+
+    scanned, scan_time = time_call(scan)
+    index, build_time = time_call(PrefixIndex, terms)
+    indexed, lookup_time = time_call(lambda: [index.lookup(query) for query in queries])
+    assert scanned == indexed, 'Prefix index returned different terms'
+
+    return {'scan': scan_time, 'index_build': build_time, 'indexed_lookup': lookup_time}
+
+
+def bench_glossary(n_docs=100, n_terms=500, n_contexts=20, seed=0, path='benchmark_glossary.sqlite'):
+    '''Times merging synthetic documents into a glossary store, each with n_terms entries of n_contexts context
+    sentences and one definition, and median times of queries once all documents are merged. Raises AssertionError
+    if a term does not get back its context sentences and definitions.
+
+    Parameters
+    ----------
+    n_docs : int
+        Number of documents
+    n_terms : int
+        Number of entries per document
+    n_contexts : int
+        Number of context sentences per entry
+    seed : int
+        Seed for random number generator
+    path : str
+        Path of database file, removed afterwards
+
+    Returns
+    -------
+    timings : dict
+        Elapsed seconds per merged document and per query, and number of context rows
+    '''
+    rng = random.Random(seed)
+    terms = synthetic_terms(5 * n_terms, seed)
+    store = GlossaryStore(path)
+    try:
+        merge_times = []
+        for doc_no in range(n_docs):
+            sentences = synthetic_sentences(n_terms, seed + doc_no)
+            entries = [TermEntry(term, [term + ' is ' + rng.choice(sentences)], rng.sample(sentences, n_contexts))
+                       for term in rng.sample(terms, n_terms)]
+            merge_times.append(time_call(store.add_entries, 'doc{}.pdf'.format(doc_no), entries,
+                                         'hash{}'.format(doc_no))[1])
+        last = entries[0]
+        assert [text for _, text in store.get_contexts(last.get_term_candidate())][-n_contexts:] == last.get_context()
+        assert [text for _, text in store.get_definitions(last.get_term_candidate())][-1:] == last.get_definition()
+
+        queries = {'definitions': lambda term: store.get_definitions(term),
+                   'contexts': lambda term: store.get_contexts(term, 100),
+                   'document_frequency': lambda term: store.get_document_frequency(term),
+                   'search_contexts': lambda term: store.search_contexts('"{}"'.format(term), 100)}
+        timings = {'merge': sorted(merge_times)[n_docs // 2],
+                   'contexts_rows': store.connection.execute('SELECT COUNT(*) FROM contexts').fetchone()[0]}
+        for name, query in queries.items():
+            elapsed = sorted(time_call(query, term)[1] for term in rng.sample(terms, 50))
+            timings[name] = elapsed[25]
+        timings['top_terms'] = time_call(store.get_top_terms, 100)[1]
+    finally:
+        store.close()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    return timings
+
+
+def http_request(port, method, path, body=None):
+    '''Sends HTTP request to a service on localhost, returns status, headers and body of its response.'''
+    request = urllib.request.Request('http://127.0.0.1:{}{}'.format(port, path), data=body, method=method)
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as error:
+        return error.code, error.headers, error.read()
+
+
+def bench_service(n_docs=8, n_pages=5, workers=2, seed=0):
+    '''Starts the extraction service on a free localhost port and uploads n_docs synthetic .PDF files at once,
+    each of them twice, then floods it with more uploads than its queue holds. Raises AssertionError if not every
+    worker warmed up before the service started, if identical uploads do not share a job, if streamed results
+    differ from create_entry or if no upload is refused with 429.
+
+    Parameters
+    ----------
+    n_docs : int
+        Number of distinct .PDF files
+    n_pages : int
+        Number of pages per file
+    workers : int
+        Number of worker processes of the service
+    seed : int
+        Seed for random number generator
+
+    Returns
+    -------
+    timings : dict
+        Elapsed seconds for starting the warm pool and for all jobs, and median seconds from upload to result
+    '''
+    paths = ['benchmark_service_{}.pdf'.format(doc_no) for doc_no in range(n_docs)]
+    for doc_no, path in enumerate(paths):
+        synthetic_pdf(path, n_pages, seed + doc_no)
+    uploads = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            uploads.append(f.read())
+
+    async def request(port, method, path, body=None):
+        # Runs blocking client in a thread, so that the service keeps running in the event loop
+        return await asyncio.get_running_loop().run_in_executor(None, http_request, port, method, path, body)
+
+    async def upload(port, body):
+        start = time.perf_counter()
+        _, _, response = await request(port, 'POST', '/jobs', body)
+        job_id = json.loads(response)['job']
+        status, _, response = await request(port, 'GET', '/jobs/{}/result'.format(job_id))
+        assert status == 200
+        records = [json.loads(line) for line in response.decode('utf-8').splitlines()]
+        return job_id, records, time.perf_counter() - start
+
+    async def run():
+        service = ExtractionService(workers, queue_size=2 * n_docs)
+        timings = {'start': time.perf_counter()}
+        port = await service.start('127.0.0.1', 0)
+        timings['start'] = time.perf_counter() - timings['start']
+        assert len(set(service.worker_pids)) == workers, 'Not every worker warmed up before the service started'
+        try:
+            start = time.perf_counter()
+            results = await asyncio.gather(*[upload(port, body) for body in uploads + uploads])
+            timings['all_jobs'] = time.perf_counter() - start
+            timings['latency'] = sorted(elapsed for _, _, elapsed in results)[n_docs]
+            for doc_no, path in enumerate(paths):
+                job_id, records, _ = results[doc_no]
+                assert results[n_docs + doc_no][0] == job_id
+                assert results[n_docs + doc_no][1] == records
+                assert records == [entry_to_dict(job_id + '.pdf', entry) for entry in create_entry(path)]
+
+            # Different options make different jobs, more of them than the queue holds
+            responses = await asyncio.gather(*[request(port, 'POST', '/jobs?top_k={}'.format(top_k), uploads[0])
+                                               for top_k in range(1, 4 * n_docs + 1)])
+            statuses = [status for status, _, _ in responses]
+            assert 429 in statuses and 202 in statuses
+        finally:
+            await service.stop()
+
+        return timings
+
+    try:
+        timings = asyncio.run(run())
+    finally:
+        for path in paths:
+            os.remove(path)
+
+    return timings
+
+
+def heavy_imports(module):
+    '''Takes in a module name and imports it in a fresh interpreter, returns heavy libraries loaded by importing it.
+
+    Parameters
+    ----------
+    module : str
+        Name of module to be imported
+
+    Returns
+    -------
+    loaded : list
+        Names of modules in HEAVY_MODULES loaded by import
+    '''
+    code = 'import sys, {}; print(" ".join(m for m in {!r} if m in sys.modules))'.format(module, HEAVY_MODULES)
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+
+    return result.stdout.split()
+
+
+def bench_startup(runs=5, path='benchmark_blank.pdf'):
+    '''Times command line runs of batch processing module in fresh interpreters, once printing help and once
+    processing a blank one-page .PDF file. Raises AssertionError if importing the module loads heavy libraries or
+    if median wall time of either run exceeds STARTUP_BUDGET.
+
+    Parameters
+    ----------
+    runs : int
+        Number of runs of each command
+    path : str
+        Path of blank .PDF file, removed afterwards
+
+    Returns
+    -------
+    timings : dict
+        Median elapsed seconds of help and blank .PDF file runs
+    '''
+    import fitz
+    loaded = heavy_imports('BatchProcessing')
+    assert loaded == [], 'Importing BatchProcessing loads {}'.format(', '.join(loaded))
+
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'BatchProcessing.py')
+    doc = fitz.open()
+    doc.new_page()
+    doc.save(path)
+    doc.close()
+    commands = {'help': [sys.executable, script, '--help'], 'blank_pdf': [sys.executable, script, path]}
+    timings = {}
+    try:
+        for name, command in commands.items():
+            run = lambda: subprocess.run(command, stdout=subprocess.DEVNULL, check=True)
+            elapsed = sorted(time_call(run)[1] for _ in range(runs))
+            timings[name] = elapsed[runs // 2]
+    finally:
+        os.remove(path)
+    for name, budget in STARTUP_BUDGET.items():
+        assert timings[name] <= budget, '{} run took {:.3f} s, budget is {:.3f} s'.format(name, timings[name], budget)
+
+    return timings
+
+
+if __name__ == '__main__':
+    timings = bench_extract_context()
+    print('extract_context, full scan:      {:.3f} s'.format(timings['scan']))
+    print('extract_context, index build:    {:.3f} s'.format(timings['index_build']))
+    print('extract_context, indexed lookup: {:.3f} s'.format(timings['indexed_lookup']))
+    print('speedup: {:.1f}x'.format(timings['scan'] / (timings['index_build'] + timings['indexed_lookup'])))
+
+    timings = bench_extract_def()
+    print('extract_def, per candidate:      {:.3f} s'.format(timings['per_candidate']))
+    print('extract_all_defs, single pass:   {:.3f} s'.format(timings['single_pass']))
+    print('speedup: {:.1f}x'.format(timings['per_candidate'] / timings['single_pass']))
+
+    print('definition fuzz:                 {} checks'.format(fuzz_definitions()))
+    for kind, kind_timings in bench_definition_worst_case().items():
+        print('definitions, {:<20}regex {:.3f} s, linear {:.4f} s, 10x longer {:.4f} s'.format(
+            kind + ':', kind_timings['regex'], kind_timings['linear'], kind_timings['linear_long']))
+
+    timings = bench_normalizer()
+    print('get_sentences(remove_division):  {:.3f} s'.format(timings['reference']))
+    print('split_sentences, fused:          {:.3f} s'.format(timings['fused']))
+    print('speedup: {:.1f}x'.format(timings['reference'] / timings['fused']))
+
+    throughput = bench_pos_tagging()
+    print('nltk.pos_tag per sentence:       {:.0f} sentences/s'.format(throughput['per_sentence']))
+    print('pos_tagging, batched:            {:.0f} sentences/s'.format(throughput['batched']))
+
+    results = bench_chunking()
+    print('chunking, parse trees:           {:.3f} s, {:.1f} MB peak'.format(results['trees'],
+                                                                          results['trees_peak'] / 2**20))
+    print('phrase_chunking, tag codes:      {:.3f} s, {:.1f} MB peak'.format(results['codes'],
+                                                                          results['codes_peak'] / 2**20))
+
+    timings = bench_lazy_entries()
+    print('phrase_chunking:                 {:.3f} s'.format(timings['chunking']))
+    print('entry list, eager:               {:.3f} s, {} entries'.format(timings['eager'], timings['eager_entries']))
+    print('entry list, lazy:                {:.3f} s, {} of {} candidates'.format(timings['lazy'],
+                                                                                timings['lazy_entries'],
+                                                                                timings['candidates']))
+    print('lazy list, first batch checked:  {:.3f} s'.format(timings['first_batch']))
+
+    timings = bench_scoring()
+    print('C-value scoring, all candidates: {:.3f} s'.format(timings['scoring']))
+    print('entries, all candidates:         {:.3f} s'.format(timings['all']))
+    print('entries, top 100 candidates:     {:.3f} s'.format(timings['top_k']))
+
+    sizes = bench_entry_memory()
+    print('entries as lists:                {:.1f} MB, {:.1f} MB peak'.format(sizes['lists'] / 2**20,
+                                                                              sizes['lists_peak'] / 2**20))
+    print('compact entries:                 {:.1f} MB, {:.1f} MB peak'.format(sizes['compact'] / 2**20,
+                                                                              sizes['compact_peak'] / 2**20))
+
+    timings = bench_type_ahead()
+    print('type-ahead, full scan:           {:.3f} s'.format(timings['scan']))
+    print('type-ahead, index build:         {:.3f} s'.format(timings['index_build']))
+    print('type-ahead, indexed lookup:      {:.3f} s'.format(timings['indexed_lookup']))
+
+    timings = bench_glossary()
+    print('glossary, {} context rows'.format(timings['contexts_rows']))
+    print('glossary, merge document:        {:.3f} s'.format(timings['merge']))
+    for query in ('definitions', 'contexts', 'document_frequency', 'search_contexts', 'top_terms'):
+        print('glossary, {:<23}{:.4f} s'.format(query + ':', timings[query]))
+
+    timings = bench_service()
+    print('service, warm pool start:        {:.3f} s'.format(timings['start']))
+    print('service, median upload to result:{:.3f} s'.format(timings['latency']))
+    print('service, all jobs:               {:.3f} s'.format(timings['all_jobs']))
+
+    timings = bench_startup()
+    print('command line --help:             {:.3f} s'.format(timings['help']))
+    print('command line, blank .PDF file:   {:.3f} s'.format(timings['blank_pdf']))
+
+    results = bench_span_document()
+    print('sentence list, split:            {:.3f} s'.format(results['list_split']))
+    print('span document, split:            {:.3f} s'.format(results['span_split']))
+    print('sentence list, POS input:        {:.3f} s'.format(results['list_pos']))
+    print('span document, POS input:        {:.3f} s'.format(results['span_pos']))
+    print('sentence list, contexts:         {:.3f} s'.format(results['list_contexts']))
+    print('span document, contexts:         {:.3f} s'.format(results['span_contexts']))
+    print('sentence list:                   {:.1f} MB'.format(results['list_memory'] / 2**20))
+    print('span document:                   {:.1f} MB'.format(results['span_memory'] / 2**20))
+
+    results = bench_boilerplate()
+    print('boilerplate, removal:            {:.3f} s'.format(results['remove']))
+    print('boilerplate, sentences:          {} before, {} after'.format(results['sentences'],
+                                                                       results['kept_sentences']))
+
+    results = bench_memo()
+    print('pos_tagging, no memo:            {:.3f} s'.format(results['tag']))
+    print('pos_tagging, memo:               {:.3f} s, {:.0%} hits'.format(results['memo_tag'],
+                                                                          results['tag_hit_rate']))
+    print('phrase_chunking, no memo:        {:.3f} s'.format(results['chunk']))
+    print('phrase_chunking, memo:           {:.3f} s, {:.0%} hits'.format(results['memo_chunk'],
+                                                                          results['chunk_hit_rate']))
+    print('fast tagger, no memo:            {:.3f} s'.format(results['fast_tag']))
+    print('fast tagger, memo:               {:.3f} s, {:.0%} hits'.format(results['memo_fast_tag'],
+                                                                          results['fast_hit_rate']))
+
+    results = bench_ingest()
+    print('pdf_to_text, appending pages:    {:.3f} s'.format(results['append']))
+    print('pdf_to_pages, path:              {:.3f} s'.format(results['join_path']))
+    print('pdf_to_pages, bytes:             {:.3f} s'.format(results['join_bytes']))
+    print('pdf_to_pages, mmap:              {:.3f} s'.format(results['join_mmap']))
+    print('split_sentences:                 {:.3f} s'.format(results['split_sentences']))
+    print('split_page_sentences:            {:.3f} s'.format(results['split_page_sentences']))
+    print('opening bytearray, copy:         {:.1f} MB peak'.format(results['copy_peak'] / 2**20))
+    print('opening bytearray, in place:     {:.1f} MB peak'.format(results['in_place_peak'] / 2**20))
+
+    timings = bench_parallel_preprocess()
+    print('pre-processing, serial:          {:.3f} s'.format(timings['serial']))
+    for pages_per_range in (1, 5, 50):
+        print('pre-processing, {:>2} pages/range:  {:.3f} s'.format(pages_per_range, timings[pages_per_range]))
+
+    for n_pages in (50, 200):
+        peaks = bench_stream_memory(n_pages)
+        print('pre-processing {} pages, whole:   {:.1f} MB peak'.format(n_pages, peaks['whole'] / 2**20))
+        print('pre-processing {} pages, stream:  {:.1f} MB peak'.format(n_pages, peaks['stream'] / 2**20))
+        print('pre-processing {} pages:          whole {:.3f} s, stream {:.3f} s, one sentence at a time {:.3f} s'
+              .format(n_pages, peaks['whole_time'], peaks['stream_time'], peaks['single_time']))
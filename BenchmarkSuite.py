@@ -0,0 +1,334 @@
+'''Benchmark Suite Module
+
+This module is a reproducible, offline benchmark of the whole pipeline. It generates a corpus of synthetic
+scientific-style .PDF files of controlled size with PyMuPDF, with definitional sentences, abbreviations, URLs,
+DOIs, e-mail addresses and words hyphenated across lines and pages. Every stage of create_entry is timed
+separately and end to end, throughput and peak memory are recorded, and results are compared with a stored
+baseline file within tolerances, so that a change to any stage can be told to help or hurt. It requires
+argparse, json, os, random, statistics and sys libraries, and the benchmark module.
+
+Functions
+---------
+corpus_sentences(n_sents, seed)
+    Generates list of sentences, some of which define terms used in the others
+synthetic_corpus_pdf(path, n_pages, seed)
+    Writes .PDF file of synthetic paper with a given number of pages
+build_corpus(folder, page_counts, seed)
+    Writes missing .PDF files of synthetic corpus, returns their paths
+run_stages(file)
+    Runs the stages of create_entry one by one, returns entries and elapsed time of each stage
+measure_document(file, repeat)
+    Times stages and whole pipeline on a .PDF file, returns timings, throughput, peak memory and counts
+compare_with_baseline(results, baseline)
+    Takes in results and baseline, returns list of regressions
+main(argv)
+    Runs the benchmark suite from the command line, prints results and regressions
+'''
+
+import argparse, json, os, random, statistics, sys
+from Benchmark import *
+
+
+# Templates of definitional sentences, one for each kind of signal phrase
+DEFINITION_TEMPLATES = ['{term} is a {adjective} {noun} of the {other}',
+                        '{term} refers to the {noun} of {adjective} {other} {filler}',
+                        'the {term}, that is, the {adjective} {noun} of a {other}, is shown in Table 1',
+                        '{term}, namely a {adjective} {noun}, improves the {other}',
+                        '{term} can be described as a {adjective} {noun}',
+                        '{term} means a {noun} of the {other} {filler}',
+                        'a {adjective} {noun} of the {other} defines {term}']
+# Stages of create_entry, in order
+STAGES = ['pdf_to_text', 'remove_boilerplate', 'split_sentences', 'sents_for_pos', 'pos_tagging', 'chunking',
+          'select_candidates', 'sentence_index', 'extract_context', 'extract_all_defs', 'make_entries']
+# Share of definitional sentences and number of sentences per page of synthetic papers
+DEFINITION_RATE = 0.2
+SENTENCES_PER_PAGE = 40
+# Page sizes of the default corpus, up to 2000 pages can be requested
+DEFAULT_PAGES = [10, 100, 500]
+
+# Maximum relative slowdown of a stage and relative growth of peak memory before a result is a regression.
+# Differences below min_seconds are timer noise and never count as regressions.
+TOLERANCE = {'time': 0.25, 'memory': 0.10, 'min_seconds': 0.02}
+
+
+def corpus_sentences(n_sents, seed=0):
+    '''Generates scientific-style sentences, a share of which define terms with one of the signal phrases of
+    the definition patterns. Defined terms are drawn from the same vocabulary as the other sentences, so that
+    they also occur in context sentences.
+
+    Parameters
+    ----------
+    n_sents : int
+        Number of sentences to generate
+    seed : int
+        Seed for random number generator
+
+    Returns
+    -------
+    sentences : list
+        List of generated sentences
+    '''
+    rng = random.Random(seed)
+    terms = synthetic_terms(max(n_sents // 10, 1), seed)
+    sentences = synthetic_sentences(n_sents, seed)
+    for position in range(n_sents):
+        if rng.random() < DEFINITION_RATE:
+            sentence = rng.choice(DEFINITION_TEMPLATES).format(term=rng.choice(terms),
+                                                               adjective=rng.choice(ADJECTIVES),
+                                                               noun=rng.choice(NOUNS), other=rng.choice(NOUNS),
+                                                               filler=rng.choice(FILLERS))
+            sentences[position] = sentence[0].upper() + sentence[1:]
+
+    return sentences
+
+
+def synthetic_corpus_pdf(path, n_pages, seed=0):
+    '''Writes .PDF file of a synthetic paper. Its text is laid out the way pdf_to_text reads typeset papers:
+    lines of about 90 characters, words hyphenated at line ends, and sentences running over page breaks.
+
+    Parameters
+    ----------
+    path : str
+        Path of .PDF file to be written
+    n_pages : int
+        Number of pages
+    seed : int
+        Seed for random number generator
+
+    Returns
+    -------
+    None
+    '''
+    import fitz
+    sentences = corpus_sentences(SENTENCES_PER_PAGE * n_pages, seed)
+    lines = synthetic_raw_text(seed=seed, sentences=sentences).split('\n')
+    lines_per_page = -(-len(lines) // n_pages)
+    doc = fitz.open()
+    for page_no in range(n_pages):
+        page = doc.new_page()
+        page.insert_text((36, 36), '\n'.join(lines[page_no * lines_per_page:(page_no + 1) * lines_per_page]),
+                         fontsize=6)
+    doc.save(path)
+    doc.close()
+
+
+def build_corpus(folder, page_counts, seed=0):
+    '''Writes .PDF files of a synthetic corpus to folder, one per page count. Files already written with the same
+    page count and seed are reused, so that they are generated once.
+
+    Parameters
+    ----------
+    folder : str
+        Folder of corpus, created if missing
+    page_counts : list
+        Numbers of pages of .PDF files
+    seed : int
+        Seed for random number generator
+
+    Returns
+    -------
+    files : dict
+        Page counts as keys and paths of .PDF files as values
+    '''
+    os.makedirs(folder, exist_ok=True)
+    files = {}
+    for n_pages in page_counts:
+        path = os.path.join(folder, 'synthetic_{}_pages_seed_{}.pdf'.format(n_pages, seed))
+        if not os.path.exists(path):
+            synthetic_corpus_pdf(path, n_pages, seed)
+        files[n_pages] = path
+
+    return files
+
+
+def run_stages(file):
+    '''Runs the stages of create_entry one after another on .PDF file, timing each of them.
+
+    Parameters
+    ----------
+    file : str
+        Path of .PDF file
+
+    Returns
+    -------
+    entries : list
+        List of TermEntry objects, as create_entry returns them
+    timings : dict
+        Stages as keys and elapsed seconds as values
+    counts : dict
+        Numbers of sentences and terminology candidates
+    '''
+    timings = {}
+    (txt, page_starts), timings['pdf_to_text'] = time_call(pdf_to_pages, file)
+    (txt, page_starts), timings['remove_boilerplate'] = time_call(remove_boilerplate, txt, page_starts)
+    all_sents, timings['split_sentences'] = time_call(split_document, txt, page_starts)
+    sent_pages = all_sents.pages
+    cleaned_s, timings['sents_for_pos'] = time_call(sents_for_pos, all_sents)
+    tagged, timings['pos_tagging'] = time_call(pos_tagging, cleaned_s)
+    chunks, timings['chunking'] = time_call(phrase_chunking, tagged)
+    term_candidates, timings['select_candidates'] = time_call(select_candidates, chunks)
+    index, timings['sentence_index'] = time_call(SentenceIndex, all_sents)
+    (contexts, pages), timings['extract_context'] = time_call(extract_contexts, term_candidates, all_sents, index,
+                                                              sent_pages)
+    all_definitions, timings['extract_all_defs'] = time_call(extract_all_defs, contexts)
+    entries, timings['make_entries'] = time_call(make_entries, contexts, all_definitions, None, pages)
+
+    return entries, timings, {'sentences': len(all_sents), 'candidates': len(term_candidates)}
+
+
+def measure_document(file, repeat=3):
+    '''Times every stage of create_entry and the whole of it on .PDF file, taking the median of repeated runs,
+    then measures peak traced memory of one more run, which tracing slows down. The POS tagger
+    is loaded beforehand, so that the first document does not pay for it. Raises AssertionError if running
+    the stages one by one does not give the same entries as create_entry.
+
+    Parameters
+    ----------
+    file : str
+        Path of .PDF file
+    repeat : int
+        Number of timed runs
+
+    Returns
+    -------
+    record : dict
+        Median elapsed seconds of every stage and of the whole pipeline, pages and sentences per second, peak
+        memory in bytes, and numbers of pages, sentences, candidates and entries
+    '''
+    get_tagger()
+    dump = lambda entries: [(e.get_term_candidate(), e.get_definition(), e.get_context(), e.get_pages())
+                            for e in entries]
+
+    # Clears memoized POS tags before every run, so that no run looks up sentences tagged by the one before
+    stage_runs = []
+    for _ in range(repeat):
+        clear_memos()
+        entries, timings, counts = run_stages(file)
+        stage_runs.append(timings)
+    total_runs = []
+    for _ in range(repeat):
+        clear_memos()
+        whole, elapsed = time_call(create_entry, file)
+        total_runs.append(elapsed)
+    assert dump(entries) == dump(whole), 'Stages run one by one returned different entries than create_entry'
+    clear_memos()
+    _, peak = peak_memory(create_entry, file)
+
+    n_pages = page_count(file)
+    total = statistics.median(total_runs)
+    record = {'pages': n_pages, 'sentences': counts['sentences'], 'candidates': counts['candidates'],
+              'entries': len(entries),
+              'stages': {stage: statistics.median(run[stage] for run in stage_runs) for stage in STAGES},
+              'total': total, 'pages_per_s': n_pages / total, 'sentences_per_s': counts['sentences'] / total,
+              'peak_memory': peak}
+
+    return record
+
+
+def compare_with_baseline(results, baseline):
+    '''Compares results with baseline, document by document. A stage or the whole pipeline regresses if it is
+    slower than baseline by more than the time tolerance and by more than min_seconds, and peak memory regresses
+    if it grows by more than the memory tolerance. Different numbers of sentences, candidates or entries mean
+    that output changed. Documents missing from baseline are skipped. Tolerances are read from baseline,
+    defaulting to TOLERANCE.
+
+    Parameters
+    ----------
+    results : dict
+        Page counts as keys and records returned by measure_document as values
+    baseline : dict
+        Tolerances and results of an earlier run, as written by main
+
+    Returns
+    -------
+    regressions : list
+        Descriptions of regressions, empty if there are none
+    '''
+    tolerance = dict(TOLERANCE, **baseline.get('tolerance', {}))
+    regressions = []
+    for n_pages, record in sorted(results.items()):
+        reference = baseline['documents'].get(str(n_pages))
+        if reference is None:
+            continue
+        for count in ('sentences', 'candidates', 'entries'):
+            if record[count] != reference[count]:
+                regressions.append('{} pages: {} changed from {} to {}'.format(n_pages, count, reference[count],
+                                                                             record[count]))
+        timings = dict(record['stages'], total=record['total'])
+        reference_timings = dict(reference['stages'], total=reference['total'])
+        for stage, elapsed in timings.items():
+            limit = reference_timings.get(stage, elapsed) * (1 + tolerance['time'])
+            if elapsed > limit and elapsed - reference_timings[stage] > tolerance['min_seconds']:
+                regressions.append('{} pages: {} took {:.3f} s, baseline is {:.3f} s'.format(
+                    n_pages, stage, elapsed, reference_timings[stage]))
+        if record['peak_memory'] > reference['peak_memory'] * (1 + tolerance['memory']):
+            regressions.append('{} pages: peak memory is {:.1f} MB, baseline is {:.1f} MB'.format(
+                n_pages, record['peak_memory'] / 2**20, reference['peak_memory'] / 2**20))
+
+    return regressions
+
+
+def main(argv=None):
+    '''Runs the benchmark suite from the command line. Builds the synthetic corpus, measures every document,
+    prints results and compares them with the baseline file, or writes results to it with --update.
+
+    Parameters
+    ----------
+    argv : list, optional
+        Command line arguments, defaults to sys.argv[1:]
+
+    Returns
+    -------
+    status : int
+        1 if results regressed from baseline, 0 otherwise
+    '''
+    parser = argparse.ArgumentParser(description='Benchmark the terminology extraction pipeline offline.')
+    parser.add_argument('--pages', type=int, nargs='+', default=DEFAULT_PAGES,
+                        help='page counts of synthetic documents, from 10 to 2000')
+    parser.add_argument('--repeat', type=int, default=3, help='number of timed runs per document')
+    parser.add_argument('--seed', type=int, default=0, help='seed of synthetic corpus')
+    parser.add_argument('--corpus', default='benchmark_corpus', help='folder of synthetic corpus')
+    parser.add_argument('--baseline', default='benchmark_baseline.json', help='baseline file')
+    parser.add_argument('--update', action='store_true', help='write results to baseline file')
+    args = parser.parse_args(argv)
+
+    results = {}
+    for n_pages, file in build_corpus(args.corpus, args.pages, args.seed).items():
+        record = measure_document(file, args.repeat)
+        results[n_pages] = record
+        print('{} pages, {} sentences, {} candidates, {} entries'.format(
+            n_pages, record['sentences'], record['candidates'], record['entries']))
+        for stage in STAGES:
+            print('  {:<18} {:8.3f} s'.format(stage, record['stages'][stage]))
+        print('  {:<18} {:8.3f} s, {:.1f} pages/s, {:.0f} sentences/s, {:.1f} MB peak'.format(
+            'create_entry', record['total'], record['pages_per_s'], record['sentences_per_s'],
+            record['peak_memory'] / 2**20))
+        sys.stdout.flush()
+
+    if args.update:
+        baseline = {'tolerance': TOLERANCE, 'documents': {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline['documents'].update({str(n_pages): record for n_pages, record in results.items()})
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print('Baseline written to {}'.format(args.baseline))
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print('No baseline file {}, run with --update to write one'.format(args.baseline))
+        return 0
+
+    with open(args.baseline) as f:
+        regressions = compare_with_baseline(results, json.load(f))
+    for regression in regressions:
+        print('REGRESSION ' + regression)
+    if not regressions:
+        print('No regressions against {}'.format(args.baseline))
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
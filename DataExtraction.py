@@ -1,101 +1,364 @@
 '''Data Extraction Module
 
-This module contains three functions needed for extracting data for terminology entry, such as 
+This module contains functions needed for extracting data for terminology entry, such as 
 terminology candidates, sentences in which they appear and possible definitions. It requires 
 importing functions from text pre-processing module.
 
 Functions
 ---------
-get_chunks(chunked)
-    Takes in a list of parse trees, returns a list of term candidates
-extract_context(term_cand, sent_list)
-    Takes in a terminology candidate and sentence list, returns context sentences
-extract_def(term_cand, context)
+iter_chunks(chunked)
+    Takes in an iterable of chunked sentences, yields noun phrases
+get_chunks(chunked, index)
+    Takes in a list of chunked sentences and optional candidate index, returns a list of term candidates
+count_chunks(chunked, k, epsilon, delta)
+    Takes in an iterable of chunked sentences, returns the most frequent term candidates counted in fixed memory
+select_candidates(chunked, top_k, scoring, min_score)
+    Takes in an iterable of chunked sentences, returns all, the most frequent or the best scoring term candidates
+iter_context(term_cand, sent_list, index=None)
+    Takes in a terminology candidate, sentence list and optional sentence index, yields context sentences and ids
+extract_context(term_cand, sent_list, index=None)
+    Takes in a terminology candidate, sentence list and optional sentence index, returns context sentences
+extract_context_pages(term_cand, sent_list, sent_pages, index=None)
+    Takes in a terminology candidate, sentences and their pages, returns context sentences and their pages
+extract_contexts(term_candidates, sent_list, index, sent_pages)
+    Takes in terminology candidates and sentence list, returns context sentences and their pages for every candidate
+extract_def(term_cand, context, linear, max_length)
     Takes in a terminology candidate and context sentences, returns definitions for terminology candidate
+match_def(term_cand, sentence)
+    Takes in a terminology candidate and a sentence, returns definitions matched in time linear in sentence length
+scan_definitions(sentence, lookup)
+    Takes in a context sentence and candidate lookup table, returns definitions found in it for every candidate
+extract_all_defs(contexts, max_length)
+    Takes in context sentences of all terminology candidates, returns definitions for every candidate
+find_definable(term_candidates, sent_list, index)
+    Takes in terminology candidates and sentence list, returns candidates which may have a definition
 '''
 
 from TextPreProcessing import *
+from SentenceIndex import *
+from FrequencySketch import *
+from TermCandidateIndex import *
+from TermScoring import *
 
 
-def get_chunks(chunked):
-    '''Takes in list of parse trees as input. The first list comprehension extracts NPs from parse trees, 
-    the second one filters out terms shorter than two characters and those already present in all_terms list. 
-    Returns list with filtered out terms.
+# Signal words and phrases preceding definition
+PATTERNS_PRE = [r'\s?—\s',
+                r'\sis\s',
+                r'\sare\s',
+                r'\,\sthat\sis\,?\s',
+                r'\,\snamely\s',
+                r'\scan\sbe\sdescribed\sas\s',
+                r'\srefers?\sto\s',
+                r'\smeans?\s',
+                r'\ssays?\sthat\s',
+                ]
+
+# Signal words and phrases following definition
+PATTERNS_POS = [r'\,\sthat\sis\,?\s',
+                r'defines?\s',
+                r'describes?\s',
+                ]
+
+# Candidate-independent patterns for single-pass definition scanning: any signal phrase, signal phrases
+# preceding definition followed by the start of a word, and signal phrases following definition. Signal phrases
+# end with whitespace, so a word follows them and, in sentences without line breaks, runs on to the end
+CUE_SCANNER = re.compile('(?=' + '|'.join(PATTERNS_PRE + PATTERNS_POS) + ')', flags=re.IGNORECASE)
+CUES_PRE = [re.compile(pattern + r'\b', flags=re.IGNORECASE) for pattern in PATTERNS_PRE]
+CUES_POS = [re.compile(pattern, flags=re.IGNORECASE) for pattern in PATTERNS_POS]
+FIRST_ALNUM = re.compile(r'[A-Z0-9]', flags=re.IGNORECASE)
+FIRST_UPPER = re.compile(r'[A-Z0-9]')
+WORD_BOUNDARY = re.compile(r'\b')
+
+# Words right before signal phrases preceding definition, matched forward in reversed casefolded text, with every
+# pattern reversed atom by atom, and words right after signal phrases following definition. Lookaheads let
+# signal phrases overlap
+PATTERN_ATOM = re.compile(r'\\?.\??')
+WORD_BEFORE_PRE = re.compile('(?=(?:' + '|'.join(''.join(reversed(PATTERN_ATOM.findall(pattern)))
+                                               for pattern in PATTERNS_PRE) + r')(\w+))')
+WORD_AFTER_POS = re.compile('(?=(?:' + '|'.join(PATTERNS_POS) + r')(\w+))')
+# Characters IGNORECASE matching treats as i, which casefolding does not turn into i
+UNFOLDED_I = re.compile('[İı]')
+
+# Maps characters that IGNORECASE matching treats as equal but str.lower() keeps apart to one representative
+CASE_FIXES = str.maketrans({c: cls[0] for cls in ['iı', 'sſ', 'μµ', 'ιͅι', 'ΐΐ', 'ΰΰ', 'βϐ', 'εϵ', 'θϑ', 'κϰ',
+                                                  'πϖ', 'ρϱ', 'σς', 'φϕ', 'вᲀ', 'дᲁ', 'оᲂ', 'сᲃ', 'тᲄᲅ', 'ъᲆ',
+                                                  'ѣᲇ', 'ꙋᲈ', 'ṡẛ', 'ﬅﬆ']
+                           for c in cls[1:]})
+
+
+def iter_chunks(chunked):
+    '''Takes in an iterable of chunked sentences and yields noun phrases one at a time, so that chunked
+    sentences can be consumed as a stream. A chunked sentence is either a parse tree, as returned by chunking,
+    or a list of noun phrases, as returned by phrase_chunking.
+
+    Parameters
+    ----------
+    chunked : iterable
+        Parse trees or lists of noun phrases for terminology candidate extraction
+
+    Yields
+    ------
+    chunk : str
+        Noun phrase with POS tags removed
+    '''
+    for tree in chunked:
+        # Noun phrases chunked without parse tree are yielded as they are
+        if not hasattr(tree, 'subtrees'):
+            yield from tree
+            continue
+        # Iterate through subtrees to get individual chunks
+        for subtree in tree.subtrees():
+            if subtree.label() == 'NP':
+                # Remove POS tags, keep words
+                yield ' '.join(word_tag[0] for word_tag in subtree.leaves())
+
+
+def get_chunks(chunked, index=None):
+    '''Takes in list of chunked sentences as input. It extracts NPs from them and records those longer than
+    one character in a terminology candidate index, together with the id of the sentence they come from,
+    i.e. the position of its chunked sentence. Returns list of candidates in order of first occurrence.
 
     Parameters
     ----------
     chunked : list
-        List of parse tree for terminology candidate extraction
+        List of parse trees or lists of noun phrases for terminology candidate extraction
+    index : TermCandidateIndex, optional
+        Index to be filled with terminology candidates, their counts and sentence ids
 
     Returns
     -------
     all_terms : list
         List of terminology candidates
     '''
-    all_chunks = []
-    for tree in chunked:
-        chunks = []
-        # Iterate through subtrees to get individual chunks
-        raw_chunks = [subtree.leaves() for subtree in tree.subtrees() if subtree.label() == 'NP']
-        # Remove POS tags, keep words
-        for raw_chunk in raw_chunks:
-            chunk = [word_tag[0] for word_tag in raw_chunk]
-            chunks.append(' '.join(chunk))
-        if len(chunks) > 0:
-            all_chunks.append(chunks)
-
-    term_list = []
-    # Remove sublists in all_chunks list, returns a list with chunks
-    for sublist in all_chunks:
-        term_list.extend(sublist)
-
-    all_terms = []
-    # Remove all one-character terminology candidates
-    for t in term_list:
-        if len(t) > 1 and t not in all_terms:
-            all_terms.append(t)
+    if index is None:
+        index = TermCandidateIndex()
+
+    for sent_id, tree in enumerate(chunked):
+        for chunk in iter_chunks([tree]):
+            # Skips one-character terminology candidates
+            if len(chunk) > 1:
+                index.add(chunk, sent_id)
+
+    all_terms = index.get_candidates()
 
     return all_terms
 
 
-def extract_context(term_cand, sent_list):
-    '''Takes in term candidate and list of sentences as inputs, returns all sentences in which
-    the term candidate is mentioned.
+def count_chunks(chunked, k=1000, epsilon=None, delta=0.01):
+    '''Takes in an iterable of chunked sentences and counts noun phrases longer than one character in a Count-Min
+    sketch, keeping only the k most frequent ones. Memory does not grow with the number of sentences, and the
+    sketch is dimensioned by epsilon_for(k) unless epsilon is given.
+    Returns candidates ranked by estimated frequency, which exceeds the true frequency by at most
+    epsilon times the number of counted noun phrases with probability 1 - delta.
+
+    Parameters
+    ----------
+    chunked : iterable
+        Parse trees or lists of noun phrases for terminology candidate extraction
+    k : int
+        Number of terminology candidates to be kept
+    epsilon : float, optional
+        Relative error bound of estimated frequencies
+    delta : float
+        Probability of exceeding error bound
+
+    Returns
+    -------
+    heavy_hitters : HeavyHitters
+        Most frequent terminology candidates and their frequency sketch
+    '''
+    heavy_hitters = HeavyHitters(k, epsilon, delta)
+    for chunk in iter_chunks(chunked):
+        # Skips one-character terminology candidates
+        if len(chunk) > 1:
+            heavy_hitters.add(chunk)
+
+    return heavy_hitters
+
+
+def select_candidates(chunked, top_k=None, scoring=None, min_score=None):
+    '''Takes in chunked sentences, returns all terminology candidates in order of first occurrence or, if top_k
+    is given, the top_k most frequent ones counted in fixed memory, ranked by frequency. If scoring is given,
+    candidates are counted exactly and ranked by termhood score instead, keeping the top_k best ones and those
+    scoring at least min_score.
+
+    Parameters
+    ----------
+    chunked : iterable
+        Parse trees or lists of noun phrases for terminology candidate extraction
+    top_k : int, optional
+        Number of most frequent, or best scoring, terminology candidates to be kept
+    scoring : str, optional
+        Termhood score to rank candidates by, one of SCORING_METHODS
+    min_score : float, optional
+        Lowest termhood score of terminology candidates to be kept, if scoring is given
+
+    Returns
+    -------
+    term_candidates : list
+        List of terminology candidates
+    '''
+    if scoring is not None:
+        index = TermCandidateIndex()
+        get_chunks(chunked, index)
+        return rank_candidates(index, scoring, top_k, min_score)
+
+    if top_k is None:
+        return get_chunks(chunked)
+
+    return [term_cand for term_cand, _ in count_chunks(chunked, top_k).items()]
+
+
+def iter_context(term_cand, sent_list, index=None):
+    '''Takes in term candidate, list of sentences and optional sentence index as inputs, yields every sentence
+    in which the term candidate is mentioned together with its position in the list. When a sentence index built
+    from the sentence list is given, only the sentences containing every word of the term candidate are checked.
+
+    Parameters
+    ----------
+    term_cand : str
+        Terminology candidate
+    sent_list : list or SpanDocument
+        List of sentences to be checked for candidate and context
+    index : SentenceIndex, optional
+        Sentence index built from sent_list
+
+    Yields
+    ------
+    sent_id : int
+        Position of sentence in sent_list
+    context : str
+        Sentence in which terminology candidate appears, from its first letter or digit on
+    '''
+    if index is None:
+        # Checks every sentence
+        document = to_document(sent_list)
+        sent_ids = range(len(document))
+    else:
+        # Checks only sentences found in the index
+        document = index.document
+        sent_ids = index.lookup(term_cand)
+    text, folded = document.text, document.folded
+    whole_term = None
+    seen = set()
+
+    for i in sent_ids:
+        # Checks presence of terminology candidate in the casefolded sentence, without slicing it
+        fold_start, fold_end = document.get_folded_span(i)
+        if folded.find(term_cand, fold_start, fold_end) < 0:
+            continue
+        # Checks if term in string is a separate word; sentences are surrounded by non-word characters
+        if whole_term is None:
+            whole_term = re.compile(r'\b' + re.escape(term_cand) + r'\b')
+        if whole_term.search(folded, fold_start, fold_end) is None:
+            continue
+        start, end = document.get_span(i)
+        first_letter = FIRST_UPPER.search(text, start, end)
+        # Filters out sentences consisting only of terminology candidate and non-words
+        if first_letter is None:
+            continue
+        context = text[first_letter.start():end]
+        # Skips sentence already returned, which can only be one starting with its first letter or digit
+        if first_letter.start() == start and context in seen:
+            continue
+        seen.add(context)
+        yield i, context
+
+
+def extract_context(term_cand, sent_list, index=None):
+    '''Takes in term candidate, list of sentences and optional sentence index as inputs, returns all sentences
+    in which the term candidate is mentioned. When a sentence index built from the sentence list is given, only
+    the sentences containing every word of the term candidate are checked.
 
     Parameters
     ----------
     term_cand : str
         Terminology candidate
-    sent_list : list
+    sent_list : list or SpanDocument
         List of sentences to be checked for candidate and context
+    index : SentenceIndex, optional
+        Sentence index built from sent_list
 
     Returns
     -------
     context : list
         List of sentences in which terminology candidate appears
     '''
+    return [context for _, context in iter_context(term_cand, sent_list, index)]
+
+
+def extract_context_pages(term_cand, sent_list, sent_pages, index=None):
+    '''Takes in term candidate, list of sentences, their page numbers and optional sentence index as inputs,
+    returns the same context sentences as extract_context together with the page every one of them starts on.
+
+    Parameters
+    ----------
+    term_cand : str
+        Terminology candidate
+    sent_list : list or SpanDocument
+        List of sentences to be checked for candidate and context
+    sent_pages : array
+        Page number of every sentence in sent_list, as returned by split_page_sentences
+    index : SentenceIndex, optional
+        Sentence index built from sent_list
+
+    Returns
+    -------
+    context : list
+        List of sentences in which terminology candidate appears
+    pages : array
+        Page number of every context sentence
+    '''
     context = []
-    
-    for s in sent_list:
-        # Checks presence of terminology candidate in the sentence regardless of case 
-        if term_cand in s.casefold() and s not in context:
-            # Checks if term in string is a separate word 
-            true_term = re.findall(r'\b' + term_cand + r'\b', s.casefold())
-            if term_cand not in true_term:
-                continue
-            else:
-                first_letter = re.search(r'[A-Z0-9]', s)
-                # Filters out sentences consisting only of terminology candidate and non-words
-                if first_letter is not None:
-                    context.append(s[s.index(first_letter.group()):])
+    pages = array.array('I')
+    for sent_id, sentence in iter_context(term_cand, sent_list, index):
+        context.append(sentence)
+        pages.append(sent_pages[sent_id])
 
-    return context
+    return context, pages
 
 
-def extract_def(term_cand, context):
+def extract_contexts(term_candidates, sent_list, index=None, sent_pages=None):
+    '''Takes in terminology candidates, list of sentences, optional sentence index and optional page numbers
+    of sentences, returns context sentences of every candidate and, if page numbers are given, their pages.
+
+    Parameters
+    ----------
+    term_candidates : list
+        List of terminology candidates
+    sent_list : list or SpanDocument
+        List of sentences to be checked for candidates and context
+    index : SentenceIndex, optional
+        Sentence index built from sent_list
+    sent_pages : array, optional
+        Page number of every sentence in sent_list
+
+    Returns
+    -------
+    contexts : dict
+        Terminology candidates as keys and lists of their context sentences as values
+    pages : dict or None
+        Terminology candidates as keys and page numbers of their context sentences as values, None if sent_pages
+        is not given
+    '''
+    if sent_pages is None:
+        return {candidate: extract_context(candidate, sent_list, index) for candidate in term_candidates}, None
+
+    contexts = {}
+    pages = {}
+    for candidate in term_candidates:
+        contexts[candidate], pages[candidate] = extract_context_pages(candidate, sent_list, sent_pages, index)
+
+    return contexts, pages
+
+
+def extract_def(term_cand, context, linear=True, max_length=None):
     '''Takes in terminology candidate and list of sentences in which the candidate appears, 
     parses over it and finds definitions corresponding to defined patterns. 
-    Returns list of possible definitions for terminology candidates.
+    Returns list of possible definitions for terminology candidates. By default, definitions are matched by
+    match_def, in time linear in the length of sentences; if linear is False, the patterns are matched as regular
+    expressions with the candidate inserted as it is, which backtracks on long sentences. Sentences longer than
+    max_length characters, such as reference lists and tables run together, are not searched.
 
     Parameters
     ----------
@@ -103,37 +366,28 @@ def extract_def(term_cand, context):
         Terminology candidate
     context : list
         List of sentences in which terminology candidate appears
+    linear : bool
+        Whether to match definitions in linear time, with the candidate escaped
+    max_length : int, optional
+        Length of the longest sentence to be searched for definitions
 
     Returns
     -------
     definitions : list
         List of possible definitions for terminology candidate
     '''
-    # Signal words and phrases preceding definition
-    patterns_pre = [r'\s?—\s',
-                    r'\sis\s',
-                    r'\sare\s',
-                    r'\,\sthat\sis\,?\s',
-                    r'\,\snamely\s',
-                    r'\scan\sbe\sdescribed\sas\s',
-                    r'\srefers?\sto\s',
-                    r'\smeans?\s',
-                    r'\ssays?\sthat\s',
-                    ]
-    
-    # Signal words and phrases following definition
-    patterns_pos = [r'\,\sthat\sis\,?\s',
-                    r'defines?\s',
-                    r'describes?\s',
-                    ]
-
     all_def = []
     
     # Loops over context sentences and finds all sentences corresponding to definition patterns
     for s in context:
-      for pattern in patterns_pre:
+      if max_length is not None and len(s) > max_length:
+          continue
+      if linear:
+          all_def.append(match_def(term_cand, s))
+          continue
+      for pattern in PATTERNS_PRE:
           all_def.append(re.findall(term_cand + pattern + r'\b.+\Z', s, flags=re.IGNORECASE))
-      for pattern in patterns_pos:
+      for pattern in PATTERNS_POS:
           all_def.append(re.findall(r'[A-Z0-9].+' + pattern + term_cand + r'\b.*\Z', s, flags=re.IGNORECASE))
     
     # Removes sublists in full_def list, returns a list with definitions
@@ -143,12 +397,223 @@ def extract_def(term_cand, context):
 
     # Appends possible definitions to definition list after checking if they are not empty strings and are not
     # already present in the definition list
+    definitions = [def_cand for def_cand in dict.fromkeys(full_def) if def_cand != '']
+
+    return definitions
+
+
+def match_def(term_cand, sentence):
+    '''Takes in terminology candidate and a sentence, returns the definitions the patterns of extract_def match
+    in it, with the candidate escaped, in time linear in the length of the sentence. A definition runs from the
+    candidate followed by a signal phrase, or from the first letter or digit before a signal phrase followed by
+    the candidate, to the end of the sentence, which it shares no line break with. Signal phrases have no
+    repetition, so a candidate and a signal phrase match at most one way at every position; every position is
+    tried once, instead of backtracking over the rest of the sentence from every letter. Signal phrases are matched
+    by the patterns compiled once in CUES_PRE and CUES_POS, and only the candidate is compiled for every call.
+
+    Parameters
+    ----------
+    term_cand : string
+        Terminology candidate
+    sentence : str
+        Sentence in which terminology candidate appears
+
+    Returns
+    -------
+    definitions : list
+        Definitions matched, at most one per pattern, in order of PATTERNS_PRE and PATTERNS_POS
+    '''
+    term = re.compile(re.escape(term_cand), flags=re.IGNORECASE)
+    last_break = sentence.rfind('\n')
     definitions = []
-    for def_cand in full_def:
-        if def_cand == '':
-            full_def.remove(def_cand)
-        elif def_cand not in definitions:
-            definitions.append(def_cand)    
+
+    # Finds every start of candidate once, overlapping ones included
+    term_starts = []
+    match = term.search(sentence)
+    while match is not None:
+        term_starts.append(match.start())
+        match = term.search(sentence, match.start() + 1)
+    if len(term_starts) == 0:
+        return definitions
+
+    for cue in CUES_PRE:
+        for start in term_starts:
+            match = cue.match(sentence, start + len(term_cand))
+            # Skips matches followed by a line break, leftmost match left is the start of definition
+            if match is not None and match.end() > last_break:
+                definitions.append(sentence[start:])
+                break
+
+    first_alnums = {}
+    for cue in CUES_POS:
+        match = cue.search(sentence)
+        while match is not None:
+            end = match.end() + len(term_cand)
+            if end > last_break and term.match(sentence, match.end()) and WORD_BOUNDARY.match(sentence, end):
+                # Definition starts at first letter or digit of the line signal phrase is on, at least two
+                # characters before it; matches on the last line share that line, so it is only looked up once
+                if match.start() > last_break:
+                    line_start = last_break + 1
+                else:
+                    line_start = sentence.rfind('\n', 0, match.start()) + 1
+                if line_start not in first_alnums:
+                    first_alnums[line_start] = FIRST_ALNUM.search(sentence, line_start)
+                first_alnum = first_alnums[line_start]
+                if first_alnum is not None and first_alnum.start() + 2 <= match.start():
+                    definitions.append(sentence[first_alnum.start():])
+                    break
+            match = cue.search(sentence, match.start() + 1)
 
     return definitions
 
+
+def scan_definitions(sentence, lookup):
+    '''Takes in a context sentence and a lookup table of terminology candidates. It scans the sentence once
+    for signal words and phrases and looks up the text right before or after each of them among candidates.
+    Returns the definitions extract_def would find in the sentence for every candidate, or None if the sentence
+    contains characters that make case-insensitive lookup unreliable and has to be checked by extract_def.
+
+    Parameters
+    ----------
+    sentence : str
+        Context sentence to be scanned
+    lookup : dict
+        Candidate lengths as keys and dicts mapping case-normalized candidates to candidates as values
+
+    Returns
+    -------
+    found : dict or None
+        Terminology candidates as keys and lists of definitions, one slot per pattern, as values
+    '''
+    lowered = sentence.lower()
+    if len(lowered) != len(sentence) or '\n' in sentence:
+        return None
+    normalized = lowered.translate(CASE_FIXES)
+    first_alnum = FIRST_ALNUM.search(sentence)
+
+    pre_starts = {}
+    pos_found = set()
+    for cue in CUE_SCANNER.finditer(sentence):
+        pos = cue.start()
+        # Looks up candidates ending right before signal phrase preceding definition, leftmost one is kept
+        for k, pattern in enumerate(CUES_PRE):
+            if pattern.match(sentence, pos):
+                for length, terms in lookup.items():
+                    if length <= pos:
+                        for term in terms.get(normalized[pos - length:pos], ()):
+                            pre_starts.setdefault((term, k), pos - length)
+        # Looks up candidates starting right after signal phrase following definition
+        for k, pattern in enumerate(CUES_POS):
+            match = pattern.match(sentence, pos)
+            if match is not None and first_alnum is not None and first_alnum.start() + 2 <= pos:
+                end = match.end()
+                for length, terms in lookup.items():
+                    if end + length <= len(sentence) and WORD_BOUNDARY.match(sentence, end + length):
+                        for term in terms.get(normalized[end:end + length], ()):
+                            pos_found.add((term, k))
+
+    # Orders definitions by pattern, as extract_def does
+    found = {}
+    n_slots = len(CUES_PRE) + len(CUES_POS)
+    for (term, k), start in pre_starts.items():
+        found.setdefault(term, [None] * n_slots)[k] = sentence[start:]
+    for term, k in pos_found:
+        found.setdefault(term, [None] * n_slots)[len(CUES_PRE) + k] = sentence[first_alnum.start():]
+
+    return found
+
+
+def extract_all_defs(contexts, max_length=None):
+    '''Takes in context sentences of all terminology candidates and finds their definitions. Every distinct
+    context sentence is scanned once for all candidates instead of matching every pattern for every candidate.
+    Returns the same definitions as calling extract_def for each candidate.
+
+    Parameters
+    ----------
+    contexts : dict
+        Terminology candidates as keys and lists of their context sentences as values
+    max_length : int, optional
+        Length of the longest sentence to be searched for definitions
+
+    Returns
+    -------
+    all_definitions : dict
+        Terminology candidates as keys and lists of possible definitions as values
+    '''
+    # Groups candidates by length and case-normalized form for hash lookup
+    lookup = {}
+    for term_cand in contexts:
+        key = term_cand.lower().translate(CASE_FIXES)
+        if len(key) == len(term_cand):
+            lookup.setdefault(len(key), {}).setdefault(key, []).append(term_cand)
+
+    scanned = {}
+    all_definitions = {}
+    for term_cand, context in contexts.items():
+        definitions = {}
+        for s in context:
+            if max_length is not None and len(s) > max_length:
+                continue
+            if s not in scanned:
+                scanned[s] = scan_definitions(s, lookup)
+            found = scanned[s]
+            # Falls back to pattern matching for sentences and candidates the lookup cannot handle
+            if found is None or len(term_cand.lower()) != len(term_cand):
+                new_defs = extract_def(term_cand, [s])
+            else:
+                new_defs = [d for d in found.get(term_cand, ()) if d is not None]
+            definitions.update(dict.fromkeys(new_defs))
+        all_definitions[term_cand] = list(definitions)
+
+    return all_definitions
+
+
+def find_definable(term_candidates, sent_list, index=None):
+    '''Takes in terminology candidates and list of sentences, returns the candidates which may have a definition,
+    a superset of those extract_all_defs finds at least one definition for, in time linear in the length of the
+    text. A definition needs the candidate right before a signal phrase preceding definition, where the last word
+    of the candidate may end a longer word, or right after a signal phrase following definition. Words next to
+    signal phrases are collected in one pass over the casefolded text for either kind of signal phrase, and
+    candidates whose last or first word is not among them are left out. Whether an entry has a definition is
+    checked on access, see LazyTermEntry.has_definition.
+
+    Parameters
+    ----------
+    term_candidates : list
+        List of terminology candidates
+    sent_list : list or SpanDocument
+        List of sentences to be checked for definitions
+    index : SentenceIndex, optional
+        Sentence index built from sent_list, built if needed and not given
+
+    Returns
+    -------
+    definable : set
+        Terminology candidates which may have a definition
+    '''
+    document = to_document(sent_list)
+    folded = document.folded
+
+    # Collects every ending of words right before signal phrases preceding definition, reversed, and words right
+    # after signal phrases following definition
+    endings_before = set()
+    for match in WORD_BEFORE_PRE.finditer(folded[::-1]):
+        word = match.group(1)
+        endings_before.update(word[:i] for i in range(1, len(word) + 1))
+    words_after = {match.group(1) for match in WORD_AFTER_POS.finditer(folded)}
+
+    # Finds sentences whose signal phrases or candidates casefolding may not match as IGNORECASE matching does
+    unfolded = {bisect.bisect_right(document.starts, match.start()) - 1 for match in UNFOLDED_I.finditer(document.text)}
+    if unfolded and index is None:
+        index = SentenceIndex(document)
+
+    definable = set()
+    for term_cand in term_candidates:
+        tokens = TOKEN.findall(term_cand)
+        # Keeps candidates not starting and ending with a word, and candidates in such sentences, for exact check
+        if (len(tokens) == 0 or not term_cand.startswith(tokens[0]) or not term_cand.endswith(tokens[-1])
+                or tokens[-1][::-1] in endings_before or tokens[0] in words_after
+                or (unfolded and any(sent_id in unfolded for sent_id in index.lookup(term_cand)))):
+            definable.add(term_cand)
+
+    return definable
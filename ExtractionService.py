@@ -0,0 +1,530 @@
+'''Extraction Service Module
+
+This module is a local HTTP service running the terminology extraction pipeline for other programs. It is built
+on asyncio and needs no web framework. Uploaded .PDF files are queued as jobs and handed to a pool of worker
+processes started and warmed up with PyMuPDF and the POS tagger before the first request, so that no request pays
+for loading them. The job queue is bounded: when it is full, uploads are refused with status 429 and a
+Retry-After header. Identical uploads with the same options share one job while it is queued, running or kept
+finished, unless it failed. If a worker process dies, the pool is started and warmed up again, and jobs it was
+running fail. Uploads are handed to workers as bytes and opened by PyMuPDF in memory, without temporary files. It
+requires argparse, asyncio, concurrent.futures, hashlib, itertools, json, multiprocessing, os, sys, traceback
+and urllib libraries, and the batch processing module.
+
+Endpoints
+---------
+POST /jobs?top_k=&scoring=&min_score=&max_def_length=&name=
+    Queues .PDF file sent as request body, returns job id and status
+GET /jobs/<id>
+    Returns status of job, and number of entries or error once it is done
+GET /jobs/<id>/result
+    Waits for job to finish, streams its terminology entries as JSON Lines
+GET /health
+    Returns number of workers, queued jobs and kept jobs
+
+Functions
+---------
+warm_worker(barrier)
+    Loads PyMuPDF and the POS tagger in a worker process
+check_in()
+    Waits in a warm worker process until every worker of the pool waits too, returns its process id
+extract_records(pdf, name, options)
+    Takes in content of uploaded .PDF file, returns its terminology entries as dictionaries
+main(argv)
+    Runs the service from the command line
+
+Classes
+-------
+Job(job_id, key, name, options)
+    Extraction of one uploaded .PDF file
+ExtractionService(workers, queue_size, max_jobs, max_upload)
+    HTTP service queueing uploads and running them in a warm worker pool
+'''
+
+import argparse, asyncio, concurrent.futures, hashlib, itertools, json, multiprocessing, os, sys, traceback
+import urllib.parse
+from BatchProcessing import *
+
+
+# Reason phrases of the status codes the service answers with
+REASONS = {200: 'OK', 202: 'Accepted', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           411: 'Length Required', 413: 'Payload Too Large', 429: 'Too Many Requests',
+           500: 'Internal Server Error'}
+
+# Barrier of the pool a worker process belongs to, set by warm_worker
+_warm_barrier = None
+
+
+def warm_worker(barrier=None):
+    '''Loads PyMuPDF and the POS tagger in a worker process as it starts, leaving errors to the first job that
+    needs them. Barrier is kept for check_in, since barriers are only handed to processes as they start.
+
+    Parameters
+    ----------
+    barrier : Barrier, optional
+        Barrier for all workers of the pool
+
+    Returns
+    -------
+    None
+    '''
+    global _warm_barrier
+    _warm_barrier = barrier
+    preload_tagger()
+    try:
+        import fitz
+    except Exception:
+        pass
+
+
+def check_in():
+    '''Waits in a worker process, which has run warm_worker before taking any task, until every worker of the pool
+    waits as well. A worker waiting here takes no other task, so as many check-ins as workers run in every worker.
+
+    Returns
+    -------
+    pid : int
+        Id of worker process
+    '''
+    _warm_barrier.wait()
+
+    return os.getpid()
+
+
+def extract_records(pdf, name, options):
+    '''Takes in content of an uploaded .PDF file and runs the whole pipeline on it in a worker process. Entries
+    are returned as dictionaries, which are cheaper to send back to the service than TermEntry objects.
+
+    Parameters
+    ----------
+    pdf : bytes
+        Content of uploaded .PDF file
+    name : str
+        Name of file to be written in entries
+    options : dict
+        Options of create_entry
+
+    Returns
+    -------
+    records : list
+        Dictionaries of terminology entries, as returned by entry_to_dict
+    '''
+    return [entry_to_dict(name, entry) for entry in create_entry(pdf, **options)]
+
+
+class Job:
+    '''Class for representing the extraction of one uploaded .PDF file.
+
+    Attributes
+    ----------
+    job_id : str
+        Id of job
+    key : tuple
+        Hash of file content and options, identical uploads have the same key
+    name : str
+        Name of file
+    options : dict
+        Options of create_entry
+    pdf : bytes or None
+        Content of file, released once job is finished
+    status : str
+        queued, running, done or failed
+    records : list or None
+        Dictionaries of terminology entries, None until job is done
+    error : str or None
+        Traceback of exception raised by job, None unless job failed
+    finished : Event
+        Event set when job is done or failed
+    '''
+
+    def __init__(self, job_id, key, name, options, pdf):
+        '''Construct queued job.
+
+        Parameters
+        ----------
+        job_id : str
+            Id of job
+        key : tuple
+            Hash of file content and options
+        name : str
+            Name of file
+        options : dict
+            Options of create_entry
+        pdf : bytes
+            Content of file
+
+        Returns
+        -------
+        None
+        '''
+        self.job_id = job_id
+        self.key = key
+        self.name = name
+        self.options = options
+        self.pdf = pdf
+        self.status = 'queued'
+        self.records = None
+        self.error = None
+        self.finished = asyncio.Event()
+
+
+    def get_status(self):
+        '''Retrieves status of job.
+
+        Returns
+        -------
+        status : dict
+            Job id, file name, status, and number of entries or error once job is done
+        '''
+        status = {'job': self.job_id, 'name': self.name, 'status': self.status}
+        if self.records is not None:
+            status['entries'] = len(self.records)
+        if self.error is not None:
+            status['error'] = self.error
+
+        return status
+
+
+class ExtractionService:
+    '''Class for representing an HTTP service running the pipeline on uploaded .PDF files in a warm worker pool.
+
+    Attributes
+    ----------
+    workers : int
+        Number of worker processes, and of jobs running at a time
+    queue : Queue
+        Jobs waiting for a worker, bounded to queue_size
+    jobs : dict
+        Job ids as keys and jobs as values, finished jobs are forgotten oldest first beyond max_jobs
+    keys : dict
+        Keys of uploads as keys and jobs as values, for jobs in jobs which have not failed
+    max_jobs : int
+        Number of jobs kept, including finished ones
+    max_upload : int
+        Largest accepted upload in bytes
+    pool : ProcessPoolExecutor or None
+        Worker processes, None until the service is started, replaced if a worker process dies
+    worker_pids : list
+        Process ids of warm workers, empty until the service is started
+    server : Server or None
+        asyncio server, None until the service is started
+
+    Methods
+    -------
+    start(self, host, port):
+        Starts and warms up worker pool, then starts accepting connections
+    stop(self):
+        Stops accepting connections and shuts worker pool down
+    submit(self, body, query):
+        Queues upload unless an identical one has a job, returns HTTP status and job
+    '''
+
+    def __init__(self, workers=None, queue_size=32, max_jobs=1000, max_upload=100 * 2**20):
+        '''Construct service, which is not started yet.
+
+        Parameters
+        ----------
+        workers : int, optional
+            Number of worker processes, defaults to number of CPUs
+        queue_size : int
+            Number of jobs that can wait for a worker before uploads are refused
+        max_jobs : int
+            Number of jobs kept for status and result requests
+        max_upload : int
+            Largest accepted upload in bytes
+
+        Returns
+        -------
+        None
+        '''
+        self.workers = workers or os.cpu_count() or 1
+        self.queue = asyncio.Queue(queue_size)
+        self.jobs = {}
+        self.keys = {}
+        self.max_jobs = max_jobs
+        self.max_upload = max_upload
+        self.pool = None
+        self.worker_pids = []
+        self.server = None
+        self._ids = itertools.count(1)
+        self._dispatchers = []
+        self._pool_lock = asyncio.Lock()
+
+
+    async def start(self, host='127.0.0.1', port=8765):
+        '''Starts worker processes and waits until every one of them has loaded PyMuPDF and the POS tagger, then
+        starts dispatching jobs and accepting connections.
+
+        Parameters
+        ----------
+        host : str
+            Address to listen on, local only by default
+        port : int
+            Port to listen on, 0 for any free port
+
+        Returns
+        -------
+        port : int
+            Port the service listens on
+        '''
+        await self._start_pool()
+        self._dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(self.workers)]
+        self.server = await asyncio.start_server(self._handle, host, port)
+
+        return self.server.sockets[0].getsockname()[1]
+
+
+    async def _start_pool(self):
+        '''Starts worker processes and waits until every one of them has loaded PyMuPDF and the POS tagger.'''
+        loop = asyncio.get_running_loop()
+        barrier = multiprocessing.Barrier(self.workers)
+        pool = concurrent.futures.ProcessPoolExecutor(self.workers, initializer=warm_worker, initargs=(barrier,))
+        # Check-ins wait for each other, so that every worker takes one once it has warmed up, whether workers are
+        # all started at once or as tasks find none idle
+        self.worker_pids = await asyncio.gather(*[loop.run_in_executor(pool, check_in) for _ in range(self.workers)])
+        self.pool = pool
+
+
+    async def _restart_pool(self, broken):
+        '''Replaces worker pool broken by a worker process dying, unless another dispatcher already did.'''
+        async with self._pool_lock:
+            if self.pool is broken:
+                broken.shutdown(wait=False, cancel_futures=True)
+                await self._start_pool()
+
+
+    async def stop(self):
+        '''Stops accepting connections and dispatching jobs, and shuts worker pool down.
+
+        Returns
+        -------
+        None
+        '''
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        for dispatcher in self._dispatchers:
+            dispatcher.cancel()
+        await asyncio.gather(*self._dispatchers, return_exceptions=True)
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+
+
+    def submit(self, body, query):
+        '''Queues uploaded .PDF file as a new job, unless a job for identical content and options is kept.
+
+        Parameters
+        ----------
+        body : bytes
+            Content of .PDF file
+        query : dict
+            Query parameters: top_k, scoring, min_score, max_def_length and name, all optional
+
+        Returns
+        -------
+        status : int
+            202 for a new job, 200 for a job of an identical upload, 429 if the queue is full
+        job : Job or None
+            Job of upload, None if it was refused
+        '''
+        options = {}
+        if 'top_k' in query:
+            options['top_k'] = int(query['top_k'])
+        if 'scoring' in query:
+            if query['scoring'] not in SCORING_METHODS:
+                raise ValueError('scoring must be one of {}'.format(SCORING_METHODS))
+            options['scoring'] = query['scoring']
+        if 'min_score' in query:
+            options['min_score'] = float(query['min_score'])
+        if 'max_def_length' in query:
+            options['max_def_length'] = int(query['max_def_length'])
+        key = (hashlib.sha256(body).hexdigest(), tuple(sorted(options.items())))
+
+        job = self.keys.get(key)
+        if job is not None:
+            return 200, job
+        if self.queue.full():
+            return 429, None
+
+        job_id = str(next(self._ids))
+        job = Job(job_id, key, query.get('name', job_id + '.pdf'), options, body)
+        self.jobs[job_id] = job
+        self.keys[key] = job
+        self.queue.put_nowait(job)
+        self._forget_finished()
+
+        return 202, job
+
+
+    def _forget_finished(self):
+        '''Forgets finished jobs, oldest first, while more than max_jobs are kept.'''
+        for job_id in list(self.jobs):
+            if len(self.jobs) <= self.max_jobs:
+                break
+            job = self.jobs[job_id]
+            if job.finished.is_set():
+                del self.jobs[job_id]
+                if self.keys.get(job.key) is job:
+                    del self.keys[job.key]
+
+
+    async def _dispatch(self):
+        '''Takes jobs from queue one at a time and runs them in the worker pool, until cancelled.'''
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            job.status = 'running'
+            # Waits for pool being replaced
+            async with self._pool_lock:
+                pool = self.pool
+            broken = False
+            try:
+                job.records = await loop.run_in_executor(pool, extract_records, job.pdf, job.name, job.options)
+                job.status = 'done'
+            except Exception as error:
+                job.error = traceback.format_exc()
+                job.status = 'failed'
+                broken = isinstance(error, concurrent.futures.process.BrokenProcessPool)
+                # Lets identical uploads run again instead of sharing failed job
+                if self.keys.get(job.key) is job:
+                    del self.keys[job.key]
+            finally:
+                job.pdf = None
+                job.finished.set()
+                self.queue.task_done()
+            if broken:
+                await self._restart_pool(pool)
+
+
+    async def _handle(self, reader, writer):
+        '''Reads one HTTP request from a connection, answers it and closes the connection.'''
+        try:
+            request_line = (await reader.readline()).decode('latin-1').split()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode('latin-1')
+                if line in ('\r\n', '\n', ''):
+                    break
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+            if len(request_line) != 3:
+                await self._send_json(writer, 400, {'error': 'malformed request line'})
+                return
+            method, target, _ = request_line
+            url = urllib.parse.urlsplit(target)
+            query = dict(urllib.parse.parse_qsl(url.query))
+            await self._route(method, url.path.rstrip('/').split('/')[1:], query, headers, reader, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception:
+            await self._send_json(writer, 500, {'error': traceback.format_exc()})
+        finally:
+            writer.close()
+
+
+    async def _route(self, method, path, query, headers, reader, writer):
+        '''Answers request for path, split into its parts, with the matching endpoint.'''
+        if path == ['health'] and method == 'GET':
+            await self._send_json(writer, 200, {'workers': self.workers, 'queued': self.queue.qsize(),
+                                                'jobs': len(self.jobs)})
+        elif path == ['jobs'] and method == 'POST':
+            if 'content-length' not in headers:
+                await self._send_json(writer, 411, {'error': 'Content-Length required'})
+                return
+            length = int(headers['content-length'])
+            if length > self.max_upload:
+                await self._send_json(writer, 413, {'error': 'upload larger than {} bytes'.format(self.max_upload)})
+                return
+            body = await reader.readexactly(length)
+            try:
+                status, job = self.submit(body, query)
+            except ValueError as error:
+                await self._send_json(writer, 400, {'error': str(error)})
+                return
+            if job is None:
+                await self._send_json(writer, 429, {'error': 'job queue is full'}, {'Retry-After': '5'})
+            else:
+                await self._send_json(writer, status, job.get_status(),
+                                      {'Location': '/jobs/{}'.format(job.job_id)})
+        elif len(path) in (2, 3) and path[0] == 'jobs' and method == 'GET':
+            job = self.jobs.get(path[1])
+            if job is None:
+                await self._send_json(writer, 404, {'error': 'unknown job'})
+            elif len(path) == 2:
+                await self._send_json(writer, 200, job.get_status())
+            elif path[2] == 'result':
+                await job.finished.wait()
+                await self._send_records(writer, job)
+            else:
+                await self._send_json(writer, 404, {'error': 'unknown endpoint'})
+        elif path and path[0] in ('health', 'jobs'):
+            await self._send_json(writer, 405, {'error': 'method not allowed'})
+        else:
+            await self._send_json(writer, 404, {'error': 'unknown endpoint'})
+
+
+    async def _send_json(self, writer, status, body, headers=None):
+        '''Writes response with JSON body.'''
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        head = ['HTTP/1.1 {} {}'.format(status, REASONS[status]), 'Content-Type: application/json',
+                'Content-Length: {}'.format(len(data)), 'Connection: close']
+        head.extend('{}: {}'.format(name, value) for name, value in (headers or {}).items())
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + data)
+        await writer.drain()
+
+
+    async def _send_records(self, writer, job):
+        '''Writes response streaming terminology entries of finished job as JSON Lines, one chunk per entry, or
+        its error if it failed.'''
+        if job.status == 'failed':
+            await self._send_json(writer, 500, job.get_status())
+            return
+        writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\nTransfer-Encoding: chunked\r\n'
+                     b'Connection: close\r\n\r\n')
+        for record in job.records:
+            line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+            writer.write(b'%x\r\n%s\r\n' % (len(line), line))
+            # Waits for slow clients, so that results are not buffered in memory twice
+            await writer.drain()
+        writer.write(b'0\r\n\r\n')
+        await writer.drain()
+
+
+def main(argv=None):
+    '''Runs the service from the command line until interrupted.
+
+    Parameters
+    ----------
+    argv : list, optional
+        Command line arguments, defaults to sys.argv[1:]
+
+    Returns
+    -------
+    status : int
+        0 once the service stopped
+    '''
+    parser = argparse.ArgumentParser(description='Serve terminology extraction of uploaded .PDF files over HTTP.')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on')
+    parser.add_argument('--port', type=int, default=8765, help='port to listen on')
+    parser.add_argument('-w', '--workers', type=int, default=None, help='number of worker processes')
+    parser.add_argument('-q', '--queue-size', type=int, default=32, help='number of jobs that can wait')
+    args = parser.parse_args(argv)
+
+    async def serve():
+        service = ExtractionService(args.workers, args.queue_size)
+        port = await service.start(args.host, args.port)
+        print('Listening on http://{}:{} with {} workers'.format(args.host, port, service.workers), flush=True)
+        try:
+            await service.server.serve_forever()
+        finally:
+            await service.stop()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
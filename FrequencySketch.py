@@ -0,0 +1,283 @@
+'''Frequency Sketch Module
+
+This module contains fixed-memory data structures for counting terminology candidates over text streams of
+any size. Count-Min sketch gives approximate frequencies that never underestimate the true count and
+overestimate it by at most epsilon times the stream length with probability 1 - delta. Heavy hitters keep
+the k most frequent candidates on top of it. It requires array, hashlib, heapq and math libraries.
+
+Functions
+---------
+epsilon_for(k)
+    Takes in number of items to be kept, returns error bound small enough for ranking them
+
+Classes
+-------
+CountMinSketch(epsilon, delta)
+    Approximate frequency table of fixed size
+HeavyHitters(k, epsilon, delta)
+    Top-k most frequent items over Count-Min sketch
+'''
+
+import array, hashlib, heapq, math
+
+
+# The k-th most frequent noun phrase of a paper makes up about a tenth of 1 / k of all noun phrases, and
+# frequencies of kept items may be overestimated by a tenth of that; error bounds smaller than MIN_EPSILON, the
+# bound of a default sketch of about 1 MB, are not used
+TOP_K_ERROR = 0.01
+MIN_EPSILON = 0.0001
+
+
+def epsilon_for(k):
+    '''Takes in number of items to be kept, returns error bound of estimated frequencies small enough for ranking
+    them, TOP_K_ERROR / k but not below MIN_EPSILON, so that the sketch is smaller for shorter lists of items.
+
+    Parameters
+    ----------
+    k : int
+        Number of items to be kept
+
+    Returns
+    -------
+    epsilon : float
+        Relative error bound of estimated frequencies
+    '''
+    return min(max(TOP_K_ERROR / k, MIN_EPSILON), 0.5)
+
+
+class CountMinSketch:
+    '''Class for representing Count-Min sketch.
+
+    Attributes
+    ----------
+    epsilon : float
+        Relative error bound of estimated frequencies
+    delta : float
+        Probability of exceeding error bound
+    width : int
+        Number of counters per row, ceil(e / epsilon)
+    depth : int
+        Number of rows, ceil(ln(1 / delta))
+    total : int
+        Total count of items added
+    tables : list
+        Rows of counters
+
+    Methods
+    -------
+    add(self, item, count):
+        Adds count occurrences of item
+    estimate(self, item):
+        Retrieves estimated frequency of item
+    error_bound(self):
+        Retrieves maximum overestimate of frequencies
+    merge(self, other):
+        Adds counts of another sketch with same dimensions
+    '''
+
+    def __init__(self, epsilon=0.0001, delta=0.01):
+        '''Construct sketch dimensioned for given error bounds.
+
+        Parameters
+        ----------
+        epsilon : float
+            Relative error bound of estimated frequencies
+        delta : float
+            Probability of exceeding error bound
+
+        Returns
+        -------
+        None
+        '''
+        if not 0 < epsilon < 1 or not 0 < delta < 1:
+            raise ValueError('epsilon and delta must be between 0 and 1')
+        self.epsilon = epsilon
+        self.delta = delta
+        self.width = math.ceil(math.e / epsilon)
+        self.depth = math.ceil(math.log(1 / delta))
+        self.total = 0
+        self.tables = [array.array('Q', bytes(8 * self.width)) for _ in range(self.depth)]
+
+
+    def _buckets(self, item):
+        '''Retrieves one counter position per row for item, derived from a single 128-bit hash by double
+        hashing. The hash does not depend on the process, so sketches built in different processes can be merged.'''
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + row * h2) % self.width for row in range(self.depth)]
+
+
+    def add(self, item, count=1):
+        '''Adds count occurrences of item and returns its new estimated frequency.
+
+        Parameters
+        ----------
+        item : str
+            Item to be counted
+        count : int
+            Number of occurrences
+
+        Returns
+        -------
+        estimate : int
+            Estimated frequency of item
+        '''
+        self.total += count
+        estimate = None
+        for table, bucket in zip(self.tables, self._buckets(item)):
+            table[bucket] += count
+            if estimate is None or table[bucket] < estimate:
+                estimate = table[bucket]
+
+        return estimate
+
+
+    def estimate(self, item):
+        '''Retrieves estimated frequency of item, never lower than the true frequency.
+
+        Parameters
+        ----------
+        item : str
+            Counted item
+
+        Returns
+        -------
+        estimate : int
+            Estimated frequency of item
+        '''
+        return min(table[bucket] for table, bucket in zip(self.tables, self._buckets(item)))
+
+
+    def error_bound(self):
+        '''Retrieves maximum overestimate of any frequency, which holds with probability 1 - delta.
+
+        Returns
+        -------
+        bound : float
+            Epsilon times total count of items added
+        '''
+        return self.epsilon * self.total
+
+
+    def merge(self, other):
+        '''Adds counts of another sketch with same error bounds to this one.
+
+        Parameters
+        ----------
+        other : CountMinSketch
+            Sketch to be merged
+
+        Returns
+        -------
+        None
+        '''
+        if (self.width, self.depth) != (other.width, other.depth):
+            raise ValueError('Cannot merge sketches of different dimensions')
+        self.total += other.total
+        for table, other_table in zip(self.tables, other.tables):
+            for i, value in enumerate(other_table):
+                if value:
+                    table[i] += value
+
+
+class HeavyHitters:
+    '''Class for representing the k most frequent items of a stream. Memory holds the Count-Min sketch and at
+    most k items, regardless of stream length.
+
+    Attributes
+    ----------
+    k : int
+        Number of items to be kept
+    sketch : CountMinSketch
+        Sketch estimating item frequencies
+    top : dict
+        Kept items as keys and lists of estimated frequency and first-seen position as values
+
+    Methods
+    -------
+    add(self, item, count):
+        Adds count occurrences of item
+    items(self):
+        Retrieves kept items ranked by estimated frequency
+    '''
+
+    def __init__(self, k=1000, epsilon=None, delta=0.01):
+        '''Construct heavy hitters tracker, over a sketch dimensioned by epsilon_for(k) unless epsilon is given.
+
+        Parameters
+        ----------
+        k : int
+            Number of items to be kept
+        epsilon : float, optional
+            Relative error bound of estimated frequencies
+        delta : float
+            Probability of exceeding error bound
+
+        Returns
+        -------
+        None
+        '''
+        if k < 1:
+            raise ValueError('k must be a positive integer')
+        self.k = k
+        self.sketch = CountMinSketch(epsilon_for(k) if epsilon is None else epsilon, delta)
+        self.top = {}
+        self._heap = []
+        self._seen = 0
+
+
+    def add(self, item, count=1):
+        '''Adds count occurrences of item, keeping it if it is among the k most frequent items so far.
+
+        Parameters
+        ----------
+        item : str
+            Item to be counted
+        count : int
+            Number of occurrences
+
+        Returns
+        -------
+        None
+        '''
+        estimate = self.sketch.add(item, count)
+        self._seen += 1
+        if item in self.top:
+            self.top[item][0] = estimate
+        elif len(self.top) < self.k:
+            self.top[item] = [estimate, self._seen]
+        else:
+            # Evicts least frequent kept item if the new one is more frequent
+            least = self._least()
+            if estimate <= self.top[least][0]:
+                return
+            del self.top[least]
+            self.top[item] = [estimate, self._seen]
+        heapq.heappush(self._heap, (estimate, self.top[item][1], item))
+
+        # Drops stale heap entries once they outnumber kept items
+        if len(self._heap) > 4 * self.k:
+            self._heap = [(c, pos, i) for i, (c, pos) in self.top.items()]
+            heapq.heapify(self._heap)
+
+
+    def _least(self):
+        '''Retrieves kept item with lowest estimated frequency, skipping stale heap entries.'''
+        while True:
+            estimate, pos, item = self._heap[0]
+            if item in self.top and self.top[item][0] == estimate:
+                return item
+            heapq.heappop(self._heap)
+
+
+    def items(self):
+        '''Retrieves kept items ranked by estimated frequency, ties broken by first occurrence.
+
+        Returns
+        -------
+        ranked : list
+            List of tuples containing item and its estimated frequency
+        '''
+        ranked = sorted(self.top.items(), key=lambda kv: (-kv[1][0], kv[1][1]))
+        return [(item, counts[0]) for item, counts in ranked]
@@ -1,8 +1,18 @@
 from tkinter import *
 from tkinter import filedialog
 from tkinter import messagebox
-import os
-from TermEntry import *
+from tkinter import ttk
+import os, queue, threading, traceback
+from PipelineCache import *
+from VirtualListbox import *
+
+
+# Share of progress bar taken by each pipeline stage, as start and end percentage
+STAGE_PROGRESS = {'text': (0, 10), 'sentences': (10, 15), 'tagged': (15, 75), 'candidates': (75, 80),
+                  'entries': (80, 100)}
+
+# Milliseconds between two checks of extraction results
+POLL_INTERVAL = 100
 
 class EntryGUI:
     '''GUI displaying list of terminology candidates and their related content, 
@@ -13,13 +23,31 @@ class EntryGUI:
     root : Tk
         Main window of GUI, created using Tk() class from Tkinter. Serves as parent
         for all other widgets in GUI.
+    entries : dict
+        Terminology candidates as keys and entries extracted so far from selected .PDF file as values
+    listbox : VirtualListbox
+        List of terminology candidates, rendering visible rows only
+    search : StringVar
+        Type-ahead filter of terminology candidates
+    results : Queue
+        Queue through which the running extraction sends progress and entries
+    cancelled : Event
+        Event set to stop the running extraction
+    lock : Lock
+        Lock held by extraction threads for every step and by the main thread while entries extract their content
 
     Methods
     -------
     open_file(self):
         Opens .PDF file and prints out name of selected file
     candidates_list(self):
-        Extracts terminology candidates from .PDF file and lists them out
+        Starts extracting terminology candidates from .PDF file in background
+    extract(self, file_path, results, cancelled):
+        Runs extraction in background thread, sending progress and entries to queue
+    poll_results(self, results):
+        Lists out terminology candidates received so far and updates progress
+    cancel_extraction(self):
+        Stops running extraction
     show_content(self, event):
         Prints out in the window terminology candidate, definition(s) and 
         related context sentences
@@ -46,6 +74,11 @@ class EntryGUI:
         '''
         # Main window
         self.root = root
+        self.cache = PipelineCache()
+        self.entries = {}
+        self.results = None
+        self.cancelled = None
+        self.lock = threading.Lock()
         self.root.title('Terminology Extractor')
         self.root.state('zoomed')
 
@@ -72,8 +105,25 @@ class EntryGUI:
                              command=self.display_candidates)
         self.canvas.create_window(135, 12, anchor='nw', window=file_button)
 
-        # Creates listbox to display terminology candidates
-        self.listbox = Listbox(self.canvas, height=60, width=45, bg='ghost white', bd=1, fg='black', font=('Helvetica', 14))
+        # Progress bar and 'Cancel' button of running extraction
+        self.progress = ttk.Progressbar(self.canvas, length=200, mode='determinate', maximum=100)
+        self.canvas.create_window(900, 18, anchor='nw', window=self.progress)
+        cancel_button = Button(self.canvas, text='Cancel', highlightbackground='seashell2', font=('Helvetica', 14),
+                               command=self.cancel_extraction)
+        self.canvas.create_window(1110, 12, anchor='nw', window=cancel_button)
+
+        # Creates type-ahead filter and listbox to display terminology candidates
+        self.search = StringVar()
+        self.search.trace_add('write', lambda *args: self.listbox.set_filter(self.search.get()))
+        search_entry = Entry(self.canvas, textvariable=self.search, width=45, bg='white', fg='black',
+                             font=('Helvetica', 14))
+        self.canvas.create_window(0, 55, anchor='nw', window=search_entry)
+        self.listbox = VirtualListbox(self.canvas, height=60, width=45, bg='ghost white', bd=1, fg='black',
+                                      font=('Helvetica', 14))
+        self.canvas.create_window(0, 85, anchor='nw', window=self.listbox)
+
+        # Shows related content when clicking on a terminology candidate
+        self.listbox.bind_select(self.show_content)
 
 
     def open_file(self):
@@ -82,7 +132,8 @@ class EntryGUI:
 
         Returns
         -------
-        None
+        selected : bool
+            Whether a .PDF file was selected
         '''
         # Gets file path and stores file name
         self.file_path = filedialog.askopenfilename()
@@ -91,36 +142,131 @@ class EntryGUI:
         # Checks whether file path is empty or extension is different from .pdf
         if self.file_path == '' or '.pdf' not in file_name:
             messagebox.showwarning(message='Please choose a .pdf file')
-        else:
-            # Prints out and updates file name
-            self.canvas.delete('text')
-            self.canvas.create_text(230, 20, text='Selected file: ' + file_name, tags='text', anchor='nw', fill='black',
-                                    font=('Helvetica', 14))
+            return False
+
+        # Prints out and updates file name
+        self.canvas.delete('text')
+        self.canvas.create_text(230, 20, text='Selected file: ' + file_name, tags='text', anchor='nw', fill='black',
+                                font=('Helvetica', 14))
+        return True
 
 
     def candidates_list(self):
-        '''Extracts terminology candidates from .PDF file and prints them out
-        in a listbox.
+        '''Starts extracting terminology candidates from .PDF file in a background thread, so that the window
+        stays responsive, and starts listing them out in a listbox as they are received.
 
         Returns
         -------
         None
         '''
-        # Extracts term candidates from .PDF file
-        self.entries = create_entry(self.file_path)
+        # Stops extraction still running for previously selected file; the new one waits for its step to end
+        self.cancel_extraction()
+        self.entries = {}
+        self.progress['value'] = 0
+        self.results = queue.Queue()
+        self.cancelled = threading.Event()
+        worker = threading.Thread(target=self.extract, args=(self.file_path, self.results, self.cancelled),
+                                  daemon=True)
+        worker.start()
+
+        self.root.after(POLL_INTERVAL, self.poll_results, self.results)
+
+
+    def extract(self, file_path, results, cancelled):
+        '''Runs in background thread. Extracts terminology entries from .PDF file, reusing results cached for
+        same file, and sends progress and entries to queue. Context sentences and definitions of entries are
+        extracted when a candidate is first shown. Widgets are only touched by the main thread.
+
+        Parameters
+        ----------
+        file_path : str
+            Path of .PDF file
+        results : Queue
+            Queue receiving ('progress', stage, done, total, entries), ('done',) or ('error', traceback)
+        cancelled : Event
+            Event set when extraction is to be stopped
+
+        Returns
+        -------
+        None
+        '''
+        try:
+            # Lists candidates ranked by termhood, best first
+            steps = iter_entries(file_path, self.cache, lazy=True, scoring='c_value')
+            while True:
+                # Runs one step at a time under lock, so that an extraction replaced by a newer one and still
+                # finishing its step never uses memos, cache or sentence tables at the same time as another thread
+                with self.lock:
+                    if cancelled.is_set():
+                        steps.close()
+                        return
+                    step = next(steps, None)
+                if step is None:
+                    break
+                results.put(('progress',) + step)
+            results.put(('done',))
+        except Exception:
+            results.put(('error', traceback.format_exc()))
+
+
+    def poll_results(self, results):
+        '''Lists out terminology candidates received from background thread since last check and updates
+        progress bar. Checks again after POLL_INTERVAL until extraction ends.
+
+        Parameters
+        ----------
+        results : Queue
+            Queue of extraction started for selected file
+
+        Returns
+        -------
+        None
+        '''
+        # Ignores extraction replaced by a newer one
+        if results is not self.results:
+            return
+
         candidates = []
-        for entry in self.entries:
-            candidates.append(entry.get_term_candidate())
-        
-        # Populates listbox
-        for c in range(0, len(candidates)):
-            self.listbox.insert(END, candidates[c])
+        finished = False
+        while not finished:
+            try:
+                message = results.get_nowait()
+            except queue.Empty:
+                break
+            if message[0] == 'progress':
+                _, stage, done, total, entries = message
+                start, end = STAGE_PROGRESS[stage]
+                self.progress['value'] = start + (end - start) * done / max(total, 1)
+                for entry in entries:
+                    self.entries[entry.get_term_candidate()] = entry
+                    candidates.append(entry.get_term_candidate())
+            elif message[0] == 'error':
+                messagebox.showerror(message='Could not extract terminology:\n' + message[1].splitlines()[-1])
+                finished = True
+            else:
+                self.progress['value'] = 100
+                finished = True
+
+        # Populates listbox with one call per batch
+        if candidates:
+            self.listbox.extend(candidates)
+
+        if finished:
+            self.results = None
+        else:
+            self.root.after(POLL_INTERVAL, self.poll_results, results)
 
-        # Shows related content when clicking on a terminology candidate
-        self.listbox.bind('<<ListboxSelect>>', self.show_content)
 
-        # Sets listbox on canvas
-        self.canvas.create_window(0, 55, anchor='nw', window=self.listbox)
+    def cancel_extraction(self):
+        '''Stops running extraction after the step it is running, keeping candidates already listed.
+
+        Returns
+        -------
+        None
+        '''
+        if self.cancelled is not None:
+            self.cancelled.set()
+        self.results = None
 
 
     def show_content(self, event):
@@ -138,48 +284,50 @@ class EntryGUI:
         '''
         # Prints out terminology candidate
         self.canvas.delete('text1')
-        if self.listbox.curselection():
-            term_cand = self.listbox.get(ANCHOR)
+        term_cand = self.listbox.get_selected()
+        if term_cand is not None:
             self.canvas.create_text(400, 80, text=term_cand.upper(), tags='text1', 
                                     anchor='nw', fill='black', font=('Helvetica', 17, 'bold'))
 
         # Prints out 3 definitions one after the other
-        selected_cand = self.listbox.get(ANCHOR)
+        selected_cand = self.listbox.get_selected()
         self.canvas.delete('text2')
         self.canvas.delete('text3')
-        for entry in self.entries:
-            if entry.get_term_candidate() == selected_cand:
+        entry = self.entries.get(selected_cand)
+        if entry is not None:
+            with self.lock:
                 definition = entry.get_definition()
-                y_coord1 = 180
-                if len(definition) > 3 or len(definition[0]) > 300:
-                    self.canvas.create_text(1150, 300, width=690, text='(...)', tags='text2', 
-                                                anchor='nw', fill='black', font=('Helvetica', 17, 'bold'))
-                for i, d in enumerate(definition):
-                    if i < 3 and len(d) < 300:
-                        self.canvas.create_text(400, y_coord1, width=690, text='{}. "{}"'.format(i+1,d.capitalize()), tags='text3', 
-                                                anchor='nw', fill='black', font=('Helvetica', 15))
-                        if i >= 1:
-                            self.canvas.create_line(400, y_coord1, 1200, y_coord1, width=1, dash=(6,3), fill='ivory3')
-                        y_coord1 += 50
+            y_coord1 = 180
+            if len(definition) > 3 or len(definition[0]) > 300:
+                self.canvas.create_text(1150, 300, width=690, text='(...)', tags='text2', 
+                                            anchor='nw', fill='black', font=('Helvetica', 17, 'bold'))
+            for i, d in enumerate(definition):
+                if i < 3 and len(d) < 300:
+                    self.canvas.create_text(400, y_coord1, width=690, text='{}. "{}"'.format(i+1,d.capitalize()), tags='text3', 
+                                            anchor='nw', fill='black', font=('Helvetica', 15))
+                    if i >= 1:
+                        self.canvas.create_line(400, y_coord1, 1200, y_coord1, width=1, dash=(6,3), fill='ivory3')
+                    y_coord1 += 50
 
         # Prints out 3 context sentences one after the other
-        selected_cand = self.listbox.get(ANCHOR)
+        selected_cand = self.listbox.get_selected()
         self.canvas.delete('text4')
         self.canvas.delete('text5')
-        for entry in self.entries:
-            if entry.get_term_candidate() == selected_cand:
+        entry = self.entries.get(selected_cand)
+        if entry is not None:
+            with self.lock:
                 context = entry.get_context()
-                y_coord2 = 415
-                if len(context) > 5 or len(context[0]) > 300:
-                    self.canvas.create_text(1150, 680, width=690, text='(...)', tags='text2', 
-                                                anchor='nw', fill='black', font=('Helvetica', 17, 'bold'))
-                for i, c in enumerate(context):
-                    if i < 5 and len(c) < 300:
-                        self.canvas.create_text(400, y_coord2, width=690, text='• "' + c + '"', tags='text5', 
-                                                anchor='nw', fill='black', font=('Helvetica', 14, 'italic'))
-                        if i >= 1:
-                            self.canvas.create_line(400, y_coord2, 1200, y_coord2, width=1, dash=(6,3), fill='ivory3')
-                        y_coord2 += 60
+            y_coord2 = 415
+            if len(context) > 5 or len(context[0]) > 300:
+                self.canvas.create_text(1150, 680, width=690, text='(...)', tags='text2', 
+                                            anchor='nw', fill='black', font=('Helvetica', 17, 'bold'))
+            for i, c in enumerate(context):
+                if i < 5 and len(c) < 300:
+                    self.canvas.create_text(400, y_coord2, width=690, text='• "' + c + '"', tags='text5', 
+                                            anchor='nw', fill='black', font=('Helvetica', 14, 'italic'))
+                    if i >= 1:
+                        self.canvas.create_line(400, y_coord2, 1200, y_coord2, width=1, dash=(6,3), fill='ivory3')
+                    y_coord2 += 60
 
 
     def show_all_definitions(self):
@@ -191,7 +339,7 @@ class EntryGUI:
         None
         '''
         # Sets new window, label and text widget
-        new_window = Toplevel(root)
+        new_window = Toplevel(self.root)
         new_window.title('Show all possible definitions')
         new_window.geometry('500x600')
         label = Label(new_window, text="Possible definitions:", bg='white', fg='black', font=('Helvetica', 15, 'bold'))
@@ -203,12 +351,13 @@ class EntryGUI:
         new_window.columnconfigure(0, weight=1)
 
         # Lists out definitions
-        selected_cand = self.listbox.get(ANCHOR)
-        for entry in self.entries:
-            if entry.get_term_candidate() == selected_cand:
+        selected_cand = self.listbox.get_selected()
+        entry = self.entries.get(selected_cand)
+        if entry is not None:
+            with self.lock:
                 definition = entry.get_definition()
-                for i, d in enumerate(definition):
-                       textbox.insert(END, '• "' + d.capitalize() + '"\n\n')
+            for i, d in enumerate(definition):
+                   textbox.insert(END, '• "' + d.capitalize() + '"\n\n')
 
 
     def show_all_context(self):
@@ -220,7 +369,7 @@ class EntryGUI:
         None
         '''
         # Sets new window and text widget
-        new_window = Toplevel(root)
+        new_window = Toplevel(self.root)
         new_window.title('Show all context sentences')
         new_window.geometry('500x600')
         label = Label(new_window, text="Context sentences:", bg='white', fg='black', font=('Helvetica', 15, 'bold'))
@@ -233,12 +382,13 @@ class EntryGUI:
         new_window.columnconfigure(0, weight=1)
 
         # Lists out context sentences 
-        selected_cand = self.listbox.get(ANCHOR)
-        for entry in self.entries:
-            if entry.get_term_candidate() == selected_cand:
+        selected_cand = self.listbox.get_selected()
+        entry = self.entries.get(selected_cand)
+        if entry is not None:
+            with self.lock:
                 context = entry.get_context()
-                for i, c in enumerate(context):
-                       textbox.insert(END, '• "' + c + '"\n\n', 'italic')
+            for i, c in enumerate(context):
+                   textbox.insert(END, '• "' + c + '"\n\n', 'italic')
 
 
     def display_candidates(self):
@@ -248,9 +398,9 @@ class EntryGUI:
         -------
         None
         '''
-        self.reset_window()
-        self.open_file()
-        self.candidates_list()
+        if self.open_file():
+            self.reset_window()
+            self.candidates_list()
 
             
     def reset_window(self):
@@ -260,7 +410,8 @@ class EntryGUI:
         -------
         None
         '''
-        self.listbox.delete(0, END)
+        self.listbox.clear()
+        self.search.set('')
 
 
     def run(self):
@@ -273,6 +424,7 @@ class EntryGUI:
         self.root.mainloop()
 
 
-root = Tk()
-gui = EntryGUI(root)
-gui.run()
+if __name__ == '__main__':
+    root = Tk()
+    gui = EntryGUI(root)
+    gui.run()
@@ -0,0 +1,453 @@
+'''Glossary Store Module
+
+This module keeps terminology entries of a whole corpus in an SQLite database, so that a glossary is built
+incrementally: adding a .PDF file processes that document only and merges its entries with those of the
+documents added before, in one transaction. Documents are identified by the hash of their content, so that an
+unchanged file is never processed twice, and a changed file replaces its old entries. Context sentences are
+stored once per document, and context sentences and definitions are searchable with FTS5 full-text indexes.
+Term lookups, cross-document frequencies and definitions of a term are served from indexes. It requires
+sqlite3 and time libraries, and the pipeline cache module.
+
+Classes
+-------
+GlossaryStore(path)
+    SQLite store of terminology entries of many documents
+'''
+
+import sqlite3, time
+from PipelineCache import *
+
+
+# Tables, indexes and full-text indexes of the store. Full-text indexes read their text from the sentences and
+# definitions tables and are kept up to date by triggers.
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    hash TEXT NOT NULL UNIQUE,
+    added REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_path ON documents (path);
+
+CREATE TABLE IF NOT EXISTS terms (
+    id INTEGER PRIMARY KEY,
+    term TEXT NOT NULL UNIQUE,
+    doc_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS terms_doc_count ON terms (doc_count);
+
+CREATE TABLE IF NOT EXISTS occurrences (
+    term_id INTEGER NOT NULL,
+    document_id INTEGER NOT NULL,
+    n_contexts INTEGER NOT NULL,
+    n_definitions INTEGER NOT NULL,
+    PRIMARY KEY (term_id, document_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS occurrences_document ON occurrences (document_id);
+
+CREATE TABLE IF NOT EXISTS sentences (
+    id INTEGER PRIMARY KEY,
+    document_id INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sentences_document ON sentences (document_id);
+
+CREATE TABLE IF NOT EXISTS contexts (
+    term_id INTEGER NOT NULL,
+    sentence_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (term_id, sentence_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS definitions (
+    id INTEGER PRIMARY KEY,
+    term_id INTEGER NOT NULL,
+    document_id INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS definitions_term ON definitions (term_id);
+CREATE INDEX IF NOT EXISTS definitions_document ON definitions (document_id);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS sentences_fts USING fts5 (text, content='sentences', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS sentences_insert AFTER INSERT ON sentences BEGIN
+    INSERT INTO sentences_fts (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS sentences_delete AFTER DELETE ON sentences BEGIN
+    INSERT INTO sentences_fts (sentences_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS definitions_fts USING fts5 (text, content='definitions', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS definitions_insert AFTER INSERT ON definitions BEGIN
+    INSERT INTO definitions_fts (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS definitions_delete AFTER DELETE ON definitions BEGIN
+    INSERT INTO definitions_fts (definitions_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+'''
+
+
+class GlossaryStore:
+    '''Class for representing an SQLite store of terminology entries of a corpus.
+
+    Attributes
+    ----------
+    path : str
+        Path of database file
+    connection : Connection
+        Connection to database, committing only explicit transactions
+
+    Methods
+    -------
+    has_document(self, file, doc_hash):
+        Checks whether file with the same content was added
+    add_document(self, file, entries, **options):
+        Processes .PDF file unless it was added before, merges its entries into the store
+    add_entries(self, file, entries, doc_hash):
+        Merges entries of a document into the store, replacing older entries of the same file
+    remove_document(self, file):
+        Removes all entries of a file
+    get_definitions(self, term):
+        Retrieves all definitions of a term with the documents they come from
+    get_contexts(self, term, limit):
+        Retrieves context sentences of a term with the documents they come from
+    get_document_frequency(self, term):
+        Retrieves number of documents a term has entries in
+    get_top_terms(self, limit):
+        Retrieves terms having entries in the most documents
+    search_contexts(self, query, limit):
+        Retrieves context sentences matching a full-text query
+    search_definitions(self, query, limit):
+        Retrieves definitions matching a full-text query
+    close(self):
+        Closes connection to database
+    '''
+
+    def __init__(self, path):
+        '''Construct store, creating database file and its tables if they do not exist.
+
+        Parameters
+        ----------
+        path : str
+            Path of database file
+
+        Returns
+        -------
+        None
+        '''
+        self.path = path
+        self.connection = sqlite3.connect(path, isolation_level=None)
+        # Lets readers query while a document is being merged, and syncs less often than every write
+        self.connection.execute('PRAGMA journal_mode = WAL')
+        self.connection.execute('PRAGMA synchronous = NORMAL')
+        self.connection.executescript(SCHEMA)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM documents').fetchone()[0]
+
+
+    def close(self):
+        '''Closes connection to database.
+
+        Returns
+        -------
+        None
+        '''
+        self.connection.close()
+
+
+    def has_document(self, file, doc_hash=None):
+        '''Checks whether a file with the same content was added to the store, under any path.
+
+        Parameters
+        ----------
+        file : str
+            Path of .PDF file
+        doc_hash : str, optional
+            Hash of file content, computed if not given
+
+        Returns
+        -------
+        bool
+            True if file content was added
+        '''
+        if doc_hash is None:
+            doc_hash = file_hash(file)
+        row = self.connection.execute('SELECT 1 FROM documents WHERE hash = ?', (doc_hash,)).fetchone()
+
+        return row is not None
+
+
+    def add_document(self, file, entries=None, **options):
+        '''Processes .PDF file with create_entry and merges its entries into the store, unless a file with the same
+        content was added before.
+
+        Parameters
+        ----------
+        file : str
+            Path of .PDF file
+        entries : list, optional
+            Terminology entries of file, made with create_entry if not given
+        **options
+            Options of create_entry
+
+        Returns
+        -------
+        added : bool
+            True if file was processed and added, False if its content was added before
+        '''
+        doc_hash = file_hash(file)
+        if self.has_document(file, doc_hash):
+            return False
+        if entries is None:
+            entries = create_entry(file, **options)
+        self.add_entries(file, entries, doc_hash)
+
+        return True
+
+
+    def add_entries(self, file, entries, doc_hash=None):
+        '''Merges terminology entries of a document into the store in one transaction. Entries already stored
+        for the same path are replaced, so that a changed file does not keep entries of its older version.
+
+        Parameters
+        ----------
+        file : str
+            Path of .PDF file
+        entries : list
+            List of TermEntry objects of file
+        doc_hash : str, optional
+            Hash of file content, computed if not given
+
+        Returns
+        -------
+        None
+        '''
+        if doc_hash is None:
+            doc_hash = file_hash(file)
+        db = self.connection
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            for (doc_id,) in db.execute('SELECT id FROM documents WHERE path = ? OR hash = ?',
+                                        (file, doc_hash)).fetchall():
+                self._delete_document(doc_id)
+            doc_id = db.execute('INSERT INTO documents (path, hash, added) VALUES (?, ?, ?)',
+                                (file, doc_hash, time.time())).lastrowid
+
+            terms = [entry.get_term_candidate() for entry in entries]
+            db.executemany('INSERT OR IGNORE INTO terms (term) VALUES (?)', ((term,) for term in terms))
+            term_ids = [db.execute('SELECT id FROM terms WHERE term = ?', (term,)).fetchone()[0] for term in terms]
+
+            # Numbers sentences of the document from the next free id, so that they are inserted in bulk
+            next_id = db.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM sentences').fetchone()[0]
+            sentence_ids = {}
+            contexts = []
+            definitions = []
+            occurrences = []
+            for term_id, entry in zip(term_ids, entries):
+                context = entry.get_context() or []
+                definition = entry.get_definition() or []
+                for position, sentence in enumerate(context):
+                    if sentence not in sentence_ids:
+                        sentence_ids[sentence] = next_id + len(sentence_ids)
+                    contexts.append((term_id, sentence_ids[sentence], position))
+                definitions.extend((term_id, doc_id, text) for text in definition)
+                occurrences.append((term_id, doc_id, len(context), len(definition)))
+
+            db.executemany('INSERT INTO sentences (id, document_id, text) VALUES (?, ?, ?)',
+                           ((sent_id, doc_id, sentence) for sentence, sent_id in sentence_ids.items()))
+            db.executemany('INSERT OR IGNORE INTO contexts VALUES (?, ?, ?)', contexts)
+            db.executemany('INSERT INTO definitions (term_id, document_id, text) VALUES (?, ?, ?)', definitions)
+            db.executemany('INSERT INTO occurrences VALUES (?, ?, ?, ?)', occurrences)
+            db.executemany('UPDATE terms SET doc_count = doc_count + 1 WHERE id = ?',
+                           ((term_id,) for term_id in term_ids))
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+
+
+    def remove_document(self, file):
+        '''Removes all entries of a file, in one transaction.
+
+        Parameters
+        ----------
+        file : str
+            Path of .PDF file
+
+        Returns
+        -------
+        removed : bool
+            True if file was in the store
+        '''
+        db = self.connection
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            doc_ids = [doc_id for (doc_id,) in db.execute('SELECT id FROM documents WHERE path = ?', (file,))]
+            for doc_id in doc_ids:
+                self._delete_document(doc_id)
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+
+        return len(doc_ids) > 0
+
+
+    def _delete_document(self, doc_id):
+        '''Deletes rows of a document, inside a transaction opened by the caller.'''
+        db = self.connection
+        term_ids = [(term_id,) for (term_id,) in
+                    db.execute('SELECT term_id FROM occurrences WHERE document_id = ?', (doc_id,))]
+        # Sentences of a document are numbered consecutively, so that its contexts are a range of every term
+        first, last = db.execute('SELECT MIN(id), MAX(id) FROM sentences WHERE document_id = ?',
+                                 (doc_id,)).fetchone()
+        if first is not None:
+            db.executemany('DELETE FROM contexts WHERE term_id = ? AND sentence_id BETWEEN ? AND ?',
+                           ((term_id, first, last) for (term_id,) in term_ids))
+        db.executemany('UPDATE terms SET doc_count = doc_count - 1 WHERE id = ?', term_ids)
+        db.execute('DELETE FROM sentences WHERE document_id = ?', (doc_id,))
+        db.execute('DELETE FROM definitions WHERE document_id = ?', (doc_id,))
+        db.execute('DELETE FROM occurrences WHERE document_id = ?', (doc_id,))
+        db.execute('DELETE FROM documents WHERE id = ?', (doc_id,))
+
+
+    def get_definitions(self, term):
+        '''Retrieves all definitions of a term found in any document.
+
+        Parameters
+        ----------
+        term : str
+            Terminology candidate
+
+        Returns
+        -------
+        definitions : list
+            Tuples of document path and definition, in order of documents added and of definitions in them
+        '''
+        return self.connection.execute('''
+            SELECT documents.path, definitions.text
+            FROM terms
+            JOIN definitions ON definitions.term_id = terms.id
+            JOIN documents ON documents.id = definitions.document_id
+            WHERE terms.term = ?
+            ORDER BY definitions.id''', (term,)).fetchall()
+
+
+    def get_contexts(self, term, limit=None):
+        '''Retrieves context sentences of a term in any document.
+
+        Parameters
+        ----------
+        term : str
+            Terminology candidate
+        limit : int, optional
+            Maximum number of sentences, all if not given
+
+        Returns
+        -------
+        contexts : list
+            Tuples of document path and context sentence, in order of documents added and of sentences in them
+        '''
+        return self.connection.execute('''
+            SELECT documents.path, sentences.text
+            FROM terms
+            JOIN contexts ON contexts.term_id = terms.id
+            JOIN sentences ON sentences.id = contexts.sentence_id
+            JOIN documents ON documents.id = sentences.document_id
+            WHERE terms.term = ?
+            ORDER BY sentences.document_id, contexts.position
+            LIMIT ?''', (term, -1 if limit is None else limit)).fetchall()
+
+
+    def get_document_frequency(self, term):
+        '''Retrieves number of documents a term has an entry in.
+
+        Parameters
+        ----------
+        term : str
+            Terminology candidate
+
+        Returns
+        -------
+        doc_count : int
+            Number of documents, 0 for unknown terms
+        '''
+        row = self.connection.execute('SELECT doc_count FROM terms WHERE term = ?', (term,)).fetchone()
+
+        return 0 if row is None else row[0]
+
+
+    def get_top_terms(self, limit=100):
+        '''Retrieves terms having entries in the most documents.
+
+        Parameters
+        ----------
+        limit : int
+            Number of terms
+
+        Returns
+        -------
+        terms : list
+            Tuples of term and number of documents, most frequent first
+        '''
+        return self.connection.execute('''
+            SELECT term, doc_count FROM terms WHERE doc_count > 0
+            ORDER BY doc_count DESC LIMIT ?''', (limit,)).fetchall()
+
+
+    def search_contexts(self, query, limit=100):
+        '''Retrieves context sentences matching a full-text query, best matches first.
+
+        Parameters
+        ----------
+        query : str
+            FTS5 query, e.g. words, "a phrase" or prefix*
+        limit : int
+            Maximum number of sentences
+
+        Returns
+        -------
+        contexts : list
+            Tuples of document path and context sentence
+        '''
+        return self.connection.execute('''
+            SELECT documents.path, sentences.text
+            FROM sentences_fts
+            JOIN sentences ON sentences.id = sentences_fts.rowid
+            JOIN documents ON documents.id = sentences.document_id
+            WHERE sentences_fts MATCH ?
+            ORDER BY sentences_fts.rank LIMIT ?''', (query, limit)).fetchall()
+
+
+    def search_definitions(self, query, limit=100):
+        '''Retrieves definitions matching a full-text query, best matches first.
+
+        Parameters
+        ----------
+        query : str
+            FTS5 query, e.g. words, "a phrase" or prefix*
+        limit : int
+            Maximum number of definitions
+
+        Returns
+        -------
+        definitions : list
+            Tuples of term, document path and definition
+        '''
+        return self.connection.execute('''
+            SELECT terms.term, documents.path, definitions.text
+            FROM definitions_fts
+            JOIN definitions ON definitions.id = definitions_fts.rowid
+            JOIN terms ON terms.id = definitions.term_id
+            JOIN documents ON documents.id = definitions.document_id
+            WHERE definitions_fts MATCH ?
+            ORDER BY definitions_fts.rank LIMIT ?''', (query, limit)).fetchall()
@@ -0,0 +1,150 @@
+'''Instrumentation Module
+
+This module measures the stages of the pipeline. A stage run through measure_stage reports its wall time,
+CPU time, item counts and, while tracemalloc is tracing, its peak memory to an observer, i.e. any function
+taking the stage name and its record. StageRecorder is an observer keeping records in order and exporting them
+as JSON. Without an observer a stage is called directly, so that instrumentation costs nothing when disabled.
+It requires json, time and tracemalloc libraries.
+
+Functions
+---------
+measure_stage(observer, stage, func, *args, counts)
+    Calls a stage function, reports its measurements to observer, returns its result
+
+Classes
+-------
+StageRecorder(file)
+    Observer recording measurements of every stage of a document
+'''
+
+import json, time, tracemalloc
+
+
+def measure_stage(observer, stage, func, *args, counts=None):
+    '''Calls stage function with given arguments. If observer is given, measures wall time, CPU time and, if
+    tracemalloc is tracing, peak memory allocated on top of what was allocated before the stage, and reports
+    them to observer together with item counts of the result.
+
+    Parameters
+    ----------
+    observer : function or None
+        Function taking stage name and record dictionary, None to call stage function only
+    stage : str
+        Name of stage
+    func : function
+        Stage function
+    *args
+        Arguments passed to stage function
+    counts : function, optional
+        Function taking result of stage, returns dictionary of item names and counts
+
+    Returns
+    -------
+    result : object
+        Value returned by stage function
+    '''
+    if observer is None:
+        return func(*args)
+
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        allocated = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    result = func(*args)
+    cpu_time = time.process_time() - cpu_start
+    wall_time = time.perf_counter() - wall_start
+
+    record = {'wall_time': wall_time, 'cpu_time': cpu_time,
+              'peak_memory': tracemalloc.get_traced_memory()[1] - allocated if tracing else None}
+    if counts is not None:
+        record.update(counts(result))
+    observer(stage, record)
+
+    return result
+
+
+class StageRecorder:
+    '''Class for representing an observer recording measurements of the stages of one document.
+
+    Attributes
+    ----------
+    file : str or None
+        Path of .PDF file measured
+    records : list
+        Dictionaries of stage name, wall time, CPU time, peak memory and item counts, in order of stages
+
+    Methods
+    -------
+    get_records(self):
+        Retrieves stage records
+    get_report(self):
+        Retrieves stage records and their totals
+    export_json(self, path):
+        Writes report to JSON file
+    '''
+
+    def __init__(self, file=None):
+        '''Construct recorder without records.
+
+        Parameters
+        ----------
+        file : str, optional
+            Path of .PDF file to be measured
+
+        Returns
+        -------
+        None
+        '''
+        self.file = file
+        self.records = []
+
+
+    def __call__(self, stage, record):
+        '''Records measurements of a stage, as reported by measure_stage.'''
+        self.records.append(dict(stage=stage, **record))
+
+
+    def get_records(self):
+        '''Retrieves stage records.
+
+        Returns
+        -------
+        records : list
+            Dictionaries of stage measurements, in order of stages
+        '''
+        return self.records
+
+
+    def get_report(self):
+        '''Retrieves stage records with total wall time and CPU time, and highest peak memory of all stages.
+
+        Returns
+        -------
+        report : dict
+            File path, stage records and totals
+        '''
+        peaks = [record['peak_memory'] for record in self.records if record['peak_memory'] is not None]
+
+        return {'file': self.file,
+                'stages': self.records,
+                'total': {'wall_time': sum(record['wall_time'] for record in self.records),
+                          'cpu_time': sum(record['cpu_time'] for record in self.records),
+                          'peak_memory': max(peaks) if peaks else None}}
+
+
+    def export_json(self, path):
+        '''Writes report to JSON file.
+
+        Parameters
+        ----------
+        path : str
+            Path of JSON file
+
+        Returns
+        -------
+        None
+        '''
+        with open(path, 'w') as f:
+            json.dump(self.get_report(), f, indent=2)
@@ -0,0 +1,373 @@
+'''Pipeline Cache Module
+
+This module keeps outputs of pipeline stages on disk, so that reopening or reprocessing an unchanged .PDF file
+does not run the pipeline again. Outputs are keyed by the hash of the file content and of the configuration of
+the stage and every stage before it: changing, say, definition patterns only invalidates definition extraction
+and reuses everything upstream of it. Entries are stored as compressed pickles and evicted least recently used
+first once the cache exceeds its size limit. It requires hashlib, importlib, os, pickle, tempfile and zlib
+libraries.
+
+Classes
+-------
+PipelineCache(directory, max_bytes)
+    Size-bounded on-disk store of stage outputs
+
+Functions
+---------
+file_hash(file)
+    Takes in a file, returns hash of its content
+stage_keys(doc_hash, top_k, scoring, min_score, max_def_length)
+    Takes in a document hash, returns cache keys of every pipeline stage
+iter_entries(file, cache, top_k, batch_size, lazy, scoring, min_score, max_def_length)
+    Takes in .PDF file and cache, yields progress of stages and terminology entries in batches as they are made
+cached_entry(file, cache, top_k, scoring, min_score, max_def_length)
+    Takes in .PDF file and cache, returns terminology entries, running only stages missing from cache
+'''
+
+import hashlib, importlib.metadata, os, pickle, tempfile, zlib
+from TermEntry import *
+
+
+# Version of cached data layout, to be increased when stage outputs change shape
+CACHE_VERSION = 4
+
+# Default cache folder in user's home directory
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'terminology_extractor')
+
+
+class PipelineCache:
+    '''Class for representing on-disk cache of pipeline stage outputs.
+
+    Attributes
+    ----------
+    directory : str
+        Folder containing cached outputs, one file per output
+    max_bytes : int
+        Maximum total size of cached outputs
+    size : int
+        Current total size of cached outputs
+
+    Methods
+    -------
+    get(self, key):
+        Retrieves cached output, None if it is not cached
+    put(self, key, value):
+        Stores output, evicting least recently used outputs if cache gets too big
+    clear(self):
+        Removes all cached outputs
+    '''
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=2 * 1024 ** 3):
+        '''Construct cache in a folder, creating it if needed.
+
+        Parameters
+        ----------
+        directory : str
+            Folder containing cached outputs
+        max_bytes : int
+            Maximum total size of cached outputs
+
+        Returns
+        -------
+        None
+        '''
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self.size = sum(entry.stat().st_size for entry in self._entries())
+
+
+    def _entries(self):
+        '''Retrieves cached output files of the folder.'''
+        return [entry for entry in os.scandir(self.directory) if entry.name.endswith('.bin')]
+
+
+    def _path(self, key):
+        '''Retrieves path of file storing output for key.'''
+        return os.path.join(self.directory, key + '.bin')
+
+
+    def get(self, key):
+        '''Retrieves cached output and marks it as recently used.
+
+        Parameters
+        ----------
+        key : str
+            Cache key of stage output
+
+        Returns
+        -------
+        value : object or None
+            Cached output, None if it is not cached or cannot be read
+        '''
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.loads(zlib.decompress(f.read()))
+            os.utime(path)
+        except (OSError, zlib.error, pickle.UnpicklingError, EOFError):
+            return None
+
+        return value
+
+
+    def put(self, key, value):
+        '''Stores output as compressed pickle. File is written under a temporary name and renamed, so that
+        readers never see a partly written output.
+
+        Parameters
+        ----------
+        key : str
+            Cache key of stage output
+        value : object
+            Output to be stored
+
+        Returns
+        -------
+        None
+        '''
+        data = zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        path = self._path(key)
+        if os.path.exists(path):
+            self.size -= os.path.getsize(path)
+        os.replace(tmp_path, path)
+        self.size += len(data)
+
+        if self.size > self.max_bytes:
+            self._evict()
+
+
+    def _evict(self):
+        '''Removes least recently used outputs until cache fits in its size limit.'''
+        entries = sorted(self._entries(), key=lambda entry: entry.stat().st_mtime)
+        self.size = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if self.size <= self.max_bytes:
+                break
+            try:
+                os.remove(entry.path)
+                self.size -= entry.stat().st_size
+            except OSError:
+                pass
+
+
+    def clear(self):
+        '''Removes all cached outputs.
+
+        Returns
+        -------
+        None
+        '''
+        for entry in self._entries():
+            os.remove(entry.path)
+        self.size = 0
+
+
+def file_hash(file):
+    '''Takes in a file, returns SHA-256 hash of its content.
+
+    Parameters
+    ----------
+    file : str
+        Path of file
+
+    Returns
+    -------
+    digest : str
+        Hexadecimal hash of file content
+    '''
+    digest = hashlib.sha256()
+    with open(file, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def stage_keys(doc_hash, top_k=None, scoring=None, min_score=None, max_def_length=None):
+    '''Takes in a document hash, returns cache keys of every pipeline stage. The key of a stage hashes the key
+    of the stage before it together with its own configuration, so changing a stage invalidates it and every
+    stage after it only.
+
+    Parameters
+    ----------
+    doc_hash : str
+        Hash of .PDF file content
+    top_k : int, optional
+        Number of most frequent, or best scoring, terminology candidates to be kept
+    scoring : str, optional
+        Termhood score to rank terminology candidates by, one of SCORING_METHODS
+    min_score : float, optional
+        Lowest termhood score of terminology candidates to be kept, if scoring is given
+    max_def_length : int, optional
+        Length of the longest context sentence to be searched for definitions
+
+    Returns
+    -------
+    keys : dict
+        Stage names as keys and cache keys as values
+    '''
+    stages = [('text', ()),
+              ('sentences', (ABBREVIATIONS, BOILERPLATE_SHARE, BOILERPLATE_MIN_PAGES, BOILERPLATE_EDGE_LINES)),
+              # Reads NLTK version from package metadata, so that a cache hit does not import NLTK
+              ('tagged', (importlib.metadata.version('nltk'),)),
+              # Candidates are chunked on tag codes, the grammar is kept for chunking with parse trees
+              ('candidates', (GRAMMAR_RULES, NP_TAG_CODES, NP_CODES.pattern, top_k, scoring, min_score)),
+              ('contexts', ()),
+              ('entries', (PATTERNS_PRE, PATTERNS_POS, max_def_length)),
+              ]
+    keys = {}
+    key = '{}:{}'.format(CACHE_VERSION, doc_hash)
+    for stage, config in stages:
+        key = hashlib.sha256(repr((key, stage, config)).encode('utf-8')).hexdigest()
+        keys[stage] = key
+
+    return keys
+
+
+def iter_entries(file, cache, top_k=None, batch_size=200, lazy=False, scoring=None, min_score=None,
+                 max_def_length=None):
+    '''Takes in .PDF file and pipeline cache, runs the pipeline starting from the last stage found in cache and
+    stores the outputs of stages it runs. Yields progress after every stage, after every batch of sentences tagged
+    and after every batch of candidates turned into entries, together with the entries made, so that a caller can
+    show them as they come and stop the pipeline between two steps by closing the generator. Only complete stage
+    outputs are stored in cache. If lazy is True and entries are not cached, entries of candidates having a
+    definition are yielded batch by batch as LazyTermEntry objects, and neither contexts nor entries are cached.
+
+    Parameters
+    ----------
+    file : .PDF file
+    cache : PipelineCache
+        Cache of stage outputs
+    top_k : int, optional
+        Number of most frequent, or best scoring, terminology candidates to be kept
+    batch_size : int
+        Number of sentences tagged, or of candidates processed, between two progress updates
+    lazy : bool
+        Whether to extract context sentences and definition(s) of entries on first access
+    scoring : str, optional
+        Termhood score to rank terminology candidates by, one of SCORING_METHODS
+    min_score : float, optional
+        Lowest termhood score of terminology candidates to be kept, if scoring is given
+    max_def_length : int, optional
+        Length of the longest context sentence to be searched for definitions
+
+    Yields
+    ------
+    stage : str
+        Name of stage running, as in stage_keys
+    done : int
+        Number of items of stage done
+    total : int
+        Number of items of stage
+    entries : list
+        List of TermEntry objects made since last update
+    '''
+    keys = stage_keys(file_hash(file), top_k, scoring, min_score, max_def_length)
+    entries = cache.get(keys['entries'])
+    if entries is not None:
+        yield 'entries', 1, 1, entries
+        return
+
+    cached_contexts = None if lazy else cache.get(keys['contexts'])
+    if cached_contexts is None:
+        # Sentences are cached as a span document with their page numbers, without lines repeated on many pages,
+        # and text as extracted, with start offsets of pages
+        all_sents = cache.get(keys['sentences'])
+        if all_sents is None:
+            text = cache.get(keys['text'])
+            if text is None:
+                text = pdf_to_pages(file)
+                cache.put(keys['text'], text)
+            yield 'text', 1, 1, []
+            all_sents = split_document(*remove_boilerplate(*text))
+            cache.put(keys['sentences'], all_sents)
+        sent_pages = all_sents.pages
+        yield 'sentences', 1, 1, []
+
+        term_candidates = cache.get(keys['candidates'])
+        if term_candidates is None:
+            tagged = cache.get(keys['tagged'])
+            if tagged is None:
+                cleaned_s = sents_for_pos(all_sents)
+                tagged = []
+                # Tags sentences batch by batch, reporting progress of the slowest stage
+                for start in range(0, len(cleaned_s), batch_size):
+                    tagged.extend(pos_tagging(cleaned_s[start:start + batch_size]))
+                    yield 'tagged', len(tagged), len(cleaned_s), []
+                cache.put(keys['tagged'], tagged)
+            term_candidates = select_candidates(phrase_chunking(tagged), top_k, scoring, min_score)
+            cache.put(keys['candidates'], term_candidates)
+        yield 'candidates', 1, 1, []
+
+        index = SentenceIndex(all_sents)
+        if lazy:
+            definable = find_definable(term_candidates, all_sents, index)
+            candidates = [candidate for candidate in term_candidates if candidate in definable]
+            table = SentenceTable()
+            # Checks entries for a definition batch by batch, so that the first ones are listed right away
+            for start in range(0, len(candidates), batch_size):
+                entries = [LazyTermEntry(candidate, all_sents, index, table, sent_pages, max_def_length)
+                           for candidate in candidates[start:start + batch_size]]
+                yield ('entries', min(start + batch_size, len(candidates)), len(candidates),
+                       [entry for entry in entries if entry.has_definition()])
+            return
+        contexts = {}
+        pages = {}
+    else:
+        contexts, pages = cached_contexts
+        term_candidates = list(contexts)
+        index = None
+
+    # Makes entries batch by batch; definitions of a candidate only depend on its own context sentences
+    entries = []
+    table = SentenceTable()
+    for start in range(0, len(term_candidates), batch_size):
+        batch = term_candidates[start:start + batch_size]
+        if index is not None:
+            batch_contexts, batch_pages = extract_contexts(batch, all_sents, index, sent_pages)
+            contexts.update(batch_contexts)
+            pages.update(batch_pages)
+        batch_contexts = {candidate: contexts[candidate] for candidate in batch}
+        new_entries = make_entries(batch_contexts, extract_all_defs(batch_contexts, max_def_length), table, pages)
+        entries.extend(new_entries)
+        yield 'entries', start + len(batch), len(term_candidates), new_entries
+
+    if index is not None:
+        cache.put(keys['contexts'], (contexts, pages))
+    cache.put(keys['entries'], entries)
+
+
+def cached_entry(file, cache, top_k=None, scoring=None, min_score=None, max_def_length=None):
+    '''Takes in .PDF file and pipeline cache. It returns terminology entries from cache if file was processed
+    before with the same configuration; otherwise it runs the pipeline starting from the last stage found in
+    cache and stores the outputs of stages it runs. Returns the same entries as create_entry.
+
+    Parameters
+    ----------
+    file : .PDF file
+    cache : PipelineCache
+        Cache of stage outputs
+    top_k : int, optional
+        Number of most frequent, or best scoring, terminology candidates to be kept
+    scoring : str, optional
+        Termhood score to rank terminology candidates by, one of SCORING_METHODS
+    min_score : float, optional
+        Lowest termhood score of terminology candidates to be kept, if scoring is given
+    max_def_length : int, optional
+        Length of the longest context sentence to be searched for definitions
+
+    Returns
+    -------
+    entries : list
+        List of TermEntry objects
+    '''
+    entries = []
+    for _, _, _, new_entries in iter_entries(file, cache, top_k, scoring=scoring, min_score=min_score,
+                                             max_def_length=max_def_length):
+        entries.extend(new_entries)
+
+    return entries
@@ -0,0 +1,122 @@
+'''Prefix Index Module
+
+This module contains an index of terms by the beginnings of their words, used for type-ahead filtering of
+terminology candidates. Every term is indexed once per word, from that word to the end of the term, in a sorted
+list, so that all terms having a word starting with a given prefix are found by binary search. It requires
+bisect library.
+
+Classes
+-------
+PrefixIndex(terms)
+    Index of terms by word prefixes
+'''
+
+import bisect
+
+
+class PrefixIndex:
+    '''Class for representing an index of terms by prefixes of their words.
+
+    Attributes
+    ----------
+    terms : list
+        Indexed terms in order of insertion, whose positions are their ids
+    keys : list
+        Sorted tuples of casefolded term tail starting at a word, and term id
+    pending : list
+        Tuples added since keys were last sorted
+
+    Methods
+    -------
+    add(self, term):
+        Adds term to the index
+    extend(self, terms):
+        Adds terms to the index
+    lookup(self, prefix):
+        Retrieves ids of terms having a word starting with prefix
+    '''
+
+    def __init__(self, terms=()):
+        '''Construct index of terms.
+
+        Parameters
+        ----------
+        terms : iterable
+            Terms to be indexed
+
+        Returns
+        -------
+        None
+        '''
+        self.terms = []
+        self.keys = []
+        self.pending = []
+        self.extend(terms)
+
+
+    def __len__(self):
+        return len(self.terms)
+
+
+    def add(self, term):
+        '''Adds term to the index, once for every word it contains.
+
+        Parameters
+        ----------
+        term : str
+            Term to be indexed
+
+        Returns
+        -------
+        None
+        '''
+        term_id = len(self.terms)
+        self.terms.append(term)
+        folded = term.casefold()
+        start = 0
+        for word in folded.split(' '):
+            if word != '':
+                self.pending.append((folded[start:], term_id))
+            start += len(word) + 1
+
+
+    def extend(self, terms):
+        '''Adds terms to the index.
+
+        Parameters
+        ----------
+        terms : iterable
+            Terms to be indexed
+
+        Returns
+        -------
+        None
+        '''
+        for term in terms:
+            self.add(term)
+
+
+    def lookup(self, prefix):
+        '''Retrieves ids of terms having at least one word starting with prefix, regardless of case. Terms added
+        since last lookup are sorted into the index first.
+
+        Parameters
+        ----------
+        prefix : str
+            Beginning of word, or of several words, of terms to be found
+
+        Returns
+        -------
+        term_ids : list
+            Sorted ids of matching terms, i.e. positions in order of insertion
+        '''
+        if self.pending:
+            self.keys.extend(self.pending)
+            self.keys.sort()
+            self.pending = []
+
+        folded = prefix.casefold()
+        start = bisect.bisect_left(self.keys, (folded,))
+        end = bisect.bisect_left(self.keys, (folded + '\U0010ffff',))
+
+        return sorted({term_id for _, term_id in self.keys[start:end]})
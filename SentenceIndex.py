@@ -0,0 +1,146 @@
+'''Sentence Index Module
+
+This module contains a class for indexing the sentences of a document once, so that the sentences mentioning
+a terminology candidate can be looked up instead of rescanning the whole sentence list for every candidate.
+Sentences are indexed as a span document, whose casefolded text is tokenized in one pass. It requires bisect
+and re libraries, and the span document module.
+
+Classes
+-------
+SentenceIndex(sent_list)
+    Casefolded token to sentence id posting table with phrase lookup
+'''
+
+import bisect, re
+from SpanDocument import *
+
+
+# Word tokens, i.e. maximal runs of word characters
+TOKEN = re.compile(r'\w+')
+
+
+class SentenceIndex:
+    '''Class for representing an inverted index of document sentences.
+
+    Attributes
+    ----------
+    document : SpanDocument
+        Sentences the index is built from, with their casefolded text
+    sentences : SpanDocument
+        Same as document, for callers treating it as a list of sentences
+    postings : dict
+        Casefolded word tokens as keys and sorted lists of sentence ids as values
+
+    Methods
+    -------
+    tokenize(text):
+        Splits text into word tokens
+    get_postings(self, token):
+        Retrieves ids of sentences in which token appears
+    lookup(self, phrase):
+        Retrieves ids of sentences in which every word of phrase appears
+    '''
+
+    def __init__(self, sent_list):
+        '''Construct posting table for list of sentences.
+
+        Parameters
+        ----------
+        sent_list : list or SpanDocument
+            List of sentences to be indexed
+
+        Returns
+        -------
+        None
+        '''
+        self.document = to_document(sent_list)
+        self.sentences = self.document
+        self.postings = {}
+        starts, ends = self.document.fold_starts, self.document.fold_ends
+        n_sents = len(self.document)
+        sent_id = 0
+        # Tokenizes casefolded text at once; tokens never cross sentences, which are separated by non-word characters
+        for match in TOKEN.finditer(self.document.folded):
+            pos = match.start()
+            while sent_id < n_sents and ends[sent_id] <= pos:
+                sent_id += 1
+            if sent_id == n_sents:
+                break
+            # Skips tokens of text left out of sentences
+            if pos < starts[sent_id]:
+                continue
+            ids = self.postings.setdefault(match.group(), [])
+            # Adds sentence id only once per token
+            if not ids or ids[-1] != sent_id:
+                ids.append(sent_id)
+
+
+    @staticmethod
+    def tokenize(text):
+        '''Splits text into word tokens, i.e. maximal runs of word characters.
+
+        Parameters
+        ----------
+        text : str
+            Text to be tokenized
+
+        Returns
+        -------
+        tokens : list
+            List of word tokens
+        '''
+        return TOKEN.findall(text)
+
+
+    def get_postings(self, token):
+        '''Retrieves ids of sentences in which token appears.
+
+        Parameters
+        ----------
+        token : str
+            Casefolded word token
+
+        Returns
+        -------
+        ids : list
+            Sorted list of sentence ids
+        '''
+        return self.postings.get(token, [])
+
+
+    def lookup(self, phrase):
+        '''Retrieves ids of sentences in which every word of phrase appears. Since a phrase matched on word
+        boundaries consists of whole word tokens of the sentence, the result contains every sentence the phrase
+        occurs in; callers still check that the words are adjacent.
+
+        Parameters
+        ----------
+        phrase : str
+            Casefolded single- or multi-word phrase
+
+        Returns
+        -------
+        ids : list
+            Sorted list of sentence ids
+        '''
+        tokens = set(self.tokenize(phrase))
+        # Phrases without word characters cannot be narrowed down by the index
+        if len(tokens) == 0:
+            return list(range(len(self.sentences)))
+
+        # Intersects posting lists, starting from the shortest one
+        all_postings = sorted((self.get_postings(t) for t in tokens), key=len)
+        ids = all_postings[0]
+        for postings in all_postings[1:]:
+            ids = [i for i in ids if self._contains(postings, i)]
+            if len(ids) == 0:
+                break
+
+        return ids
+
+
+    @staticmethod
+    def _contains(postings, sent_id):
+        '''Checks whether sorted posting list contains sentence id.'''
+        pos = bisect.bisect_left(postings, sent_id)
+        return pos < len(postings) and postings[pos] == sent_id
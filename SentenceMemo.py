@@ -0,0 +1,152 @@
+'''Sentence Memo Module
+
+This module contains a size-bounded memo of results computed for sentences, such as their POS tags or noun
+phrases, keyed on the normalized text of the sentence or on its words and tags. Running headers, captions and table
+cells repeat within and across documents; with a memo in front of the POS tagger and the chunker, a repeated
+sentence is looked up instead of being processed again. Least recently used results are evicted first once the
+memo is full, and hits and misses are counted. It requires collections library.
+
+Classes
+-------
+SentenceMemo(max_size)
+    Least recently used memo of results of sentences, with hit and miss counters
+'''
+
+import collections
+
+
+class SentenceMemo:
+    '''Class for representing a least recently used memo of results of sentences. Results are lists, kept as
+    tuples, and every sentence gets a list of its own, so that a caller modifying it changes neither the memo nor
+    the result of another sentence with the same key.
+
+    Attributes
+    ----------
+    max_size : int
+        Number of results kept
+    results : OrderedDict
+        Keys of sentences and their results as tuples, least recently used first
+    hits : int
+        Number of sentences whose result was looked up
+    misses : int
+        Number of sentences whose result was computed
+
+    Methods
+    -------
+    map_batch(self, func, keys, items):
+        Returns results of items, computing them with func for keys neither memoized nor repeated in the batch
+    get_hit_rate(self):
+        Retrieves share of sentences whose result was looked up
+    get_stats(self):
+        Retrieves hit and miss counts, hit rate and number of results kept
+    clear(self):
+        Removes all results and resets counters
+    '''
+
+    def __init__(self, max_size=5000):
+        '''Construct empty memo.
+
+        Parameters
+        ----------
+        max_size : int
+            Number of results kept
+
+        Returns
+        -------
+        None
+        '''
+        self.max_size = max_size
+        self.results = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+
+    def __len__(self):
+        return len(self.results)
+
+
+    def map_batch(self, func, keys, items):
+        '''Returns the result of every item, looking it up by key. Items whose key is neither memoized nor
+        repeated earlier in the batch are passed to func all at once, so that a batch function, e.g. one tagging
+        sentences in worker processes, still gets whole batches; their results are then memoized as tuples.
+
+        Parameters
+        ----------
+        func : function
+            Function taking a list of items, returns list of their results, each a new list
+        keys : list
+            Key of every item, e.g. its normalized sentence text
+        items : list
+            Items to be processed
+
+        Returns
+        -------
+        results : list
+            Result of every item as a new list, in order of items
+        '''
+        found = {}
+        missing = {}
+        for key, item in zip(keys, items):
+            if key in found or key in missing:
+                self.hits += 1
+            elif key in self.results:
+                self.results.move_to_end(key)
+                found[key] = self.results[key]
+                self.hits += 1
+            else:
+                missing[key] = item
+                self.misses += 1
+
+        computed = {}
+        if missing:
+            for key, result in zip(missing, func(list(missing.values()))):
+                computed[key] = result
+                found[key] = tuple(result)
+                self.results[key] = found[key]
+            # Evicts least recently used results
+            while len(self.results) > self.max_size:
+                self.results.popitem(last=False)
+
+        # Hands computed lists to the first item with their key, and copies of memoized tuples to the others
+        results = []
+        for key in keys:
+            result = computed.pop(key, None)
+            results.append(list(found[key]) if result is None else result)
+
+        return results
+
+
+    def get_hit_rate(self):
+        '''Retrieves share of sentences whose result was looked up instead of computed.
+
+        Returns
+        -------
+        hit_rate : float
+            Hits divided by hits and misses, 0 before first lookup
+        '''
+        lookups = self.hits + self.misses
+
+        return self.hits / lookups if lookups else 0.0
+
+
+    def get_stats(self):
+        '''Retrieves counters of memo.
+
+        Returns
+        -------
+        stats : dict
+            Numbers of hits and misses, hit rate and number of results kept
+        '''
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.get_hit_rate(), 'size': len(self)}
+
+
+    def clear(self):
+        '''Removes all results and resets hit and miss counters.
+
+        Returns
+        -------
+        None
+        '''
+        self.results.clear()
+        self.hits = 0
+        self.misses = 0
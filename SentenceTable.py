@@ -0,0 +1,104 @@
+'''Sentence Table Module
+
+This module contains a table of the distinct context sentences of a document, shared by all its terminology
+entries. Entries refer to sentences by id and to definitions by spans of sentences, so that a sentence is kept
+in memory once however many candidates it is a context of.
+
+Classes
+-------
+SentenceTable()
+    Distinct sentences of a document, numbered in order of insertion
+'''
+
+
+class SentenceTable:
+    '''Class for representing a table of distinct sentences.
+
+    Attributes
+    ----------
+    sentences : list
+        Distinct sentences, whose positions are their ids
+    ids : dict
+        Sentences as keys and their ids as values
+
+    Methods
+    -------
+    add(self, sentence):
+        Adds sentence if it is new, returns its id
+    get_sentence(self, sent_id):
+        Retrieves sentence by id
+    get_span(self, sent_id, start, end):
+        Retrieves part of sentence
+    '''
+
+    def __init__(self):
+        '''Construct empty table.
+
+        Returns
+        -------
+        None
+        '''
+        self.sentences = []
+        self.ids = {}
+
+
+    def __len__(self):
+        return len(self.sentences)
+
+
+    def add(self, sentence):
+        '''Adds sentence to the table if it is not there yet.
+
+        Parameters
+        ----------
+        sentence : str
+            Sentence to be added
+
+        Returns
+        -------
+        sent_id : int
+            Id of sentence
+        '''
+        sent_id = self.ids.get(sentence)
+        if sent_id is None:
+            sent_id = len(self.sentences)
+            self.ids[sentence] = sent_id
+            self.sentences.append(sentence)
+
+        return sent_id
+
+
+    def get_sentence(self, sent_id):
+        '''Retrieves sentence by id.
+
+        Parameters
+        ----------
+        sent_id : int
+            Id of sentence
+
+        Returns
+        -------
+        sentence : str
+            Sentence
+        '''
+        return self.sentences[sent_id]
+
+
+    def get_span(self, sent_id, start, end):
+        '''Retrieves part of sentence between two character positions.
+
+        Parameters
+        ----------
+        sent_id : int
+            Id of sentence
+        start : int
+            Position of first character
+        end : int
+            Position after last character
+
+        Returns
+        -------
+        span : str
+            Part of sentence
+        '''
+        return self.sentences[sent_id][start:end]
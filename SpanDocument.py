@@ -0,0 +1,223 @@
+'''Span Document Module
+
+This module contains a document model keeping the cleaned text of a document once, together with one
+casefolded copy of it, and its sentences as arrays of start and end offsets into both. Sentences are sliced
+out of the text only when a caller needs them as strings, so that the stages looking for terminology
+candidates in sentences neither copy nor casefold them again. It requires array library.
+
+Classes
+-------
+SpanDocument(text, starts, ends, pages)
+    Cleaned text of a document with sentence offsets and a casefolded shadow buffer
+
+Functions
+---------
+to_document(sentences, pages)
+    Takes in a span document or a list of sentences, returns a span document
+'''
+
+import array
+
+
+class SpanDocument:
+    '''Class for representing the sentences of a document as spans of its cleaned text. It behaves as a read-only
+    list of sentences, slicing a sentence from the text when it is accessed.
+
+    Attributes
+    ----------
+    text : str
+        Cleaned text sentences are spans of
+    starts : array
+        Offset in text of the first character of every sentence
+    ends : array
+        Offset in text after the last character of every sentence
+    pages : array
+        Page number of every sentence, None if not known
+    folded : str
+        Casefolded text, or casefolded sentences joined by line breaks if casefolding changes the length of text
+    fold_starts : array
+        Offset in folded of the first character of every sentence, starts if casefolding keeps offsets
+    fold_ends : array
+        Offset in folded after the last character of every sentence, ends if casefolding keeps offsets
+
+    Methods
+    -------
+    from_sentences(sent_list, pages):
+        Constructs span document from a list of sentences
+    get_span(self, sent_id):
+        Retrieves start and end of sentence in text
+    get_folded_span(self, sent_id):
+        Retrieves start and end of casefolded sentence in folded
+    get_folded(self, sent_id):
+        Retrieves casefolded sentence
+    '''
+
+    def __init__(self, text, starts, ends, pages=None):
+        '''Construct span document and casefold its text once.
+
+        Parameters
+        ----------
+        text : str
+            Cleaned text
+        starts : array
+            Offset in text of the first character of every sentence
+        ends : array
+            Offset in text after the last character of every sentence
+        pages : array, optional
+            Page number of every sentence
+
+        Returns
+        -------
+        None
+        '''
+        self.text = text
+        self.starts = starts
+        self.ends = ends
+        self.pages = pages
+        self._fold()
+
+
+    def _fold(self):
+        '''Casefolds text into the shadow buffer, keeping sentence offsets if no character folds to several.'''
+        folded = self.text.casefold()
+        # Casefolding never shortens a character, so equal lengths mean every character folds to one
+        if len(folded) == len(self.text):
+            self.folded, self.fold_starts, self.fold_ends = folded, self.starts, self.ends
+            return
+
+        parts = [self.text[start:end].casefold() for start, end in zip(self.starts, self.ends)]
+        self.fold_starts = array.array('Q')
+        self.fold_ends = array.array('Q')
+        offset = 0
+        for part in parts:
+            self.fold_starts.append(offset)
+            self.fold_ends.append(offset + len(part))
+            offset += len(part) + 1
+        self.folded = '\n'.join(parts)
+
+
+    @classmethod
+    def from_sentences(cls, sent_list, pages=None):
+        '''Constructs span document from a list of sentences, joined by line breaks, which sentences do not contain.
+
+        Parameters
+        ----------
+        sent_list : list
+            List of sentences
+        pages : array, optional
+            Page number of every sentence
+
+        Returns
+        -------
+        document : SpanDocument
+            Span document of sentences
+        '''
+        starts = array.array('Q')
+        ends = array.array('Q')
+        offset = 0
+        for sentence in sent_list:
+            starts.append(offset)
+            ends.append(offset + len(sentence))
+            offset += len(sentence) + 1
+
+        return cls('\n'.join(sent_list), starts, ends, pages)
+
+
+    def __len__(self):
+        return len(self.starts)
+
+
+    def __getitem__(self, sent_id):
+        if isinstance(sent_id, slice):
+            return [self[i] for i in range(*sent_id.indices(len(self)))]
+
+        return self.text[self.starts[sent_id]:self.ends[sent_id]]
+
+
+    def __iter__(self):
+        text = self.text
+        for start, end in zip(self.starts, self.ends):
+            yield text[start:end]
+
+
+    def __getstate__(self):
+        # Leaves casefolded text out of pickles, it is computed again when unpickling
+        return {'text': self.text, 'starts': self.starts, 'ends': self.ends, 'pages': self.pages}
+
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._fold()
+
+
+    def get_span(self, sent_id):
+        '''Retrieves start and end of sentence in text.
+
+        Parameters
+        ----------
+        sent_id : int
+            Id of sentence, i.e. its position in the document
+
+        Returns
+        -------
+        start : int
+            Offset of first character
+        end : int
+            Offset after last character
+        '''
+        return self.starts[sent_id], self.ends[sent_id]
+
+
+    def get_folded_span(self, sent_id):
+        '''Retrieves start and end of casefolded sentence in folded.
+
+        Parameters
+        ----------
+        sent_id : int
+            Id of sentence
+
+        Returns
+        -------
+        start : int
+            Offset of first character
+        end : int
+            Offset after last character
+        '''
+        return self.fold_starts[sent_id], self.fold_ends[sent_id]
+
+
+    def get_folded(self, sent_id):
+        '''Retrieves casefolded sentence.
+
+        Parameters
+        ----------
+        sent_id : int
+            Id of sentence
+
+        Returns
+        -------
+        folded : str
+            Casefolded sentence
+        '''
+        return self.folded[self.fold_starts[sent_id]:self.fold_ends[sent_id]]
+
+
+def to_document(sentences, pages=None):
+    '''Takes in a span document or a list of sentences, returns a span document of the sentences.
+
+    Parameters
+    ----------
+    sentences : SpanDocument or list
+        Sentences of a document
+    pages : array, optional
+        Page number of every sentence, for a list of sentences
+
+    Returns
+    -------
+    document : SpanDocument
+        The span document given, or a new one built from the list of sentences
+    '''
+    if isinstance(sentences, SpanDocument):
+        return sentences
+
+    return SpanDocument.from_sentences(sentences, pages)
@@ -0,0 +1,138 @@
+'''Terminology Candidate Index Module
+
+This module contains an insertion-ordered index of terminology candidates shared by the extraction stages.
+It keeps every candidate once, in order of first occurrence, together with the number of its occurrences and
+the ids of the sentences it was chunked from.
+
+Classes
+-------
+TermCandidateIndex()
+    Ordered terminology candidates with occurrence counts and sentence provenance
+'''
+
+
+class TermCandidateIndex:
+    '''Class for representing an ordered index of terminology candidates.
+
+    Attributes
+    ----------
+    counts : dict
+        Terminology candidates as keys, in order of first occurrence, and occurrence counts as values
+    sentence_ids : dict
+        Terminology candidates as keys and lists of ids of sentences they occur in as values
+    n_sentences : int
+        Number of sentences up to the last one a terminology candidate occurs in
+
+    Methods
+    -------
+    add(self, term_cand, sent_id):
+        Records occurrence of terminology candidate
+    get_candidates(self):
+        Retrieves terminology candidates in order of first occurrence
+    get_count(self, term_cand):
+        Retrieves occurrence count of terminology candidate
+    get_sentence_ids(self, term_cand):
+        Retrieves ids of sentences terminology candidate occurs in
+    get_sentence_count(self):
+        Retrieves number of sentences candidates were chunked from
+    '''
+
+    def __init__(self):
+        '''Construct empty index.
+
+        Returns
+        -------
+        None
+        '''
+        self.counts = {}
+        self.sentence_ids = {}
+        self.n_sentences = 0
+
+
+    def __contains__(self, term_cand):
+        return term_cand in self.counts
+
+
+    def __len__(self):
+        return len(self.counts)
+
+
+    def __iter__(self):
+        return iter(self.counts)
+
+
+    def add(self, term_cand, sent_id=None):
+        '''Records occurrence of terminology candidate, adding it to the index if it is new.
+
+        Parameters
+        ----------
+        term_cand : str
+            Terminology candidate
+        sent_id : int, optional
+            Id of sentence terminology candidate occurs in
+
+        Returns
+        -------
+        None
+        '''
+        self.counts[term_cand] = self.counts.get(term_cand, 0) + 1
+        ids = self.sentence_ids.setdefault(term_cand, [])
+        # Adds sentence id only once per sentence
+        if sent_id is not None and (not ids or ids[-1] != sent_id):
+            ids.append(sent_id)
+            self.n_sentences = max(self.n_sentences, sent_id + 1)
+
+
+    def get_candidates(self):
+        '''Retrieves terminology candidates in order of first occurrence.
+
+        Returns
+        -------
+        candidates : list
+            List of terminology candidates
+        '''
+        return list(self.counts)
+
+
+    def get_count(self, term_cand):
+        '''Retrieves number of occurrences of terminology candidate.
+
+        Parameters
+        ----------
+        term_cand : str
+            Terminology candidate
+
+        Returns
+        -------
+        count : int
+            Occurrence count, 0 for unknown candidates
+        '''
+        return self.counts.get(term_cand, 0)
+
+
+    def get_sentence_ids(self, term_cand):
+        '''Retrieves ids of sentences terminology candidate was chunked from.
+
+        Parameters
+        ----------
+        term_cand : str
+            Terminology candidate
+
+        Returns
+        -------
+        sentence_ids : list
+            Sorted list of sentence ids
+        '''
+        return self.sentence_ids.get(term_cand, [])
+
+
+    def get_sentence_count(self):
+        '''Retrieves number of sentences candidates were chunked from, counting sentences without candidates
+        before the last one that has some.
+
+        Returns
+        -------
+        n_sentences : int
+            Number of sentences
+        '''
+        return self.n_sentences
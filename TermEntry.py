@@ -1,16 +1,25 @@
+import array, tracemalloc
 from DataExtraction import *
+from SentenceTable import *
+from Instrumentation import *
 
 class TermEntry:
-    '''Class for representing terminology entry.
+    '''Class for representing terminology entry. Context sentences are kept as ids in a sentence table shared
+    by all entries of a document, and definitions as spans of sentences in that table, so that no sentence is
+    stored more than once.
 
     Attributes
     ----------
     term_candidate : str
         Terminology candidate
-    definition : list
-        Terminology candidate definition(s)
-    context : list
-        Sentence context in which terminology candidate appears
+    table : SentenceTable
+        Table of sentences of the document terminology candidate comes from
+    context_ids : array
+        Ids of context sentences in which terminology candidate appears, None if not set
+    definition_spans : array
+        Sentence id, start and end of every terminology candidate definition, one after the other, None if not set
+    context_pages : array
+        Page number of every context sentence, None if not known
 
     Methods
     -------
@@ -26,9 +35,15 @@ class TermEntry:
         Retrieves context sentences
     set_context(self, contxt_list):
         Sets context sentences
+    get_pages(self):
+        Retrieves page numbers of context sentences
+    set_pages(self, page_list):
+        Sets page numbers of context sentences
     '''
 
-    def __init__(self, term_candidate, definition, context):
+    __slots__ = ('term_candidate', 'table', 'context_ids', 'definition_spans', 'context_pages')
+
+    def __init__(self, term_candidate, definition, context, table=None, pages=None):
         '''Construct attributes for terminology entry object.
 
         Parameters
@@ -39,14 +54,27 @@ class TermEntry:
             Terminology candidate definition
         context : list
             Sentence context in which terminology candidate appears
+        table : SentenceTable, optional
+            Table of sentences shared by entries of the same document, a new one if not given
+        pages : array, optional
+            Page number of every context sentence
 
         Returns
         -------
         None
         '''
         self.term_candidate = term_candidate
-        self.definition = definition
-        self.context = context
+        self.table = SentenceTable() if table is None else table
+        self.context_ids = None
+        self.definition_spans = None
+        self.context_pages = None
+        if pages is not None:
+            self.set_pages(pages)
+        # Sets context first, so that definitions can be found in context sentences
+        if context is not None:
+            self.set_context(context)
+        if definition is not None:
+            self.set_definition(definition)
 
 
     def get_term_candidate(self):
@@ -83,11 +111,16 @@ class TermEntry:
         definition : list
             Terminology candidate definition(s)
         '''
-        return self.definition
+        if self.definition_spans is None:
+            return None
+
+        spans = self.definition_spans
+        return [self.table.get_span(spans[i], spans[i + 1], spans[i + 2]) for i in range(0, len(spans), 3)]
 
 
     def set_definition(self, def_list):
-        '''Sets terminology candidate definition.
+        '''Sets terminology candidate definition. Every definition is stored as the span of the first context
+        sentence containing it, or added to the sentence table if no context sentence does.
 
         Parameters
         ----------
@@ -98,7 +131,27 @@ class TermEntry:
         -------
         None
         '''
-        self.definition = def_list
+        spans = array.array('I')
+        for d in def_list:
+            sent_id, start = self._locate(d)
+            spans.extend((sent_id, start, start + len(d)))
+        self.definition_spans = spans
+
+
+    def _locate(self, text):
+        '''Finds text in context sentences, returns sentence id and start of text.'''
+        context_ids = self.context_ids if self.context_ids is not None else ()
+        # Definitions usually run to the end of their sentence
+        for sent_id in context_ids:
+            sentence = self.table.get_sentence(sent_id)
+            if sentence.endswith(text):
+                return sent_id, len(sentence) - len(text)
+        for sent_id in context_ids:
+            start = self.table.get_sentence(sent_id).find(text)
+            if start >= 0:
+                return sent_id, start
+
+        return self.table.add(text), 0
 
 
     def get_context(self):
@@ -109,7 +162,10 @@ class TermEntry:
         context : list
             Sentences in which terminology candidate appears
         '''
-        return self.context
+        if self.context_ids is None:
+            return None
+
+        return [self.table.get_sentence(sent_id) for sent_id in self.context_ids]
 
 
     def set_context(self, contxt_list):
@@ -124,16 +180,197 @@ class TermEntry:
         -------
         None
         '''
-        self.context = contxt_list
+        self.context_ids = array.array('I', (self.table.add(s) for s in contxt_list))
+
+
+    def get_pages(self):
+        '''Retrieves page numbers of context sentences, counting from 0.
+
+        Returns
+        -------
+        pages : list
+            Page number of every context sentence, in order of context sentences, None if not known
+        '''
+        if self.context_pages is None:
+            return None
+
+        return self.context_pages.tolist()
+
+
+    def set_pages(self, page_list):
+        '''Sets page numbers of context sentences.
+
+        Parameters
+        ----------
+        page_list : list
+            Page number of every context sentence
+
+        Returns
+        -------
+        None
+        '''
+        self.context_pages = array.array('I', page_list)
+
+
+class LazyTermEntry(TermEntry):
+    '''Class for representing terminology entry whose context sentences and definition(s) are extracted on
+    first access and kept afterwards.
+
+    Attributes
+    ----------
+    sent_list : list or SpanDocument
+        Sentences of the document terminology candidate comes from
+    index : SentenceIndex
+        Sentence index built from sent_list, shared by all entries of the document
+    sent_pages : array
+        Page number of every sentence in sent_list, None if not known
+    max_def_length : int
+        Length of the longest context sentence to be searched for definitions, None for no limit
+
+    Methods
+    -------
+    get_definition(self):
+        Retrieves definition list, extracting it on first call
+    get_context(self):
+        Retrieves context sentences, extracting them on first call
+    get_pages(self):
+        Retrieves page numbers of context sentences, extracting context sentences on first call
+    has_definition(self):
+        Checks whether terminology candidate has at least one definition, without extracting definition(s)
+    '''
+
+    __slots__ = ('sent_list', 'index', 'sent_pages', 'max_def_length')
+
+    def __init__(self, term_candidate, sent_list, index, table=None, sent_pages=None, max_def_length=None):
+        '''Construct terminology entry object without context sentences and definitions.
+
+        Parameters
+        ----------
+        term_candidate : str
+            Terminology candidate
+        sent_list : list or SpanDocument
+            Sentences of the document terminology candidate comes from
+        index : SentenceIndex
+            Sentence index built from sent_list
+        table : SentenceTable, optional
+            Table of sentences shared by entries of the same document, a new one if not given
+        sent_pages : array, optional
+            Page number of every sentence in sent_list
+        max_def_length : int, optional
+            Length of the longest context sentence to be searched for definitions
+
+        Returns
+        -------
+        None
+        '''
+        super().__init__(term_candidate, None, None, table)
+        self.sent_list = sent_list
+        self.index = index
+        self.sent_pages = sent_pages
+        self.max_def_length = max_def_length
+
+
+    def get_definition(self):
+        '''Retrieves terminology candidate definition(s), extracting them from context sentences on first call.
+
+        Returns
+        -------
+        definition : list
+            Terminology candidate definition(s)
+        '''
+        if self.definition_spans is None:
+            self.set_definition(extract_def(self.term_candidate, self.get_context(), max_length=self.max_def_length))
+
+        return super().get_definition()
+
+
+    def get_context(self):
+        '''Retrieves sentences in which terminology candidate appears, extracting them on first call.
+
+        Returns
+        -------
+        context : list
+            Sentences in which terminology candidate appears
+        '''
+        if self.context_ids is None:
+            if self.sent_pages is None:
+                self.set_context(extract_context(self.term_candidate, self.sent_list, self.index))
+            else:
+                context, pages = extract_context_pages(self.term_candidate, self.sent_list, self.sent_pages,
+                                                       self.index)
+                self.set_context(context)
+                self.set_pages(pages)
+
+        return super().get_context()
+
+
+    def get_pages(self):
+        '''Retrieves page numbers of context sentences, extracting context sentences on first call.
+
+        Returns
+        -------
+        pages : list
+            Page number of every context sentence, None if not known
+        '''
+        self.get_context()
+
+        return super().get_pages()
+
+
+    def has_definition(self):
+        '''Checks whether terminology candidate has at least one definition, searching context sentences up to
+        the first one holding a definition if definition(s) are not extracted yet. Lazy entries are made for
+        candidates which may have a definition, see find_definable; the ones having one are those create_entry
+        makes eagerly.
+
+        Returns
+        -------
+        bool
+            Whether terminology candidate has at least one definition
+        '''
+        if self.definition_spans is not None:
+            return len(self.definition_spans) > 0
+
+        return any(extract_def(self.term_candidate, [s], max_length=self.max_def_length) for s in self.get_context())
 
 
-def create_entry(file):
+def create_entry(file, top_k=None, processes=None, stream=False, lazy=False, scoring=None, min_score=None,
+                 observer=None, max_def_length=None):
     '''Takes in .PDF file. It opens it, reads it and converts it to plain text. It pre-processes the text,
-    extracts terminology candidates, their definition(s) and context sentences.
+    extracts terminology candidates, their definition(s) and context sentences. If top_k is given, candidates
+    are counted in memory growing with top_k only and only the top_k most frequent ones are processed further,
+    ranked by frequency; sentences are still all kept for context extraction.
+    If scoring is given, candidates are ranked by termhood score instead, and only the top_k best ones and those
+    scoring at least min_score are processed further. If processes is given, the document is pre-processed page
+    range by page range in worker processes. If stream is True, pages are streamed through pre-processing and
+    only sentences are kept in memory. If lazy is True, entries are returned as soon as candidates are chunked,
+    for the candidates which may have a definition, and extract their context sentences and definition(s) on
+    first access; LazyTermEntry.has_definition tells the ones having one. If observer is given, every stage
+    reports its measurements to it, see measure_stage. Entries know the page of every context sentence, except
+    when pages are streamed or pre-processed in worker processes.
+    Lines repeated on many pages, such as running headers, are removed in every mode.
+    If max_def_length is given, context sentences longer than it are not searched for definitions.
 
     Parameters
     ----------
     file : .PDF file
+        Path of file, or its content as bytes, bytearray, memoryview or mmap object
+    top_k : int, optional
+        Number of most frequent, or best scoring, terminology candidates to be kept
+    processes : int, optional
+        Number of worker processes for pre-processing
+    stream : bool
+        Whether to stream pages through pre-processing
+    lazy : bool
+        Whether to extract context sentences and definition(s) on first access
+    scoring : str, optional
+        Termhood score to rank terminology candidates by, one of SCORING_METHODS
+    min_score : float, optional
+        Lowest termhood score of terminology candidates to be kept, if scoring is given
+    observer : function, optional
+        Function taking stage name and record of its measurements, e.g. a StageRecorder
+    max_def_length : int, optional
+        Length of the longest context sentence to be searched for definitions
     
     Returns
     -------
@@ -141,27 +378,141 @@ def create_entry(file):
         List of TermEntry objects
     '''
     # Text pre-processing
-    txt = pdf_to_text(file)
-    plain_text = remove_division(txt)
-    all_sents = get_sentences(plain_text)
-    cleaned_s = sents_for_pos(all_sents)
-    tagged = pos_tagging(cleaned_s)
-    chunks = chunking(tagged)
+    sent_pages = None
+    if stream:
+        # Keeps sentences for context extraction, noun phrases are consumed one sentence at a time by chunk
+        # extraction, so that streaming pre-processing is measured as part of candidate selection
+        all_sents = []
+
+        def stream_chunks():
+            for sentence, phrases in stream_preprocess(file):
+                all_sents.append(sentence)
+                yield phrases
+
+        chunks = stream_chunks()
+    elif processes is None:
+        txt, page_starts = measure_stage(observer, 'pdf_to_text', pdf_to_pages, file,
+                                         counts=lambda result: {'pages': len(result[1]), 'characters': len(result[0])})
+        # Drops running headers, footers and other lines repeated on many pages
+        txt, page_starts = measure_stage(observer, 'remove_boilerplate', remove_boilerplate, txt, page_starts,
+                                         counts=lambda result: {'characters': len(result[0])})
+        all_sents = measure_stage(observer, 'split_sentences', split_document, txt, page_starts,
+                                  counts=lambda document: {'sentences': len(document)})
+        sent_pages = all_sents.pages
+        cleaned_s = measure_stage(observer, 'sents_for_pos', sents_for_pos, all_sents,
+                                  counts=lambda sents: {'sentences': len(sents)})
+        memo_hits = get_tag_memo().hits
+        tagged = measure_stage(observer, 'pos_tagging', pos_tagging, cleaned_s,
+                               counts=lambda tagged: {'tokens': sum(len(tokens) for tokens in tagged),
+                                                      'memo_hits': get_tag_memo().hits - memo_hits})
+        chunks = measure_stage(observer, 'chunking', phrase_chunking, tagged,
+                               counts=lambda chunks: {'chunks': sum(1 for _ in iter_chunks(chunks))})
+    else:
+        all_sents, chunks = measure_stage(observer, 'parallel_preprocess', parallel_preprocess, file, processes,
+                                          counts=lambda result: {'pages': page_count(file),
+                                                                 'sentences': len(result[0])})
     
     # Extracts terminology candidates
-    term_candidates = get_chunks(chunks)
+    term_candidates = measure_stage(observer, 'select_candidates', select_candidates, chunks, top_k, scoring,
+                                    min_score, counts=lambda candidates: {'sentences': len(all_sents),
+                                                               'candidates': len(candidates)})
+
+    # Indexes sentences once for all context lookups, as a span document if they were streamed or pre-processed
+    # in worker processes
+    index = measure_stage(observer, 'sentence_index', SentenceIndex, all_sents)
+    all_sents = index.document
+
+    if lazy:
+        definable = measure_stage(observer, 'find_definable', find_definable, term_candidates, all_sents, index,
+                                  counts=lambda definable: {'candidates': len(definable)})
+        table = SentenceTable()
+        return [LazyTermEntry(candidate, all_sents, index, table, sent_pages, max_def_length)
+                for candidate in term_candidates if candidate in definable]
+
+    # Extracts context and definition(s) for terminology candidates
+    contexts, pages = measure_stage(observer, 'extract_context', extract_contexts, term_candidates, all_sents, index,
+                                    sent_pages, counts=lambda result: {'contexts': sum(map(len, result[0].values()))})
+    all_definitions = measure_stage(observer, 'extract_all_defs', extract_all_defs, contexts, max_def_length,
+                                    counts=lambda defs: {'definitions': sum(map(len, defs.values()))})
+    entries = measure_stage(observer, 'make_entries', make_entries, contexts, all_definitions, None, pages,
+                            counts=lambda entries: {'entries': len(entries)})
+    
+    return entries
+
+
+def profile_entry(file, report_path=None, profile_path=None, trace_memory=False, **options):
+    '''Takes in .PDF file and runs create_entry on it with a StageRecorder. Optionally traces memory, so that
+    every stage record has its peak memory, and profiles the run with cProfile.
+
+    Parameters
+    ----------
+    file : .PDF file
+    report_path : str, optional
+        Path of JSON file stage records are written to
+    profile_path : str, optional
+        Path of file cProfile statistics are written to, readable with pstats
+    trace_memory : bool
+        Whether to trace memory allocations, which slows stages down
+    **options
+        Options of create_entry: top_k, processes, stream, lazy, scoring, min_score and max_def_length
+
+    Returns
+    -------
+    entries : list
+        List of TermEntry objects
+    recorder : StageRecorder
+        Recorder holding stage records
+    '''
+    recorder = StageRecorder(file)
+    tracing = trace_memory and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+    try:
+        if profile_path is None:
+            entries = create_entry(file, observer=recorder, **options)
+        else:
+            import cProfile
+            profiler = cProfile.Profile()
+            entries = profiler.runcall(create_entry, file, observer=recorder, **options)
+            profiler.dump_stats(profile_path)
+    finally:
+        if tracing:
+            tracemalloc.stop()
+    if report_path is not None:
+        recorder.export_json(report_path)
+
+    return entries, recorder
+
+
+def make_entries(contexts, all_definitions, table=None, pages=None):
+    '''Takes in context sentences and definitions of terminology candidates, returns terminology entries
+    for candidates with at least one definition, in order of candidates. Entries share one sentence table.
+
+    Parameters
+    ----------
+    contexts : dict
+        Terminology candidates as keys and lists of their context sentences as values
+    all_definitions : dict
+        Terminology candidates as keys and lists of possible definitions as values
+    table : SentenceTable, optional
+        Table of sentences to be shared with other entries of the same document, a new one if not given
+    pages : dict, optional
+        Terminology candidates as keys and page numbers of their context sentences as values
+
+    Returns
+    -------
+    entries : list
+        List of TermEntry objects
+    '''
+    if table is None:
+        table = SentenceTable()
 
     entries = []
-    for candidate in term_candidates:
-        # Extracts context and definition(s) for terminology candidate
-        contxt = extract_context(candidate, all_sents)
-        definitions = extract_def(candidate, contxt)
+    for candidate, contxt in contexts.items():
+        definitions = all_definitions[candidate]
         # Instantiates class for terminology candidate with definition(s)
         if len(definitions) > 0:
-            term_entry = TermEntry(candidate, [], [])
-            term_entry.set_definition(definitions)
-            term_entry.set_context(contxt)
-            entries.append(term_entry)
-    
-    return entries
+            entries.append(TermEntry(candidate, definitions, contxt, table,
+                                     None if pages is None else pages[candidate]))
 
+    return entries
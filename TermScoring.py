@@ -0,0 +1,197 @@
+'''Term Scoring Module
+
+This module scores the termhood of all terminology candidates of a document at once, so that only the best
+ones go through context and definition extraction, ranked by score. Scores are computed with NumPy over arrays
+of candidate counts, sentence frequencies and nested candidate pairs, i.e. candidates occurring inside longer
+ones. Every document is scored on its own, so TF-IDF takes its sentences as documents; NC-value is not
+implemented, since candidates are scored from counts only, without the words around them. It requires NumPy,
+which is imported on first use.
+
+Functions
+---------
+nested_pairs(candidates)
+    Takes in terminology candidates, returns pairs of nested and containing candidates
+c_value(counts, lengths, pairs)
+    Takes in candidate counts, lengths and nested pairs, returns C-values
+tf_idf(counts, sentence_counts, n_sentences, pairs)
+    Takes in candidate counts, sentence frequencies and nested pairs, returns TF-IDF scores
+score_candidates(index, method)
+    Takes in a candidate index, returns termhood scores of its candidates
+rank_candidates(index, method, top_k, min_score)
+    Takes in a candidate index, returns candidates ranked by termhood, pruned to top_k or min_score
+'''
+
+# Termhood scores that rank_candidates can rank by
+SCORING_METHODS = ['c_value', 'tf_idf']
+
+
+def nested_pairs(candidates):
+    '''Takes in terminology candidates and finds every candidate that occurs as a sequence of whole words
+    inside a longer one.
+
+    Parameters
+    ----------
+    candidates : list
+        List of terminology candidates
+
+    Returns
+    -------
+    nested : list
+        Ids of nested candidates, i.e. positions in candidates
+    containing : list
+        Ids of candidates containing them, one for every nested id
+    occurrences : list
+        Number of times nested candidate occurs in containing one, one for every nested id
+    '''
+    ids = {candidate: cand_id for cand_id, candidate in enumerate(candidates)}
+    nested, containing, occurrences = [], [], []
+    for cand_id, candidate in enumerate(candidates):
+        words = candidate.split(' ')
+        found = {}
+        # Looks up every shorter sequence of consecutive words
+        for start in range(len(words)):
+            for end in range(start + 1, len(words) + 1 - (start == 0)):
+                nested_id = ids.get(' '.join(words[start:end]))
+                if nested_id is not None:
+                    found[nested_id] = found.get(nested_id, 0) + 1
+        for nested_id, count in found.items():
+            nested.append(nested_id)
+            containing.append(cand_id)
+            occurrences.append(count)
+
+    return nested, containing, occurrences
+
+
+def c_value(counts, lengths, pairs):
+    '''Takes in counts and word lengths of candidates and their nested pairs, returns C-values. A candidate
+    occurs on its own and inside every longer candidate containing it, so its frequency f(a) is the sum of both.
+    C-value is log2(|a| + 1) f(a) for a candidate not nested in another one, and
+    log2(|a| + 1) (f(a) - sum of f(b) / |T(a)|) for a candidate nested in the set T(a) of longer candidates.
+    Word length is increased by one, so that single-word candidates do not all score 0.
+
+    Parameters
+    ----------
+    counts : ndarray
+        Numbers of occurrences of candidates on their own
+    lengths : ndarray
+        Numbers of words of candidates
+    pairs : tuple
+        Nested ids, containing ids and occurrences, as returned by nested_pairs
+
+    Returns
+    -------
+    scores : ndarray
+        C-values of candidates
+    '''
+    import numpy
+    nested, containing, occurrences = (numpy.asarray(ids, dtype=numpy.int64) for ids in pairs)
+    n_cands = len(counts)
+    frequencies = counts + numpy.bincount(nested, weights=counts[containing] * occurrences, minlength=n_cands)
+    n_containing = numpy.bincount(nested, minlength=n_cands)
+    containing_sum = numpy.bincount(nested, weights=frequencies[containing], minlength=n_cands)
+    nested_share = numpy.divide(containing_sum, n_containing, out=numpy.zeros(n_cands), where=n_containing > 0)
+
+    return numpy.log2(lengths + 1) * (frequencies - nested_share)
+
+
+def tf_idf(counts, sentence_counts, n_sentences, pairs):
+    '''Takes in counts and sentence frequencies of candidates and their nested pairs, returns TF-IDF scores
+    with sentences of the document as documents. Term frequency counts occurrences on their own and inside
+    longer candidates, inverse document frequency is log((1 + N) / (1 + n)) + 1 for a candidate chunked
+    from n of N sentences, so that candidates frequent in few sentences score highest.
+
+    Parameters
+    ----------
+    counts : ndarray
+        Numbers of occurrences of candidates on their own
+    sentence_counts : ndarray
+        Numbers of sentences candidates were chunked from
+    n_sentences : int
+        Number of sentences of the document
+    pairs : tuple
+        Nested ids, containing ids and occurrences, as returned by nested_pairs
+
+    Returns
+    -------
+    scores : ndarray
+        TF-IDF scores of candidates
+    '''
+    import numpy
+    nested, containing, occurrences = (numpy.asarray(ids, dtype=numpy.int64) for ids in pairs)
+    n_cands = len(counts)
+    frequencies = counts + numpy.bincount(nested, weights=counts[containing] * occurrences, minlength=n_cands)
+    sentence_frequencies = numpy.minimum(
+        sentence_counts + numpy.bincount(nested, weights=sentence_counts[containing], minlength=n_cands),
+        n_sentences)
+
+    return frequencies * (numpy.log((1 + n_sentences) / (1 + sentence_frequencies)) + 1)
+
+
+def score_candidates(index, method='c_value'):
+    '''Takes in a candidate index and scores termhood of all its candidates at once.
+
+    Parameters
+    ----------
+    index : TermCandidateIndex
+        Index of terminology candidates with their counts and sentence ids
+    method : str
+        Termhood score, one of SCORING_METHODS
+
+    Returns
+    -------
+    scores : ndarray
+        Scores of candidates, in order of first occurrence
+    '''
+    if method not in SCORING_METHODS:
+        raise ValueError('Unknown scoring method {!r}, expected one of {}'.format(method, SCORING_METHODS))
+
+    import numpy
+    candidates = index.get_candidates()
+    counts = numpy.fromiter((index.get_count(candidate) for candidate in candidates), dtype=numpy.float64,
+                            count=len(candidates))
+    pairs = nested_pairs(candidates)
+    if method == 'c_value':
+        lengths = numpy.fromiter((candidate.count(' ') + 1 for candidate in candidates), dtype=numpy.float64,
+                                 count=len(candidates))
+        return c_value(counts, lengths, pairs)
+
+    sentence_counts = numpy.fromiter((len(index.get_sentence_ids(candidate)) for candidate in candidates),
+                                     dtype=numpy.float64, count=len(candidates))
+
+    return tf_idf(counts, sentence_counts, max(index.get_sentence_count(), 1), pairs)
+
+
+def rank_candidates(index, method='c_value', top_k=None, min_score=None):
+    '''Takes in a candidate index, scores its candidates and returns them ranked by score, highest first.
+    Candidates with equal scores keep their order of first occurrence. If min_score is given, candidates
+    scoring less are dropped, and if top_k is given, only the top_k best ones are kept.
+
+    Parameters
+    ----------
+    index : TermCandidateIndex
+        Index of terminology candidates with their counts and sentence ids
+    method : str
+        Termhood score, one of SCORING_METHODS
+    top_k : int, optional
+        Number of best terminology candidates to be kept
+    min_score : float, optional
+        Lowest score of terminology candidates to be kept
+
+    Returns
+    -------
+    ranked : list
+        List of terminology candidates
+    '''
+    candidates = index.get_candidates()
+    if len(candidates) == 0:
+        return []
+
+    import numpy
+    scores = score_candidates(index, method)
+    order = numpy.argsort(-scores, kind='stable')
+    if min_score is not None:
+        order = order[scores[order] >= min_score]
+    if top_k is not None:
+        order = order[:top_k]
+
+    return [candidates[cand_id] for cand_id in order.tolist()]
@@ -1,50 +1,461 @@
 '''Text Pre-Processing Module
 
 This module takes in text from a .PDF file, elaborates it as plain text and cleans it into a consistent format
-that can be used for terminology candidate class implementation. It requires PyMuPDF, NLTK and re libraries.
+that can be used for terminology candidate class implementation. It requires PyMuPDF, NLTK, array, bisect,
+collections, itertools, math, multiprocessing, os, re and tempfile libraries; PyMuPDF and NLTK are imported on
+first use, so that importing the module is fast and does not need them, and the span document and sentence memo
+modules.
+.PDF files are given as paths or as their content in memory: bytes, bytearray, memoryview or mmap objects are
+read by PyMuPDF in place, without copying them to a temporary file.
 Pre-processing pipeline consists of: removing word divisions, line breaks and double spaces; cleaning up text; 
-POS tagging; chunking.
+POS tagging; chunking. The pipeline chunks noun phrases with phrase_chunking, which applies the chunk grammar
+as one regular expression to a string of tag codes; chunking, which builds NLTK parse trees, is its reference.
+Whole documents are split into a span document, which keeps the cleaned text once and sentences as offsets.
+Lines repeated on many pages of a whole document, such as running headers and footers, are removed before
+splitting it, and POS tags and noun phrases of sentences are memoized, so that a repeated sentence is tagged and
+chunked once.
 
 Functions
 ---------
-pdf_to_text(pdf)
-    Takes in a .PDF file, returns content as plain text
+open_pdf(pdf)
+    Takes in a .PDF file as a path or in memory, returns it opened with PyMuPDF
+pdf_to_pages(pdf, start, end)
+    Takes in a .PDF file and optional page range, returns content as plain text and start offsets of pages
+pdf_to_text(pdf, start, end)
+    Takes in a .PDF file and optional page range, returns content as plain text
+page_count(pdf)
+    Takes in a .PDF file, returns its number of pages
+line_key(line)
+    Takes in a line of text, returns it normalized for comparison with lines of other pages
+edge_lines(lines)
+    Takes in lines of a page, returns places and normalized text of its first and last non-blank lines
+page_edges(page)
+    Takes in page text, returns places and normalized text of its first and last non-blank lines
+range_edges(pdf, start, end)
+    Takes in a .PDF file and page range, returns places and normalized first and last lines of every page
+select_boilerplate(edges)
+    Takes in first and last lines of every page, returns those repeated on so many pages that they are boilerplate
+find_boilerplate(pages)
+    Takes in page texts, returns places and normalized lines repeated on so many pages that they are boilerplate
+drop_boilerplate(page, boilerplate)
+    Takes in page text and boilerplate, returns page text without its boilerplate lines
+remove_boilerplate(text, page_starts, boilerplate)
+    Takes in plain text and start offsets of pages, returns them without lines repeated on many pages
 remove_division(text)
     Takes in a string of text, returns text cleaned up from word divisions, line breaks and double spaces
 get_sentences(flow_text)
     Takes in a flow of text, returns list of sentences cleaned up from URLs, DOIs, emails, non-alphanumeric characters,
     expands abbreviations
+expand_abbreviations(text)
+    Takes in text, returns it with abbreviations expanded in one scan
+clean_text(text)
+    Takes in plain text, returns it cleaned up as get_sentences(remove_division(text)) does in a few fused passes
+split_sentences(text)
+    Takes in plain text, returns same sentences as get_sentences(remove_division(text)) in a few fused passes
+page_cuts(text, page_starts, first_page)
+    Takes in plain text and start offsets of pages, returns safe cuts where sentences of every page begin
+split_document(text, page_starts, first_page)
+    Takes in plain text and optional start offsets of pages, returns its sentences as a span document
+split_page_sentences(text, page_starts, first_page)
+    Takes in plain text and start offsets of pages, returns sentences and page number of every sentence
 sents_for_pos(raw_sents)
     Takes in a list of sentences, returns it cleaned up from non-words, non-spaces, double spaces
-pos_tagging(scraped_sents)
+get_tagger()
+    Returns POS tagger shared by all calls in a process, loading it on first use
+get_tag_memo()
+    Returns memo of POS tagged sentences shared by all calls in a process
+get_chunk_memo()
+    Returns memo of noun phrases of sentences shared by all calls in a process
+clear_memos()
+    Removes memoized POS tags and noun phrases, resetting their counters
+preload_tagger()
+    Loads POS tagger in a worker process as it starts, leaving errors to the first call that needs it
+tag_batch(token_lists)
+    Takes in a list of token lists, returns POS tagged tokens
+pos_tagging(scraped_sents, batch_size, processes, memoize)
     Takes in a list of sentences, returns POS tagged words from sentences
+get_chunker()
+    Returns noun phrase chunker shared by all calls in a process, building it on first use
+chunk_sentence(tagged_sent)
+    Takes in POS-tagged words of one sentence, returns its parse tree
 chunking(tagged_sents)
     Takes in a list of POS-tagged words, returns chunked Noun Phrases
+encode_tags(tagged_sent)
+    Takes in POS-tagged words of one sentence, returns their tags as a string of one-character codes
+chunk_spans(tagged_sent)
+    Takes in POS-tagged words of one sentence, returns token spans of its noun phrases
+chunk_noun_phrases(tagged_sent)
+    Takes in POS-tagged words of one sentence, returns its noun phrases without building a parse tree
+phrase_chunking(tagged_sents, memoize)
+    Takes in a list of POS-tagged words, returns noun phrases of every sentence, as chunking would find them
+preprocess_text(text)
+    Takes in plain text, returns sentences and their noun phrases
+split_at_safe_cuts(text)
+    Takes in text, returns it split at first and last sentence end where it can be cut
+last_safe_cut(text, pos)
+    Takes in text, returns offset after its last safe cut from pos on
+trailing_word_start(text)
+    Takes in text, returns offset of the run of non-whitespace characters it ends with
+preprocess_page_range(pdf, start, end, boilerplate)
+    Takes in a .PDF file and page range, returns pre-processed text between safe cuts and unprocessed rest
+parallel_preprocess(pdf, processes, pages_per_range)
+    Takes in a .PDF file, returns sentences and noun phrases pre-processed page range by page range in parallel
+iter_pages(pdf)
+    Takes in a .PDF file, yields text of its pages
+spool_pages(pages)
+    Takes in page texts, returns boilerplate and the pages read back from a temporary file
+iter_sentences(pages, boilerplate)
+    Takes in page texts, yields sentences as soon as they are complete
+stream_preprocess(pdf, batch_size)
+    Takes in a .PDF file, yields sentences and their noun phrases with memory bounded by a window of pages
 '''
 
-import fitz, nltk, re
+import array, bisect, collections, itertools, math, multiprocessing, os, re, tempfile
+from SpanDocument import *
+from SentenceMemo import *
 
 
-def pdf_to_text(pdf):
-    '''Takes in a .PDF file, opens it with PyMuPDF and extracts text from it.
+# POS tagger and chunker shared by all calls in a process, loaded on first use
+_tagger = None
+_chunker = None
+# Memos of POS tagged sentences and of parse trees shared by all calls in a process, and their size
+_tag_memo = None
+_chunk_memo = None
+MEMO_SIZE = 5000
+
+# Define grammar for chunking noun phrases
+GRAMMAR_RULES = r'''
+    NP: {<DT\$>?<JJ>*<NN.*>+}
+    '''
+
+# Grammar rewritten over one-character tag codes. Tag patterns match whole tags: <DT\$> only the tag DT$,
+# <JJ> only JJ and <NN.*> every tag starting with NN; other tags are coded x
+NP_TAG_CODES = {'DT$': 'D', 'JJ': 'J'}
+NP_CODES = re.compile('D?J*N+')
+# Codes of tags seen so far, filled on first use of every tag
+_tag_codes = {}
+
+# Defines dictionary with abbreviations as keys and their expansions as values
+ABBREVIATIONS = {
+    r'\banon\.': 'anonymous',
+    r'\bca\.': 'circa',
+    r'\bcf\.': 'compare to',
+    r'\bdef\.\s?\:?': 'definition: ',
+    r'\be\.\s?g\.': 'for example',
+    r'\bed\.': 'edition',
+    r'\beds\.': 'editions',
+    r'\bet\sal\.': 'et alia',
+    r'\betc\.' : 'et cetera',
+    r'\bi\.\s?e\.\,?': 'that is,',
+    r'\bibid\.': 'ibidem',
+    r'\billus\.': 'illustration',
+    r'\bn\.\s?b\.': 'nota bene',
+    r'\bn\.\s?d\.': 'not determined',
+    r'\bno\.': 'number',
+    r'\bvol\.': 'volume',
+    r'\bvs\.': 'versus'
+}
+
+# Sentence end after which text can be cut and pre-processed in separate pieces with the same result:
+# a whole word of at least two characters that is not part of an abbreviation, followed by whitespace
+SAFE_CUT = re.compile(r'(?<=[^-]\s)(\w{2,})[.!?](?=\s)')
+ABBREVIATION_WORDS = {w for abb in ABBREVIATIONS for w in re.findall(r'[a-z]+', re.sub(r'\\[bs]', ' ', abb))}
+
+# Precompiled patterns of fused normalizer: URLs, DOIs, e-mail addresses, every abbreviation at once with one
+# group per abbreviation, found only at word starts with the first letter of an abbreviation, the non-text
+# character filter of get_sentences, whitespace runs, and sentences. The unescaped ] and | in the filter make it
+# an alternation whose first branch needs a character before the ^ anchor and never matches, so the filter only
+# ever replaces the literal NON_TEXT_LITERAL
+URL = re.compile(r'https?:\S+', flags=re.IGNORECASE)
+DOI = re.compile(r'doi:\S+', flags=re.IGNORECASE)
+EMAIL = re.compile(r'\S+@\S+', flags=re.IGNORECASE)
+ABBREVIATION_SCANNER = re.compile(r'\b(?=[' + ''.join(sorted({abb[2] for abb in ABBREVIATIONS})) + '])'
+                                  + '(?=(' + ')|('.join(abb[2:] for abb in ABBREVIATIONS) + '))')
+EXPANSIONS = list(ABBREVIATIONS.values())
+NON_TEXT = re.compile(r'[^\w\s!"#$€%&\'()*+,-—./:;<=>?@[\\]^_`´°{|}~]')
+NON_TEXT_LITERAL = '}~]'
+SPACES = re.compile(r'\s+')
+SENTENCE = re.compile(r'[^.!?]+')
+# Characters sents_for_pos replaces with a space
+NON_WORD = re.compile(r'[^\w\s-]')
+
+# Lines found at the same place among the first or last BOILERPLATE_EDGE_LINES lines of at least this share of the
+# pages of a document, and of at least BOILERPLATE_MIN_PAGES pages, are running headers, footers, journal banners
+# or licence lines. Lines are compared with whitespace collapsed and numbers replaced, so that page numbers and
+# page ranges do not tell them apart. Lines in the middle of pages are not compared: lines of body text wrapped
+# the same way, such as the end of a divided e.g., repeat on many pages too
+BOILERPLATE_SHARE = 0.4
+BOILERPLATE_MIN_PAGES = 3
+BOILERPLATE_EDGE_LINES = 3
+NUMBERS = re.compile(r'\d+')
+
+
+def open_pdf(pdf):
+    '''Takes in a .PDF file as a path or as its content in memory and opens it with PyMuPDF. Content in memory
+    is wrapped in a memoryview, which PyMuPDF reads in place, so that neither bytearray nor mmap objects are
+    copied.
 
     Parameters
     ----------
     pdf : .PDF file
-        File to be pre-processed
+        Path of file, or its content as bytes, bytearray, memoryview or mmap object
+
+    Returns
+    -------
+    doc : Document
+        Opened document, to be closed by the caller
+    '''
+    import fitz
+    if isinstance(pdf, (str, os.PathLike)):
+        return fitz.open(pdf)
+
+    return fitz.open(stream=memoryview(pdf), filetype='pdf')
+
+
+def pdf_to_pages(pdf, start=0, end=None):
+    '''Takes in a .PDF file, opens it with PyMuPDF and extracts text from it, optionally from a range of pages only.
+    Text of pages is joined once, and the offset at which every page starts in it is kept.
+
+    Parameters
+    ----------
+    pdf : .PDF file
+        File to be pre-processed, as a path or in memory
+    start : int
+        Number of first page to be extracted, counting from 0
+    end : int, optional
+        Number of page after last page to be extracted, defaults to end of document
+
+    Returns
+    -------
+    text : str
+        Plain text extracted from .PDF file
+    page_starts : array
+        Offset in text of the first character of every page extracted
+    '''
+    with open_pdf(pdf) as doc:
+        pages = [page.get_text() for page in doc.pages(start, end)]
+    page_starts = array.array('Q', itertools.accumulate(map(len, pages[:-1]), initial=0) if pages else ())
+
+    return ''.join(pages), page_starts
+
+
+def pdf_to_text(pdf, start=0, end=None):
+    '''Takes in a .PDF file, opens it with PyMuPDF and extracts text from it, optionally from a range of pages only.
+
+    Parameters
+    ----------
+    pdf : .PDF file
+        File to be pre-processed, as a path or in memory
+    start : int
+        Number of first page to be extracted, counting from 0
+    end : int, optional
+        Number of page after last page to be extracted, defaults to end of document
+
+    Returns
+    -------
+    text : str
+        Plain text extracted from .PDF file
+    '''
+    return pdf_to_pages(pdf, start, end)[0]
+
+
+def page_count(pdf):
+    '''Takes in a .PDF file, returns its number of pages.
+
+    Parameters
+    ----------
+    pdf : .PDF file
+        File to be pre-processed, as a path or in memory
+
+    Returns
+    -------
+    count : int
+        Number of pages
+    '''
+    with open_pdf(pdf) as doc:
+        return doc.page_count
+
+
+def line_key(line):
+    '''Takes in a line of text, returns it with whitespace collapsed and trimmed and every number replaced by #,
+    so that the same header or footer on different pages gives the same key.
+
+    Parameters
+    ----------
+    line : str
+        Line of page text
+
+    Returns
+    -------
+    key : str
+        Normalized line, empty for a blank line
+    '''
+    return NUMBERS.sub('#', SPACES.sub(' ', line).strip())
+
+
+def edge_lines(lines):
+    '''Takes in lines of a page, returns the first and the last BOILERPLATE_EDGE_LINES non-blank lines, as
+    normalized by line_key, together with their place: 0 for the first non-blank line, 1 for the second, and so
+    on, and -1 for the last non-blank line, -2 for the one before, and so on. A line of a short page can be both.
+
+    Parameters
+    ----------
+    lines : list
+        Lines of page text
+
+    Returns
+    -------
+    edges : list
+        Tuples of position of line in lines, place and normalized line
+    '''
+    keyed = [(position, key) for position, key in enumerate(map(line_key, lines)) if key != '']
+    top = keyed[:BOILERPLATE_EDGE_LINES]
+    bottom = keyed[-BOILERPLATE_EDGE_LINES:]
+    edges = [(position, place, key) for place, (position, key) in enumerate(top)]
+    edges.extend((position, place - len(bottom), key) for place, (position, key) in enumerate(bottom))
+
+    return edges
+
+
+def page_edges(page):
+    '''Takes in text of a page, returns places and normalized lines of its first and last lines, see edge_lines.
+
+    Parameters
+    ----------
+    page : str
+        Text of page
+
+    Returns
+    -------
+    edges : set
+        Tuples of place and normalized line
+    '''
+    return {(place, key) for _, place, key in edge_lines(page.splitlines())}
+
+
+def range_edges(pdf, start, end):
+    '''Takes in a .PDF file and a range of pages, returns places and normalized lines of the first and last lines
+    of every page, see page_edges, so that worker processes can look for boilerplate before pre-processing.
+
+    Parameters
+    ----------
+    pdf : .PDF file
+        File to be read
+    start : int
+        Number of first page, counting from 0
+    end : int
+        Number of page after last page
+
+    Returns
+    -------
+    edges : list
+        Set of places and normalized lines of every page
+    '''
+    with open_pdf(pdf) as doc:
+        return [page_edges(page.get_text()) for page in doc.pages(start, end)]
+
+
+def select_boilerplate(edges):
+    '''Takes in places and normalized lines of the first and last lines of every page of a document, as
+    page_edges returns them, returns those found on at least BOILERPLATE_SHARE of the pages and on at least
+    BOILERPLATE_MIN_PAGES pages.
+
+    Parameters
+    ----------
+    edges : iterable
+        Set of places and normalized lines of every page
+
+    Returns
+    -------
+    boilerplate : set
+        Tuples of place and normalized line repeated on so many pages that it is boilerplate
+    '''
+    counts = collections.Counter()
+    n_pages = 0
+    for page in edges:
+        n_pages += 1
+        counts.update(page)
+    min_pages = max(BOILERPLATE_MIN_PAGES, math.ceil(BOILERPLATE_SHARE * n_pages))
+
+    return {place_key for place_key, count in counts.items() if count >= min_pages}
+
+
+def find_boilerplate(pages):
+    '''Takes in texts of the pages of a document, returns the lines found at the same place among the first or
+    last lines of at least BOILERPLATE_SHARE of the pages and of at least BOILERPLATE_MIN_PAGES pages, as places
+    and lines normalized by line_key, see edge_lines. Every line is counted once per page it is on.
+
+    Parameters
+    ----------
+    pages : iterable
+        Text of every page
+
+    Returns
+    -------
+    boilerplate : set
+        Tuples of place and normalized line repeated on so many pages that it is boilerplate
+    '''
+    return select_boilerplate(page_edges(page) for page in pages)
+
+
+def drop_boilerplate(page, boilerplate):
+    '''Takes in text of a page and boilerplate, as find_boilerplate returns it, returns text of the page without
+    its first and last lines that are boilerplate, together with their line breaks, so that words divided across
+    a running header or footer are joined again.
+
+    Parameters
+    ----------
+    page : str
+        Text of page
+    boilerplate : set
+        Tuples of place and normalized line
 
     Returns
     -------
+    page : str
+        Text of page without boilerplate lines
+    '''
+    if not boilerplate:
+        return page
+    lines = page.splitlines(keepends=True)
+    dropped = {position for position, place, key in edge_lines(lines) if (place, key) in boilerplate}
+
+    return ''.join([line for position, line in enumerate(lines) if position not in dropped])
+
+
+def remove_boilerplate(text, page_starts, boilerplate=None):
+    '''Takes in plain text of a document and the offsets at which its pages start, as pdf_to_pages returns them.
+    It removes lines repeated at the top or bottom of many pages, found by find_boilerplate unless boilerplate is
+    given, see drop_boilerplate. Returns text and offsets of pages without them, or the same text and offsets if
+    no line is repeated on enough pages.
+
+    Parameters
+    ----------
     text : str
         Plain text extracted from .PDF file
+    page_starts : array
+        Offset in text of the first character of every page
+    boilerplate : set, optional
+        Tuples of place and normalized line to be removed, e.g. found on all pages of a document by worker processes
+
+    Returns
+    -------
+    text : str
+        Plain text without boilerplate lines
+    page_starts : array
+        Offset in text of the first character of every page
     '''
-    doc = fitz.open(pdf)
-    text = ''
-    # Loops over every page in .PDF file, gets text and appends it to empty string
-    for page in doc:
-        text += page.get_text()
+    page_ends = list(page_starts[1:]) + [len(text)]
+    pages = [text[start:end] for start, end in zip(page_starts, page_ends)]
+    if boilerplate is None:
+        boilerplate = find_boilerplate(pages)
+    if not boilerplate:
+        return text, page_starts
 
-    return text
+    kept = [drop_boilerplate(page, boilerplate) for page in pages]
+    page_starts = array.array('Q', itertools.accumulate(map(len, kept[:-1]), initial=0))
+
+    return ''.join(kept), page_starts
 
 
 def remove_division(text):
@@ -97,30 +508,10 @@ def get_sentences(flow_text):
     # Substitutes e-mail addresses with a space
     no_email = re.sub(r'\S+@\S+', ' ', no_doi, flags=re.IGNORECASE)
     
-    # Defines dictionary with abbreviations as keys and their expansions as values
-    abbreviations = {
-        r'\banon\.': 'anonymous',
-        r'\bca\.': 'circa',
-        r'\bcf\.': 'compare to',
-        r'\bdef\.\s?\:?': 'definition: ',
-        r'\be\.\s?g\.': 'for example',
-        r'\bed\.': 'edition',
-        r'\beds\.': 'editions',
-        r'\bet\sal\.': 'et alia',
-        r'\betc\.' : 'et cetera',
-        r'\bi\.\s?e\.\,?': 'that is,',
-        r'\bibid\.': 'ibidem',
-        r'\billus\.': 'illustration',
-        r'\bn\.\s?b\.': 'nota bene',
-        r'\bn\.\s?d\.': 'not determined',
-        r'\bno\.': 'number',
-        r'\bvol\.': 'volume',
-        r'\bvs\.': 'versus'
-    }
     no_abb = no_email
     
     # Replaces abbreviations with expansions
-    for abb, exp in abbreviations.items():
+    for abb, exp in ABBREVIATIONS.items():
         no_abb = re.sub(abb, exp, no_abb)
     
     # Substitutes all non-letters, non-digits, non-punctuation marks with a space
@@ -143,13 +534,207 @@ def get_sentences(flow_text):
     return sentences
 
 
+def expand_abbreviations(text):
+    '''Takes in text, returns it with abbreviations replaced by their expansions, as get_sentences does. All
+    abbreviations are found in one scan and looked up in the expansion table. If two abbreviations overlap or
+    touch, replacing one could change whether the other matches, so abbreviations are replaced one by one instead.
+
+    Parameters
+    ----------
+    text : str
+        Text to be processed
+
+    Returns
+    -------
+    expanded : str
+        Text with abbreviations expanded
+    '''
+    matches = [(m.start(), m.end(m.lastindex), m.lastindex - 1) for m in ABBREVIATION_SCANNER.finditer(text)]
+    if any(start <= prev_end for (_, prev_end, _), (start, _, _) in zip(matches, matches[1:])):
+        for abb, exp in ABBREVIATIONS.items():
+            text = re.sub(abb, exp, text)
+        return text
+
+    pieces = []
+    prev_end = 0
+    for start, end, abb_id in matches:
+        pieces.append(text[prev_end:start])
+        pieces.append(EXPANSIONS[abb_id])
+        prev_end = end
+    pieces.append(text[prev_end:])
+
+    return ''.join(pieces)
+
+
+def clean_text(text):
+    '''Takes in plain text extracted from .PDF file, returns it cleaned up the way get_sentences(remove_division(text))
+    cleans it up before splitting it into sentences, with precompiled patterns and seven regular expression passes
+    over the text instead of more than twenty-five. Line breaks are covered by whitespace collapsing,
+    abbreviations are expanded in one scan and the non-text character filter runs only if the text contains the
+    only string it can match, NON_TEXT_LITERAL.
+
+    Parameters
+    ----------
+    text : str
+        Plain text to be processed
+
+    Returns
+    -------
+    cleaned_txt : str
+        Text cleaned up from URLs, DOIs, emails, abbreviations, non-alphanumeric characters and double spaces
+    '''
+    plain_text = SPACES.sub(' ', text.replace('-\n', ''))
+    no_email = EMAIL.sub(' ', DOI.sub(' ', URL.sub(' ', plain_text)))
+    no_abb = expand_abbreviations(no_email)
+    if NON_TEXT_LITERAL in no_abb:
+        no_abb = NON_TEXT.sub(' ', no_abb)
+
+    return SPACES.sub(' ', no_abb.replace('�', ''))
+
+
+def split_sentences(text):
+    '''Takes in plain text extracted from .PDF file, returns the same sentences as get_sentences(remove_division(text))
+    in a few fused passes, see clean_text.
+
+    Parameters
+    ----------
+    text : str
+        Plain text to be processed
+
+    Returns
+    -------
+    sentences : list
+        List of sentences cleaned up from URLs, DOIs, emails, abbreviations, non-alphanumeric characters
+    '''
+    sentences = [sent.strip(' ') for sent in SENTENCE.findall(clean_text(text)) if len(sent) > 1]
+
+    return sentences
+
+
+def page_cuts(text, page_starts, first_page=0):
+    '''Takes in plain text and start offsets of its pages, returns a safe cut for every page at which sentences
+    starting on that page begin: the end of the previous page if it ends with a sentence, otherwise the first safe
+    cut on the page, so that the sentence crossing a page break belongs to the page it starts on.
+
+    Parameters
+    ----------
+    text : str
+        Plain text to be processed
+    page_starts : array
+        Offset in text of the first character of every page, as returned by pdf_to_pages
+    first_page : int
+        Number of page text starts on, counting from 0
+
+    Returns
+    -------
+    cut_pages : dict
+        Offsets of cuts, including 0, as keys and numbers of the pages sentences after them start on as values
+    '''
+    cut_pages = {0: first_page}
+    for page, start in enumerate(page_starts, first_page):
+        # Cuts at the end of the previous page if it ends with a sentence
+        end = start
+        while end > 0 and text[end - 1].isspace():
+            end -= 1
+        match = None
+        if end < start:
+            for match in SAFE_CUT.finditer(text, max(end - 64, 0), end + 1):
+                pass
+        if match is None or match.end() != end or match.group(1) in ABBREVIATION_WORDS:
+            # Otherwise looks for the first safe cut from page start, rather than scanning the whole text for them
+            match = SAFE_CUT.search(text, start)
+            while match is not None and match.group(1) in ABBREVIATION_WORDS:
+                match = SAFE_CUT.search(text, match.end())
+        if match is not None:
+            cut_pages[match.end()] = page
+
+    return cut_pages
+
+
+def split_document(text, page_starts=None, first_page=0):
+    '''Takes in plain text and optional start offsets of its pages, returns its sentences as a span document: the
+    cleaned text is kept once and sentences are offsets into it, the same sentences as split_sentences(text). If
+    page starts are given, text is cut at page_cuts and every piece is cleaned up on its own, so that the page
+    every sentence starts on is known.
+
+    Parameters
+    ----------
+    text : str
+        Plain text to be processed
+    page_starts : array, optional
+        Offset in text of the first character of every page, as returned by pdf_to_pages
+    first_page : int
+        Number of page text starts on, counting from 0
+
+    Returns
+    -------
+    document : SpanDocument
+        Cleaned text, sentence offsets and, if page starts are given, page numbers of sentences
+    '''
+    if page_starts is None:
+        cleaned_txt = clean_text(text)
+    else:
+        cut_pages = page_cuts(text, page_starts, first_page)
+        bounds = sorted(cut_pages)
+        pieces = [clean_text(text[start:end]) for start, end in zip(bounds, bounds[1:] + [len(text)])]
+        # Joins pieces with a sentence end, so that no sentence runs from one piece into the next
+        cleaned_txt = '.'.join(pieces)
+        piece_starts = list(itertools.accumulate((len(piece) + 1 for piece in pieces[:-1]), initial=0))
+
+    starts = array.array('Q')
+    ends = array.array('Q')
+    for match in SENTENCE.finditer(cleaned_txt):
+        start, end = match.span()
+        if end - start > 1:
+            # Leaves out spaces around sentence, as split_sentences strips them
+            while start < end and cleaned_txt[start] == ' ':
+                start += 1
+            while end > start and cleaned_txt[end - 1] == ' ':
+                end -= 1
+            starts.append(start)
+            ends.append(end)
+
+    pages = None
+    if page_starts is not None:
+        piece_pages = [cut_pages[bound] for bound in bounds]
+        pages = array.array('I', (piece_pages[bisect.bisect_right(piece_starts, start) - 1] for start in starts))
+
+    return SpanDocument(cleaned_txt, starts, ends, pages)
+
+
+def split_page_sentences(text, page_starts, first_page=0):
+    '''Takes in plain text and start offsets of its pages, returns the same sentences as split_sentences(text)
+    together with the number of the page every sentence starts on, see split_document.
+
+    Parameters
+    ----------
+    text : str
+        Plain text to be processed
+    page_starts : array
+        Offset in text of the first character of every page, as returned by pdf_to_pages
+    first_page : int
+        Number of page text starts on, counting from 0
+
+    Returns
+    -------
+    sentences : list
+        List of sentences, as returned by split_sentences
+    sent_pages : array
+        Page number of every sentence
+    '''
+    document = split_document(text, page_starts, first_page)
+
+    return list(document), document.pages
+
+
 def sents_for_pos(raw_sents):
     '''Takes in a list of sentences as input. It lowercases the list, replaces non-word and non-space 
     characters with a space, and substitutes double spaces with a single space. Returns list of cleaned-up sentences.
+    Sentences of a span document are lowercased and replaced in one pass over its text, then sliced.
 
     Parameters
     ----------
-    raw_sents : list
+    raw_sents : list or SpanDocument
         List of sentences to be processed
     
     Returns
@@ -157,6 +742,14 @@ def sents_for_pos(raw_sents):
     clean_sent : list
         List of sentences cleaned up from non-words, non-spaces, double spaces
     '''
+    if isinstance(raw_sents, SpanDocument):
+        text = raw_sents.text
+        lowered = text.lower()
+        # Needs every character to lowercase to one, on its own: capital sigma lowercases depending on its neighbours
+        if len(lowered) == len(text) and 'Σ' not in text:
+            no_punct = NON_WORD.sub(' ', lowered)
+            return [SPACES.sub(' ', no_punct[start:end]) for start, end in zip(raw_sents.starts, raw_sents.ends)]
+
     clean_sent = []
     for s in raw_sents:
         # Lowercase sentences
@@ -169,14 +762,120 @@ def sents_for_pos(raw_sents):
     return clean_sent
 
 
-def pos_tagging(scraped_sents):
+def get_tagger():
+    '''Returns NLTK averaged perceptron tagger, the one nltk.pos_tag uses for English. The model is loaded
+    on first call and kept for the lifetime of the process.
+
+    Returns
+    -------
+    tagger : PerceptronTagger
+        POS tagger
+    '''
+    global _tagger
+    if _tagger is None:
+        import nltk
+        _tagger = nltk.tag.PerceptronTagger()
+
+    return _tagger
+
+
+def preload_tagger():
+    '''Loads POS tagger ahead of first use, as initializer of worker processes. Errors are left to the first
+    call that needs the tagger: a pool restarts workers whose initializer fails, so a missing model would
+    otherwise keep restarting them forever.
+
+    Returns
+    -------
+    None
+    '''
+    try:
+        get_tagger()
+    except Exception:
+        pass
+
+
+def get_tag_memo():
+    '''Returns memo of POS tagged sentences, keyed on their tokens joined by spaces. The memo is created on first
+    call and kept for the lifetime of the process, so that sentences repeated in other documents are found too.
+
+    Returns
+    -------
+    memo : SentenceMemo
+        Memo of POS tagged sentences
+    '''
+    global _tag_memo
+    if _tag_memo is None:
+        _tag_memo = SentenceMemo(MEMO_SIZE)
+
+    return _tag_memo
+
+
+def get_chunk_memo():
+    '''Returns memo of noun phrases of sentences, keyed on their tag codes and words. The memo is created on first
+    call and kept for the lifetime of the process.
+
+    Returns
+    -------
+    memo : SentenceMemo
+        Memo of noun phrases
+    '''
+    global _chunk_memo
+    if _chunk_memo is None:
+        _chunk_memo = SentenceMemo(MEMO_SIZE)
+
+    return _chunk_memo
+
+
+def clear_memos():
+    '''Removes all memoized POS tags and noun phrases and resets hit and miss counters, e.g. before timing
+    the pipeline.
+
+    Returns
+    -------
+    None
+    '''
+    get_tag_memo().clear()
+    get_chunk_memo().clear()
+
+
+def tag_batch(token_lists):
+    '''Takes in a list of token lists and POS tags each of them with the shared tagger.
+
+    Parameters
+    ----------
+    token_lists : list
+        List of lists of word tokens
+
+    Returns
+    -------
+    tagged : list
+        List of lists of tuples containing POS-tagged words
+    '''
+    # Loads the tagger only if there is something to tag
+    if len(token_lists) == 0:
+        return []
+
+    tagger = get_tagger()
+    return [tagger.tag(tokens) for tokens in token_lists]
+
+
+def pos_tagging(scraped_sents, batch_size=2000, processes=None, memoize=True):
     '''Takes in list of sentences as input. It tokenizes each sentence and removes empty strings from list of tokens, 
     then tags tokens. Returns list of tuples sublists, each of them made of a word and the corresponding POS tag.
+    Tokens are tagged in batches by a tagger loaded once per process; if processes is given and there is more
+    than one batch, batches are tagged in a pool of worker processes. If memoize is True, sentences with the same
+    tokens are tagged once and looked up in the memo of the process afterwards, each getting a list of its own.
 
     Parameters
     ----------
     scraped_sents : list
         List of sentences to be POS tagged
+    batch_size : int
+        Number of sentences per batch sent to a worker process
+    processes : int, optional
+        Number of worker processes
+    memoize : bool
+        Whether to look up sentences tagged before
 
     Returns
     -------
@@ -189,29 +888,478 @@ def pos_tagging(scraped_sents):
         word_token = sentence.split(' ')
         clean_token = [t for t in word_token if t != '']
         tokens.append(clean_token)
-    # POS tag tokens
-    tagged = [nltk.pos_tag(token) for token in tokens if token != '']
+
+    def tag(token_lists):
+        # POS tag tokens
+        if processes is None or len(token_lists) <= batch_size:
+            return tag_batch(token_lists)
+        batches = [token_lists[i:i + batch_size] for i in range(0, len(token_lists), batch_size)]
+        # Workers load the tagger once, when they start
+        with multiprocessing.Pool(processes, initializer=preload_tagger) as pool:
+            return [tagged_sent for batch in pool.map(tag_batch, batches) for tagged_sent in batch]
+
+    if not memoize:
+        return tag(tokens)
+    # Tags only sentences neither tagged before nor repeated, keyed on their normalized text
+    tagged = get_tag_memo().map_batch(tag, [' '.join(sent_tokens) for sent_tokens in tokens], tokens)
 
     return tagged
 
 
+def get_chunker():
+    '''Returns noun phrase chunker shared by all calls in a process, building it from the chunk grammar
+    on first call.
+
+    Returns
+    -------
+    chunker : RegexpParser
+        Noun phrase chunker
+    '''
+    global _chunker
+    if _chunker is None:
+        import nltk
+        _chunker = nltk.RegexpParser(GRAMMAR_RULES)
+
+    return _chunker
+
+
+def chunk_sentence(tagged_sent):
+    '''Takes in POS tagged words of one sentence, returns its parse tree. Sentence without tokens gets
+    an empty parse tree.
+
+    Parameters
+    ----------
+    tagged_sent : list
+        List of tuples containing POS-tagged words
+
+    Returns
+    -------
+    tree : Tree
+        Parse tree of sentence
+    '''
+    if len(tagged_sent) == 0:
+        import nltk
+        return nltk.Tree('S', [])
+
+    return get_chunker().parse(tagged_sent)
+
+
 def chunking(tagged_sents):
-    '''Takes in a list of POS tagged words, defines chunk grammar and returns parse trees for sentences.
+    '''Takes in a list of POS tagged words and returns parse trees for sentences, chunked with the noun
+    phrase grammar. Sentences without tokens get an empty parse tree, so that parse trees keep the positions
+    of their sentences.
 
     Parameters
     ----------
     tagged_sents : list
         List of POS tagged word tokens
+
     Returns
     -------
     chunked_sents : list
         List of parsed sentences
     '''
-    # Define grammar for chunking noun phrases
-    grammar_rules = r''' 
-        NP: {<DT\$>?<JJ>*<NN.*>+}  
-	    '''
-    chunker = nltk.RegexpParser(grammar_rules)
-    chunked_sents = [chunker.parse(tagged_sent) for tagged_sent in tagged_sents if len(tagged_sent) > 0]
+    chunked_sents = [chunk_sentence(tagged_sent) for tagged_sent in tagged_sents]
 
     return chunked_sents
+
+
+def encode_tags(tagged_sent):
+    '''Takes in POS tagged words of one sentence, returns their tags as a string of one code per token:
+    D for DT$, J for JJ, N for tags starting with NN, x for any other tag.
+
+    Parameters
+    ----------
+    tagged_sent : list
+        List of tuples containing POS-tagged words
+
+    Returns
+    -------
+    codes : str
+        Tag codes, one character per token
+    '''
+    try:
+        return ''.join([_tag_codes[tag] for _, tag in tagged_sent])
+    except KeyError:
+        for _, tag in tagged_sent:
+            if tag not in _tag_codes:
+                _tag_codes[tag] = NP_TAG_CODES.get(tag, 'N' if tag.startswith('NN') else 'x')
+        return ''.join([_tag_codes[tag] for _, tag in tagged_sent])
+
+
+def chunk_spans(tagged_sent):
+    '''Takes in POS tagged words of one sentence, returns token spans of the noun phrases the chunk grammar
+    finds in it, from left to right, without building a parse tree.
+
+    Parameters
+    ----------
+    tagged_sent : list
+        List of tuples containing POS-tagged words
+
+    Returns
+    -------
+    spans : list
+        Tuples of position of first token and position after last token of every noun phrase
+    '''
+    return [match.span() for match in NP_CODES.finditer(encode_tags(tagged_sent))]
+
+
+def chunk_noun_phrases(tagged_sent, codes=None):
+    '''Takes in POS tagged words of one sentence, returns its noun phrases as chunk_sentence would chunk them,
+    with POS tags removed.
+
+    Parameters
+    ----------
+    tagged_sent : list
+        List of tuples containing POS-tagged words
+    codes : str, optional
+        Tag codes of sentence, as returned by encode_tags, encoded if not given
+
+    Returns
+    -------
+    noun_phrases : list
+        Noun phrases of sentence, from left to right
+    '''
+    if codes is None:
+        codes = encode_tags(tagged_sent)
+    noun_phrases = []
+    for match in NP_CODES.finditer(codes):
+        noun_phrases.append(' '.join([word for word, _ in tagged_sent[match.start():match.end()]]))
+
+    return noun_phrases
+
+
+def phrase_chunking(tagged_sents, memoize=True):
+    '''Takes in a list of POS tagged words and returns noun phrases of every sentence, the same ones chunking
+    finds in its parse trees. Sentences without noun phrases get an empty list, so that noun phrase lists keep
+    the positions of their sentences. If memoize is True, sentences with the same tag codes and words are chunked
+    once and looked up in the memo of the process afterwards, each getting a list of its own.
+
+    Parameters
+    ----------
+    tagged_sents : list
+        List of POS tagged word tokens
+    memoize : bool
+        Whether to look up sentences chunked before
+
+    Returns
+    -------
+    chunked_sents : list
+        List of lists of noun phrases, one per sentence
+    '''
+    if not memoize:
+        return [chunk_noun_phrases(tagged_sent) for tagged_sent in tagged_sents]
+    # Noun phrases depend on tag codes and words only, and codes are passed on to sentences not memoized
+    items = [(encode_tags(tagged_sent), tagged_sent) for tagged_sent in tagged_sents]
+    keys = [(codes, ' '.join([word for word, _ in tagged_sent])) for codes, tagged_sent in items]
+    chunked_sents = get_chunk_memo().map_batch(
+        lambda missing: [chunk_noun_phrases(tagged_sent, codes) for codes, tagged_sent in missing], keys, items)
+
+    return chunked_sents
+
+
+def preprocess_text(text):
+    '''Takes in plain text extracted from .PDF file and runs it through the pre-processing pipeline.
+
+    Parameters
+    ----------
+    text : str
+        Plain text to be processed
+
+    Returns
+    -------
+    sentences : list
+        List of sentences, as returned by get_sentences
+    chunked_sents : list
+        List of lists of noun phrases, one per sentence
+    '''
+    sentences = split_sentences(text)
+    chunked_sents = phrase_chunking(pos_tagging(sents_for_pos(sentences)))
+
+    return sentences, chunked_sents
+
+
+def split_at_safe_cuts(text):
+    '''Takes in text, returns it split at the first and last sentence end after which it can be cut without
+    changing the output of the pre-processing pipeline. No regular expression of remove_division or
+    get_sentences matches across such a cut, and the sentence splitter always breaks there.
+
+    Parameters
+    ----------
+    text : str
+        Plain text to be split
+
+    Returns
+    -------
+    head : str
+        Text before first safe cut, whole text if there is no safe cut
+    body : str
+        Text between first and last safe cut
+    tail : str
+        Text after last safe cut
+    '''
+    cuts = [m.end() for m in SAFE_CUT.finditer(text) if m.group(1) not in ABBREVIATION_WORDS]
+    if len(cuts) == 0:
+        return text, '', ''
+
+    return text[:cuts[0]], text[cuts[0]:cuts[-1]], text[cuts[-1]:]
+
+
+def last_safe_cut(text, pos=0):
+    '''Takes in text, returns the offset after its last safe cut starting at or after pos, see split_at_safe_cuts.
+    Text before pos is only looked at as context of a cut.
+
+    Parameters
+    ----------
+    text : str
+        Plain text to be searched
+    pos : int
+        Offset from which to search
+
+    Returns
+    -------
+    cut : int
+        Offset after last safe cut, 0 if there is no safe cut
+    '''
+    cut = 0
+    for m in SAFE_CUT.finditer(text, pos):
+        if m.group(1) not in ABBREVIATION_WORDS:
+            cut = m.end()
+
+    return cut
+
+
+def trailing_word_start(text):
+    '''Takes in text, returns the offset of the run of non-whitespace characters it ends with.
+
+    Parameters
+    ----------
+    text : str
+        Plain text
+
+    Returns
+    -------
+    start : int
+        Offset after last whitespace character, 0 if there is none
+    '''
+    start = len(text)
+    while start > 0 and not text[start - 1].isspace():
+        start -= 1
+
+    return start
+
+
+def preprocess_page_range(pdf, start, end, boilerplate=frozenset()):
+    '''Takes in a .PDF file and a range of pages, extracts their text, drops boilerplate lines found on all pages
+    of the document and pre-processes the part of the text between the first and last safe cut. Text before and
+    after is returned unprocessed, so that sentences crossing range boundaries can be stitched together with the
+    neighbouring ranges.
+
+    Parameters
+    ----------
+    pdf : .PDF file
+        File to be pre-processed
+    start : int
+        Number of first page, counting from 0
+    end : int
+        Number of page after last page
+    boilerplate : set
+        Tuples of place and normalized line to be dropped, see find_boilerplate
+
+    Returns
+    -------
+    head : str
+        Unprocessed text before first safe cut
+    sentences : list
+        List of sentences between first and last safe cut
+    chunked_sents : list
+        List of lists of noun phrases of sentences
+    tail : str or None
+        Unprocessed text after last safe cut, None if there is no safe cut
+    '''
+    text = remove_boilerplate(*pdf_to_pages(pdf, start, end), boilerplate)[0]
+    head, body, tail = split_at_safe_cuts(text)
+    # Safe cut is always followed by whitespace, so empty tail means there is no safe cut
+    if tail == '':
+        return head, [], [], None
+    sentences, chunked_sents = preprocess_text(body)
+
+    return head, sentences, chunked_sents, tail
+
+
+def parallel_preprocess(pdf, processes=None, pages_per_range=50):
+    '''Takes in a .PDF file, splits it into page ranges and pre-processes them in a pool of worker processes.
+    Text around range boundaries is stitched back together and pre-processed in the main process, so sentences
+    and noun phrases are the same as pre-processing the whole text at once. Workers first return the first and
+    last lines of their pages, so that boilerplate is found on all pages, as remove_boilerplate finds it, and
+    dropped from every range.
+
+    Parameters
+    ----------
+    pdf : .PDF file
+        File to be pre-processed
+    processes : int, optional
+        Number of worker processes, defaults to number of CPUs
+    pages_per_range : int
+        Number of pages handed to a worker at a time
+
+    Returns
+    -------
+    sentences : list
+        List of sentences, as returned by get_sentences
+    chunked_sents : list
+        List of lists of noun phrases, one per sentence
+    '''
+    # Content in memory is sent to workers as bytes, since memoryview and mmap objects cannot be pickled
+    if not isinstance(pdf, (str, os.PathLike)):
+        pdf = bytes(pdf)
+    n_pages = page_count(pdf)
+    ranges = [(pdf, start, min(start + pages_per_range, n_pages)) for start in range(0, n_pages, pages_per_range)]
+    with multiprocessing.Pool(processes, initializer=preload_tagger) as pool:
+        boilerplate = select_boilerplate(itertools.chain.from_iterable(pool.starmap(range_edges, ranges)))
+        results = pool.starmap(preprocess_page_range, [page_range + (boilerplate,) for page_range in ranges])
+
+    sentences = []
+    chunked_sents = []
+    carry = ''
+    for head, range_sents, range_chunked, tail in results:
+        carry += head
+        # Range without safe cut is stitched to the next one as a whole
+        if tail is None:
+            continue
+        # Pre-processes text between last safe cut of previous range and first safe cut of this one
+        seam_sents, seam_chunked = preprocess_text(carry)
+        sentences.extend(seam_sents + range_sents)
+        chunked_sents.extend(seam_chunked + range_chunked)
+        carry = tail
+
+    seam_sents, seam_chunked = preprocess_text(carry)
+    sentences.extend(seam_sents)
+    chunked_sents.extend(seam_chunked)
+
+    return sentences, chunked_sents
+
+
+def iter_pages(pdf):
+    '''Takes in a .PDF file and yields text of its pages one at a time.
+
+    Parameters
+    ----------
+    pdf : .PDF file
+        File to be pre-processed
+
+    Yields
+    ------
+    text : str
+        Plain text of page
+    '''
+    with open_pdf(pdf) as doc:
+        for page in doc:
+            yield page.get_text()
+
+
+def spool_pages(pages):
+    '''Takes in an iterable of page texts and finds boilerplate on them, see find_boilerplate, while writing them
+    to a temporary file. Returns boilerplate together with the pages read back one at a time, so that pages are
+    extracted from a .PDF file once and are not all kept in memory.
+
+    Parameters
+    ----------
+    pages : iterable
+        Plain text of pages
+
+    Returns
+    -------
+    boilerplate : set
+        Tuples of place and normalized line repeated on so many pages that it is boilerplate
+    pages : generator
+        Plain text of every page, read back from the temporary file, which is removed once pages are exhausted
+    '''
+    spool = tempfile.TemporaryFile('w+', encoding='utf-8', errors='surrogatepass', newline='')
+    lengths = []
+
+    def edges():
+        for page in pages:
+            spool.write(page)
+            lengths.append(len(page))
+            yield page_edges(page)
+
+    def read_back():
+        with spool:
+            spool.seek(0)
+            for length in lengths:
+                yield spool.read(length)
+
+    try:
+        boilerplate = select_boilerplate(edges())
+    except BaseException:
+        spool.close()
+        raise
+
+    return boilerplate, read_back()
+
+
+def iter_sentences(pages, boilerplate=frozenset()):
+    '''Takes in an iterable of page texts and yields sentences as soon as they are complete. Boilerplate lines are
+    dropped from every page. Text is buffered only up to the last safe cut, so the buffer holds a window of pages
+    rather than the whole document, and sentences are the same as get_sentences(remove_division(text)) returns for
+    the whole text.
+
+    Parameters
+    ----------
+    pages : iterable
+        Plain text of pages
+    boilerplate : set
+        Tuples of place and normalized line to be dropped, see find_boilerplate
+
+    Yields
+    ------
+    sentence : str
+        Sentence, as returned by get_sentences
+    '''
+    buffer = ''
+    scan_from = 0
+    for page_text in pages:
+        page_text = drop_boilerplate(page_text, boilerplate)
+        # A safe cut is preceded by whitespace and followed by it, so text buffered before the word it ends with
+        # holds no new one, and only this word and the new page are searched
+        word_start = trailing_word_start(page_text)
+        next_scan = len(buffer) + word_start if word_start > 0 else scan_from
+        buffer += page_text
+        cut = last_safe_cut(buffer, scan_from)
+        # Processes text up to last safe cut, keeps the rest for next page
+        if cut > 0:
+            yield from split_sentences(buffer[:cut])
+            buffer = buffer[cut:]
+            next_scan = max(next_scan - cut, 0)
+        scan_from = next_scan
+
+    yield from split_sentences(buffer)
+
+
+def stream_preprocess(pdf, batch_size=500):
+    '''Takes in a .PDF file and streams it through the pre-processing pipeline page by page. Pages, sentences,
+    tagged sentences and noun phrases flow through generators, so memory does not grow with document length.
+    Sentences are POS tagged batch_size at a time, so that the tagger is not called once per sentence, and
+    yielded one at a time.
+    Pages are extracted once: while boilerplate is found on them, their text is spooled to a temporary file, from
+    which it is read back page by page, see spool_pages.
+
+    Parameters
+    ----------
+    pdf : .PDF file
+        File to be pre-processed
+    batch_size : int
+        Number of sentences POS tagged at a time
+
+    Yields
+    ------
+    sentence : str
+        Sentence, as returned by get_sentences
+    noun_phrases : list
+        Noun phrases of sentence, as returned by phrase_chunking
+    '''
+    boilerplate, pages = spool_pages(iter_pages(pdf))
+    sentences = iter_sentences(pages, boilerplate)
+    for batch in iter(lambda: list(itertools.islice(sentences, batch_size)), []):
+        yield from zip(batch, phrase_chunking(pos_tagging(sents_for_pos(batch))))
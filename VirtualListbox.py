@@ -0,0 +1,280 @@
+'''Virtual Listbox Module
+
+This module contains a list widget for Tkinter that holds any number of items but only renders the rows that
+are visible, so that loading, scrolling and clicking take the same time for ten items or for a hundred thousand.
+Items can be filtered by the beginnings of their words as the user types. It requires tkinter library and the
+prefix index module.
+
+Classes
+-------
+VirtualListbox(master, height, **options)
+    Scrollable, filterable list widget rendering visible rows only
+'''
+
+from tkinter import *
+from PrefixIndex import *
+
+
+class VirtualListbox(Frame):
+    '''Class for representing a list widget rendering only its visible rows in a Tk Listbox.
+
+    Attributes
+    ----------
+    items : PrefixIndex
+        All items of the list, in order of insertion, indexed by word prefixes
+    prefix : str
+        Current filter, empty if no filter is set
+    view : list or None
+        Ids of items matching current filter, None if no filter is set
+    first : int
+        Position in view of the first visible row
+    height : int
+        Number of visible rows
+    selected : str or None
+        Selected item, None if no item is selected
+    listbox : Listbox
+        Listbox showing visible rows
+    scrollbar : Scrollbar
+        Scrollbar covering all items of view
+
+    Methods
+    -------
+    render(self):
+        Shows visible rows of current view
+    extend(self, items):
+        Appends items to the list
+    clear(self):
+        Removes all items
+    set_filter(self, prefix):
+        Shows only items having a word starting with prefix
+    yview(self, *args):
+        Scrolls the list, as called by scrollbar
+    scroll(self, rows):
+        Scrolls the list by a number of rows
+    move_selection(self, step):
+        Selects previous or next item
+    get_selected(self):
+        Retrieves selected item
+    bind_select(self, callback):
+        Calls function when an item is selected
+    '''
+
+    def __init__(self, master, height=60, **options):
+        '''Construct empty list widget.
+
+        Parameters
+        ----------
+        master : Widget
+            Parent widget
+        height : int
+            Number of visible rows
+        **options
+            Options of Tk Listbox, e.g. width, font and colors
+
+        Returns
+        -------
+        None
+        '''
+        super().__init__(master)
+        self.items = PrefixIndex()
+        self.prefix = ''
+        self.view = None
+        self.first = 0
+        self.height = height
+        self.selected = None
+
+        self.listbox = Listbox(self, height=height, activestyle='none', exportselection=False, **options)
+        self.scrollbar = Scrollbar(self, orient=VERTICAL, command=self.yview)
+        self.listbox.pack(side=LEFT, fill=BOTH, expand=True)
+        self.scrollbar.pack(side=RIGHT, fill=Y)
+
+        # Scrolls with mouse wheel and arrow keys over the whole list, not only the rendered rows
+        self.listbox.bind('<MouseWheel>', lambda event: self.scroll(-1 if event.delta > 0 else 1))
+        self.listbox.bind('<Button-4>', lambda event: self.scroll(-1))
+        self.listbox.bind('<Button-5>', lambda event: self.scroll(1))
+        self.listbox.bind('<Up>', lambda event: self.move_selection(-1))
+        self.listbox.bind('<Down>', lambda event: self.move_selection(1))
+        self.listbox.bind('<<ListboxSelect>>', self._on_select, add='+')
+        self.render()
+
+
+    def _size(self):
+        '''Retrieves number of items in current view.'''
+        return len(self.items) if self.view is None else len(self.view)
+
+
+    def _item(self, position):
+        '''Retrieves item at position in current view.'''
+        return self.items.terms[position if self.view is None else self.view[position]]
+
+
+    def render(self):
+        '''Shows rows of current view from self.first on, highlighting selected item, and updates scrollbar.
+
+        Returns
+        -------
+        None
+        '''
+        size = self._size()
+        self.first = max(0, min(self.first, size - self.height))
+        last = min(self.first + self.height, size)
+        rows = [self._item(position) for position in range(self.first, last)]
+        self.listbox.delete(0, END)
+        if rows:
+            self.listbox.insert(END, *rows)
+        if self.selected in rows:
+            self.listbox.selection_set(rows.index(self.selected))
+        if size == 0:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self.first / size, last / size)
+
+
+    def extend(self, items):
+        '''Appends items to the list. Rows are only rendered again if new items become visible or match the filter.
+
+        Parameters
+        ----------
+        items : list
+            Items to be appended
+
+        Returns
+        -------
+        None
+        '''
+        size = len(self.items)
+        self.items.extend(items)
+        if self.view is not None:
+            self.view = self.items.lookup(self.prefix)
+            self.render()
+        elif size < self.first + self.height:
+            self.render()
+        else:
+            self.scrollbar.set(self.first / len(self.items), (self.first + self.height) / len(self.items))
+
+
+    def clear(self):
+        '''Removes all items, filter and selection.
+
+        Returns
+        -------
+        None
+        '''
+        self.items = PrefixIndex()
+        self.prefix = ''
+        self.view = None
+        self.first = 0
+        self.selected = None
+        self.render()
+
+
+    def set_filter(self, prefix):
+        '''Shows only items having a word starting with prefix, regardless of case. Empty prefix shows all items.
+
+        Parameters
+        ----------
+        prefix : str
+            Beginning of word of items to be shown
+
+        Returns
+        -------
+        None
+        '''
+        self.prefix = prefix.strip()
+        self.view = None if self.prefix == '' else self.items.lookup(self.prefix)
+        self.first = 0
+        self.render()
+
+
+    def yview(self, *args):
+        '''Scrolls the list as Tk scrollbar requests, by fraction of the list, by rows or by pages.
+
+        Parameters
+        ----------
+        *args
+            ('moveto', fraction) or ('scroll', number, 'units' or 'pages')
+
+        Returns
+        -------
+        None
+        '''
+        if args[0] == 'moveto':
+            self.first = int(float(args[1]) * self._size())
+        elif args[0] == 'scroll':
+            step = self.height if args[2] == 'pages' else 1
+            self.first += int(args[1]) * step
+        self.render()
+
+
+    def scroll(self, rows):
+        '''Scrolls the list by a number of rows.
+
+        Parameters
+        ----------
+        rows : int
+            Number of rows, negative to scroll up
+
+        Returns
+        -------
+        str
+            'break', so that Tk does not scroll rendered rows as well
+        '''
+        self.yview('scroll', rows, 'units')
+        return 'break'
+
+
+    def move_selection(self, step):
+        '''Selects the item before or after the selected one, scrolling to it if needed.
+
+        Parameters
+        ----------
+        step : int
+            -1 for previous item, 1 for next item
+
+        Returns
+        -------
+        str
+            'break', so that Tk does not move selection among rendered rows as well
+        '''
+        selection = self.listbox.curselection()
+        position = self.first + selection[0] + step if selection else self.first
+        if 0 <= position < self._size():
+            self.first = min(self.first, position)
+            self.first = max(self.first, position - self.height + 1)
+            self.selected = self._item(position)
+            self.render()
+            self.listbox.event_generate('<<ListboxSelect>>')
+        return 'break'
+
+
+    def _on_select(self, event):
+        '''Records item selected by a click on a rendered row.'''
+        selection = self.listbox.curselection()
+        if selection:
+            self.selected = self._item(self.first + selection[0])
+
+
+    def get_selected(self):
+        '''Retrieves selected item.
+
+        Returns
+        -------
+        item : str or None
+            Selected item, None if no item is selected
+        '''
+        return self.selected
+
+
+    def bind_select(self, callback):
+        '''Calls function whenever an item is selected, after selected item is recorded.
+
+        Parameters
+        ----------
+        callback : function
+            Function taking Tk event
+
+        Returns
+        -------
+        None
+        '''
+        self.listbox.bind('<<ListboxSelect>>', callback, add='+')